@@ -0,0 +1,3 @@
+from .dataset import dataset_folder, generate_dataset
+from .fixtures import stats_html, write_stats_fixtures
+from .run import compare, run_all
@@ -0,0 +1,208 @@
+import gzip
+import json
+import os
+import random
+import uuid
+
+# Size of the bundled esports-data folder; scale=N generates N times this
+BASE_COUNTS = {
+    "players": 845,
+    "player_rows": 3254,  # players.json repeats most players across several rows
+    "teams": 172,
+    "tournaments": 35,
+    "leagues": 7,
+    "games": 1742,
+}
+
+# Bump when the generated data changes so cached folders are regenerated
+GENERATOR_VERSION = 1
+MARKER_FILE = ".generated.json"
+
+FUZZY_PARTICIPANT_RATE = 0.002  # participant ids with a typo, linked by fuzzy match
+UNKNOWN_TEAM_RATE = 0.025  # team ids missing from teams.json
+V1_DIFFERENT_RATE = 0.1  # games whose mapping_data entry disagrees with mapping_data_v2
+
+SYLLABLES = ["ka", "ze", "ro", "tin", "vo", "lux", "ash", "neo", "sky", "rix", "mo", "dr", "ex", "fy", "qu", "zen", "ta", "yo"]
+TEAM_WORDS = ["Crimson", "Void", "Nova", "Iron", "Silent", "Rapid", "Golden", "Shadow", "Frost", "Blaze", "Echo", "Titan"]
+TEAM_SUFFIXES = ["Esports", "Gaming", "Wolves", "Dragons", "Knights", "Squad", "Club", "Academy"]
+REGIONS = ["AMERICAS", "EMEA", "PACIFIC", "CN", "INTL"]
+STAGES = ["kickoff", "stage_1", "stage_2", "playoffs", "lock_in", "masters", "champions"]
+FIRST_NAMES = ["Tyson", "Nikita", "Jake", "Max", "Erik", "Kim", "Bryan", "Zachary", "Leo", "Mateus"]
+LAST_NAMES = ["Ngo", "Sirmitev", "Howlett", "Mazanov", "Sandgren", "Park", "Luna", "Patrone", "Jannesson", "Silva"]
+
+
+class _Ids:
+    def __init__(self, rng, start=105000000000000000):
+        self.rng = rng
+        self.current = start
+
+    def next(self):
+        self.current += self.rng.randint(1, 10 ** 9)
+        return str(self.current)
+
+
+def _timestamp(rng):
+    return f"20{rng.randint(21, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}Z"
+
+
+def _handle(rng, serial):
+    handle = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+    return handle if serial < len(SYLLABLES) ** 2 else f"{handle}{serial % 1000}"
+
+
+def _typo(player_id, rng):
+    position = rng.randrange(len(player_id) - 6, len(player_id))
+    digit = str((int(player_id[position]) + 1) % 10)
+    return player_id[:position] + digit + player_id[position + 1:]
+
+
+# Write records as a JSON array one record at a time, so large scales never sit in memory
+def _write_array(path, records):
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=4) as f:
+        f.write("[")
+        for position, record in enumerate(records):
+            if position:
+                f.write(",\n")
+            f.write(json.dumps(record))
+        f.write("]")
+
+
+def _counts(scale):
+    return {kind: max(1, round(count * scale)) for kind, count in BASE_COUNTS.items()}
+
+
+# Generate a folder shaped like esports-data: players, teams, tournaments, leagues and two
+# overlapping mapping files, with the same fields and 18-digit id strings as the real
+# data. The same scale and seed always give the same files.
+def generate_dataset(dest, scale=1, seed=0):
+    rng = random.Random(seed)
+    ids = _Ids(rng)
+    counts = _counts(scale)
+    os.makedirs(dest, exist_ok=True)
+
+    leagues = []
+    for position in range(counts["leagues"]):
+        region = REGIONS[position % len(REGIONS)]
+        name = f"vct_{region.lower()}_{position}"
+        leagues.append({
+            "league_id": ids.next(),
+            "region": region,
+            "dark_logo_url": f"http://static.lolesports.com/leagues/{name}_dark.png",
+            "light_logo_url": f"http://static.lolesports.com/leagues/{name}_light.png",
+            "name": name,
+            "slug": name,
+        })
+
+    tournaments = []
+    for position in range(counts["tournaments"]):
+        league = leagues[position % len(leagues)]
+        tournaments.append({
+            "id": ids.next(),
+            "status": "published",
+            "league_id": league["league_id"],
+            "time_zone": "Etc/UTC",
+            "name": f"{league['name']}_{STAGES[position % len(STAGES)]}_{2021 + position // len(leagues) % 4}",
+        })
+
+    teams = []
+    teams_by_league = {}
+    for position in range(counts["teams"]):
+        league = leagues[position % len(leagues)]
+        name = f"{rng.choice(TEAM_WORDS)} {rng.choice(TEAM_SUFFIXES)} {position}"
+        team = {
+            "id": ids.next(),
+            "acronym": "".join(word[0] for word in name.split()[:2]) + str(position),
+            "home_league_id": league["league_id"],
+            "dark_logo_url": f"http://static.lolesports.com/teams/{position}_dark.png",
+            "light_logo_url": f"http://static.lolesports.com/teams/{position}_light.png",
+            "slug": name.lower().replace(" ", "-"),
+            "name": name,
+        }
+        teams.append(team)
+        teams_by_league.setdefault(league["league_id"], []).append(team)
+
+    players = []
+    roster = {}
+    for position in range(counts["players"]):
+        team = teams[position % len(teams)]
+        player = {
+            "id": ids.next(),
+            "handle": _handle(rng, position),
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "status": "active",
+            "photo_url": None,
+            "home_team_id": team["id"],
+            "created_at": _timestamp(rng),
+            "updated_at": _timestamp(rng),
+        }
+        players.append(player)
+        roster.setdefault(team["id"], []).append(player["id"])
+
+    def player_rows():
+        repeats = counts["player_rows"] / counts["players"]
+        for player in players:
+            for _ in range(max(1, round(rng.uniform(1, 2 * repeats - 1)))):
+                yield dict(player, updated_at=_timestamp(rng))
+
+    def lineup(team):
+        members = roster.get(team["id"], [])
+        members = rng.sample(members, 5) if len(members) >= 5 else members + [rng.choice(players)["id"] for _ in range(5 - len(members))]
+        return [_typo(player_id, rng) if rng.random() < FUZZY_PARTICIPANT_RATE else player_id for player_id in members]
+
+    def games():
+        for _ in range(counts["games"]):
+            tournament = rng.choice(tournaments)
+            pool = teams_by_league.get(tournament["league_id"]) or teams
+            home, away = rng.sample(pool, 2) if len(pool) > 1 else (pool[0], rng.choice(teams))
+            team_ids = [team["id"] if rng.random() >= UNKNOWN_TEAM_RATE else ids.next() for team in (home, away)]
+            participants = lineup(home) + lineup(away)
+            yield {
+                "platformGameId": f"val:{uuid.UUID(int=rng.getrandbits(128), version=4)}",
+                "matchId": ids.next(),
+                "esportsGameId": ids.next(),
+                "tournamentId": tournament["id"],
+                "teamMapping": {"21": team_ids[1], "22": team_ids[0]},
+                "participantMapping": {str(slot): player_id for slot, player_id in enumerate(participants, start=1)},
+            }
+
+    _write_array(os.path.join(dest, "leagues.json.gz"), leagues)
+    _write_array(os.path.join(dest, "tournaments.json.gz"), tournaments)
+    _write_array(os.path.join(dest, "teams.json.gz"), teams)
+    _write_array(os.path.join(dest, "players.json.gz"), player_rows())
+
+    # mapping_data carries the same games as v2 (without matchId, older team slots), and a
+    # share of them disagree so that v2 precedence matters. Both files are written from the
+    # same generator state instead of holding every game in memory.
+    v1_rng = random.Random(seed + 1)
+
+    def v1_games():
+        for game in games():
+            game.pop("matchId")
+            game["teamMapping"] = dict(zip(("18", "19"), game["teamMapping"].values()))
+            if v1_rng.random() < V1_DIFFERENT_RATE:
+                game["tournamentId"] = v1_rng.choice(tournaments)["id"]
+            yield game
+
+    state, next_id = rng.getstate(), ids.current
+    _write_array(os.path.join(dest, "mapping_data_v2.json.gz"), games())
+    rng.setstate(state)
+    ids.current = next_id
+    _write_array(os.path.join(dest, "mapping_data.json.gz"), v1_games())
+
+    with open(os.path.join(dest, MARKER_FILE), "w", encoding="utf-8") as f:
+        json.dump({"version": GENERATOR_VERSION, "scale": scale, "seed": seed, "counts": counts}, f)
+    return dest
+
+
+# Generated folder for scale/seed under root, reused while the generator is unchanged
+def dataset_folder(root, scale=1, seed=0):
+    dest = os.path.join(root, f"esports-data-x{scale:g}-seed{seed}")
+    try:
+        with open(os.path.join(dest, MARKER_FILE), encoding="utf-8") as f:
+            marker = json.load(f)
+        if marker.get("version") == GENERATOR_VERSION:
+            return dest
+    except (OSError, ValueError):
+        pass
+    return generate_dataset(dest, scale, seed)
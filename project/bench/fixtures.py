@@ -0,0 +1,101 @@
+import os
+import random
+
+from utils.utils import agent_roles
+
+from .dataset import GENERATOR_VERSION, SYLLABLES
+
+STATS_ROW_COUNTS = (10, 100, 1000, 5000)
+
+_PAGE = """<!DOCTYPE html>
+<html>
+<head><title>Valorant Player Stats | VLR.gg</title></head>
+<body>
+<div class="wf-card mod-table mod-dark">
+<table class="wf-table mod-stats mod-scroll">
+<thead>
+<tr>
+<th>Player</th><th>Agents</th><th>Rnd</th><th>R</th><th>ACS</th><th>K:D</th><th>KAST</th><th>ADR</th>
+<th>KPR</th><th>APR</th><th>FKPR</th><th>FDPR</th><th>HS%</th><th>CL%</th><th>CL</th><th>KMax</th>
+</tr>
+</thead>
+<tbody>
+{rows}
+</tbody>
+</table>
+</div>
+</body>
+</html>
+"""
+
+_ROW = """<tr>
+<td class="mod-player mod-a">
+<a href="/player/{player_id}/{slug}">
+<div class="text-of">{player}</div>
+<div class="stats-player-country">{org}</div>
+</a>
+</td>
+<td class="mod-agents">
+<div>
+{agents}
+</div>
+</td>
+<td class="mod-rnd">{rounds}</td>
+{color_sq}
+<td class="mod-cl">{clutches}</td>
+<td class="mod-a mod-kmax">{kmax}</td>
+</tr>"""
+
+
+def _color_sq(value):
+    return f'<td class="mod-color-sq"><div class="color-sq"><span>{value}</span></div></td>'
+
+
+# A vlr.gg stats page with the same markup parse_stats reads, one row per player
+def stats_html(rows, seed=0):
+    rng = random.Random(seed)
+    agents = sorted(agent_roles)
+    orgs = ["".join(rng.choice(SYLLABLES) for _ in range(2)).upper()[:4] for _ in range(max(1, rows // 5))]
+    rendered = []
+    for position in range(rows):
+        player = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize() + str(position)
+        played = rng.sample(agents, rng.randint(1, 3))
+        clutches = rng.randint(0, 30)
+        stats = [
+            f"{rng.uniform(0.7, 1.4):.2f}",
+            f"{rng.uniform(150, 280):.1f}",
+            f"{rng.uniform(0.6, 1.6):.2f}",
+            f"{rng.randint(60, 82)}%",
+            f"{rng.uniform(100, 180):.1f}",
+            f"{rng.uniform(0.5, 1.0):.2f}",
+            f"{rng.uniform(0.1, 0.5):.2f}",
+            f"{rng.uniform(0.05, 0.25):.2f}",
+            f"{rng.uniform(0.05, 0.2):.2f}",
+            f"{rng.randint(15, 40)}%",
+            f"{rng.randint(5, 35)}%" if clutches else "",
+        ]
+        rendered.append(_ROW.format(
+            player_id=position,
+            slug=player.lower(),
+            player=player,
+            org=rng.choice(orgs),
+            agents="\n".join(f'<img src="/img/vlr/game/agents/{agent}.png" alt="{agent}">' for agent in played),
+            rounds=rng.randint(200, 2000),
+            color_sq="\n".join(_color_sq(value) for value in stats),
+            clutches=f"{clutches}/{clutches + rng.randint(20, 120)}",
+            kmax=rng.randint(20, 40),
+        ))
+    return _PAGE.format(rows="\n".join(rendered))
+
+
+# Saved pages under dest, one per row count; returns {rows: path}
+def write_stats_fixtures(dest, row_counts=STATS_ROW_COUNTS, seed=0):
+    os.makedirs(dest, exist_ok=True)
+    paths = {}
+    for rows in row_counts:
+        path = os.path.join(dest, f"stats-{rows}-v{GENERATOR_VERSION}-seed{seed}.html")
+        if not os.path.isfile(path):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(stats_html(rows, seed))
+        paths[rows] = path
+    return paths
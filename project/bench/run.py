@@ -0,0 +1,373 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .dataset import dataset_folder
+from .fixtures import STATS_ROW_COUNTS, write_stats_fixtures
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_WORK_DIR = os.path.join(PROJECT_DIR, ".cache", "bench")
+DEFAULT_SCALES = (1, 10)
+DEFAULT_QUERIES = 200
+RESOLVE_ROWS = 10000  # a full stats scrape
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def _typo(name, rng):
+    if len(name) < 4:
+        return name
+    position = rng.randrange(1, len(name) - 1)
+    return name[:position] + name[position + 1:]
+
+
+# Each case does its setup and returns the timed body, which returns how many items it processed
+def case_load_json(folder, **_):
+    from esportsdata.loader import load_json
+
+    def run():
+        data = load_json(folder)
+        return sum(len(records) for records in data.values())
+    return run
+
+
+def case_link_data(folder, **_):
+    from esportsdata.loader import link_data, load_json
+    data = load_json(folder)
+
+    def run():
+        return len(link_data(data))
+    return run
+
+
+# The chatbot's player and team branches: find, then resolve team, games and roster
+def case_lookups(folder, queries=DEFAULT_QUERIES, seed=0, **_):
+    from esportsdata.ingest import Ingestor
+    ingestor = Ingestor(folder)
+    index = ingestor.build()
+
+    rng = random.Random(seed)
+    handles = [index.players[player_ids[0]]["handle"] for player_ids in index.players_by_handle.values()]
+    team_names = [team["name"] for team in index.teams.values()]
+    player_queries = [rng.choice(handles) for _ in range(queries // 2)]
+    player_queries += [_typo(rng.choice(handles), rng) for _ in range(queries // 4)]
+    team_queries = [rng.choice(team_names) for _ in range(queries - len(player_queries))]
+
+    def run():
+        resolved = 0
+        for query in player_queries:
+            for player in index.find_players(query):
+                index.team_for_player(player)
+                resolved += len({game["tournament_info"].get("name") for game in index.games_for_player(player)})
+        for query in team_queries:
+            for team in index.find_teams(query):
+                index.league_for_team(team)
+                resolved += len(index.games_for_team(team)) + len(index.roster(team))
+        return len(player_queries) + len(team_queries)
+    return run
+
+
+# The same kind of player lookups through the shard registry, for players of one league.
+# Each run starts from a fresh registry, so it includes loading the shards from their
+# snapshots; peak RSS shows that only that league's shards were loaded.
+def case_shard_lookups(folder, queries=DEFAULT_QUERIES, seed=0, **_):
+    from esportsdata.shards import ShardRegistry, split_dataset
+    root = folder.rstrip(os.sep) + "-shards"
+    if not ShardRegistry(root).catalogs:
+        split_dataset([folder], root)
+    league = ShardRegistry(root).keys()[-1][0]
+    for key in ShardRegistry(root).keys(league):
+        ShardRegistry(root).index(key)  # build snapshots outside the timed runs
+
+    rng = random.Random(seed)
+    catalogs = ShardRegistry(root).catalogs
+    handles = sorted({handle for key in catalogs if key[0] == league for handle in catalogs[key]["handles"]})
+    player_queries = [rng.choice(handles) for _ in range(queries * 3 // 4)]
+    player_queries += [_typo(rng.choice(handles), rng) for _ in range(queries - len(player_queries))]
+
+    def run():
+        registry = ShardRegistry(root)
+        resolved = 0
+        for query in player_queries:
+            for player in registry.find_players(query, league=league):
+                resolved += len(registry.games_for_player(player, league=league))
+        return len(player_queries)
+    return run
+
+
+# Scraped (player, org) rows against the dataset's players: most are handles as listed with
+# the team acronym, the rest change case or punctuation, have a typo, carry another org,
+# or name nobody in the data
+def case_resolve_players(folder, seed=0, **_):
+    from esportsdata.ingest import Ingestor
+    from vlrdata.resolve import Resolver
+    index = Ingestor(folder).build()
+
+    rng = random.Random(seed)
+    players = list(index.players.values())
+    acronyms = [team["acronym"] for team in index.teams.values()]
+    pairs = []
+    for position in range(RESOLVE_ROWS):
+        player = rng.choice(players)
+        handle = player["handle"]
+        org = index.teams.get(player.get("home_team_id"), {}).get("acronym") or "N/A"
+        kind = rng.random()
+        if kind < 0.1:
+            handle = handle.upper() + "."
+        elif kind < 0.2:
+            handle = _typo(handle, rng)
+        elif kind < 0.25:
+            org = rng.choice(acronyms)
+        elif kind < 0.3:
+            handle = f"ghost{position}"
+        pairs.append((handle, org))
+
+    def run():
+        return len(Resolver(index).resolve_all(pairs))
+    return run
+
+
+def case_parse_stats(html_path, **_):
+    from vlrdata.vlr_fetch import parse_stats
+    with open(html_path, encoding="utf-8") as f:
+        text = f.read()
+
+    def run():
+        return len(parse_stats(text))
+    return run
+
+
+def case_find_player_stats(html_path, queries=DEFAULT_QUERIES, seed=0, **_):
+    from vlrdata.vlr_fetch import build_player_index, find_player_stats, parse_stats
+    with open(html_path, encoding="utf-8") as f:
+        data = {"data": {"status": 200, "segments": parse_stats(f.read())}}
+    index = build_player_index(data)
+
+    rng = random.Random(seed)
+    names = [row["player"] for row in data["data"]["segments"]]
+    lookups = [rng.choice(names) for _ in range(queries // 2)]
+    lookups += [_typo(rng.choice(names), rng) for _ in range(queries // 4)]
+    lookups += [f"ghost{position}" for position in range(queries - len(lookups))]
+
+    def run():
+        for name in lookups:
+            find_player_stats(name, data, index)
+        return len(lookups)
+    return run
+
+
+# Two maps' comps as the roster builder's map pool: nine distinct agents to cover
+MAP_POOL = {
+    "ascent": ["jett", "sova", "killjoy", "omen", "kayo"],
+    "split": ["raze", "skye", "omen", "viper", "cypher"],
+}
+
+
+def case_build_rosters(html_path, **_):
+    from vlrdata.table import StatsTable
+    from vlrdata.team_builder import build_rosters
+    from vlrdata.vlr_fetch import parse_stats
+    with open(html_path, encoding="utf-8") as f:
+        table = StatsTable.from_segments(parse_stats(f.read()))
+
+    def run():
+        build_rosters(table)
+        build_rosters(table, map_pool=MAP_POOL)
+        return 2
+    return run
+
+
+DATASET_CASES = {
+    "load_json": case_load_json,
+    "link_data": case_link_data,
+    "lookups": case_lookups,
+    "resolve_players": case_resolve_players,
+    "shard_lookups": case_shard_lookups,
+}
+HTML_CASES = {
+    "parse_stats": case_parse_stats,
+    "find_player_stats": case_find_player_stats,
+    "build_rosters": case_build_rosters,
+}
+CASES = {**DATASET_CASES, **HTML_CASES}
+
+
+# Runs in a fresh process so peak RSS belongs to this case alone
+def run_case(name, params, repeat):
+    rss_start = peak_rss_mb()
+    start = time.perf_counter()
+    run = CASES[name](**params)
+    setup_seconds = time.perf_counter() - start
+    rss_setup = peak_rss_mb()
+
+    times = []
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = run()
+        times.append(time.perf_counter() - start)
+
+    median = statistics.median(times)
+    return {
+        "setup_seconds": setup_seconds,
+        "wall_seconds": times,
+        "median_seconds": median,
+        "min_seconds": min(times),
+        "items": items,
+        "items_per_second": items / median if median else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "setup_peak_rss_mb": rss_setup,
+        "start_peak_rss_mb": rss_start,
+    }
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=PROJECT_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain"], cwd=PROJECT_DIR, capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def plan(cases, scales, row_counts, work_dir, queries, seed):
+    runs = []
+    for name in cases:
+        if name in DATASET_CASES:
+            for scale in scales:
+                folder = dataset_folder(os.path.join(work_dir, "data"), scale, seed)
+                runs.append((name, f"x{scale:g}", {"folder": folder, "queries": queries, "seed": seed}))
+        else:
+            paths = write_stats_fixtures(os.path.join(work_dir, "fixtures"), row_counts, seed)
+            for rows, path in paths.items():
+                runs.append((name, f"rows={rows}", {"html_path": path, "queries": queries, "seed": seed}))
+    return runs
+
+
+def run_all(cases, scales, row_counts, work_dir, repeat, queries, seed):
+    commit, dirty = git_revision()
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": repeat,
+        "seed": seed,
+        "results": [],
+    }
+    context = multiprocessing.get_context("spawn")
+    for name, label, params in plan(cases, scales, row_counts, work_dir, queries, seed):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(run_case, name, params, repeat).result()
+        result = {"case": name, "label": label, **result}
+        report["results"].append(result)
+        print(
+            f"{name:<18} {label:<11} {result['median_seconds'] * 1000:10.1f} ms"
+            f"  {result['items_per_second'] or 0:12.0f} items/s  {result['peak_rss_mb']:8.1f} MB peak RSS",
+            flush=True,
+        )
+    return report
+
+
+def write_report(report, output=None, work_dir=DEFAULT_WORK_DIR):
+    if output is None:
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+        output = os.path.join(work_dir, "results", f"{stamp}-{(report['commit'] or 'nogit')[:10]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return output
+
+
+# Median time of each case in new relative to base. Returns the cases slower than threshold.
+def compare(base, new, threshold=0.1):
+    base_results = {(result["case"], result["label"]): result for result in base["results"]}
+    regressions = []
+    print(f"{'case':<18} {'label':<11} {'base ms':>10} {'new ms':>10} {'change':>8}")
+    for result in new["results"]:
+        key = (result["case"], result["label"])
+        if key not in base_results:
+            continue
+        before, after = base_results[key]["median_seconds"], result["median_seconds"]
+        change = (after - before) / before if before else 0.0
+        flag = " REGRESSION" if change > threshold else ""
+        print(f"{key[0]:<18} {key[1]:<11} {before * 1000:10.1f} {after * 1000:10.1f} {change:+8.1%}{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Offline benchmarks for loading, linking, lookups and vlr.gg parsing")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="run benchmarks and save the results (default)")
+    run_parser.add_argument("--case", action="append", choices=sorted(CASES), help="case to run (repeatable, default all)")
+    run_parser.add_argument("--scale", action="append", type=float, help="dataset size relative to esports-data, e.g. 1, 10, 100, 1000 (repeatable)")
+    run_parser.add_argument("--rows", action="append", type=int, help="stats page row count (repeatable)")
+    run_parser.add_argument("--repeat", type=int, default=3, help="timed runs per case")
+    run_parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES, help="lookups per run for the query cases")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="where generated data and results are kept")
+    run_parser.add_argument("--output", help="results file (default: <work-dir>/results/<time>-<commit>.json)")
+
+    generate_parser = subparsers.add_parser("generate", help="only generate the datasets and fixtures")
+    generate_parser.add_argument("--scale", action="append", type=float)
+    generate_parser.add_argument("--rows", action="append", type=int)
+    generate_parser.add_argument("--seed", type=int, default=0)
+    generate_parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR)
+
+    startup_parser = subparsers.add_parser("startup", help="time cold imports and CLI queries against their budgets")
+    startup_parser.add_argument("--repeat", type=int, default=5, help="timed runs per case")
+    startup_parser.add_argument("--slack", type=float, default=1.0, help="multiply every budget by this, for slow machines")
+    startup_parser.add_argument("--data-dir", default=os.path.join(PROJECT_DIR, "esports-data"), help="esports-data folder for the vct cases")
+    startup_parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR)
+
+    compare_parser = subparsers.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="slowdown that counts as a regression")
+
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0].startswith("-") and argv[0] not in ("-h", "--help"):
+        argv = ["run", *argv]
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        return 1 if compare(base, new, args.threshold) else 0
+
+    if args.command == "startup":
+        from .startup import run_startup
+        _, ok = run_startup(args.data_dir, args.work_dir, args.repeat, args.slack)
+        return 0 if ok else 1
+
+    scales = args.scale or DEFAULT_SCALES
+    row_counts = args.rows or STATS_ROW_COUNTS
+    if args.command == "generate":
+        for scale in scales:
+            print(dataset_folder(os.path.join(args.work_dir, "data"), scale, args.seed))
+        for path in write_stats_fixtures(os.path.join(args.work_dir, "fixtures"), row_counts, args.seed).values():
+            print(path)
+        return 0
+
+    report = run_all(args.case or list(CASES), scales, row_counts, args.work_dir, args.repeat, args.queries, args.seed)
+    print(write_report(report, args.output, args.work_dir))
+    return 0
@@ -0,0 +1,103 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules a data-only entry point must never load
+LLM_AND_UI = ("langchain", "langchain_aws", "boto3", "botocore", "streamlit")
+SCRAPER = ("requests", "selectolax")
+HEAVY = (*LLM_AND_UI, *SCRAPER, "scipy", "fuzzywuzzy")
+
+# (name, argv after the interpreter, wall-time budget in seconds, modules that must not load).
+# Times are for a whole fresh process, interpreter startup included. {data_dir} and
+# {stats_store} are filled in by run_startup.
+STARTUP_CASES = [
+    ("import esportsdata", ["-c", "import esportsdata"], 0.15, (*HEAVY, "numpy")),
+    ("import vlrdata", ["-c", "import vlrdata"], 0.15, (*HEAVY, "numpy")),
+    ("import llm, retrieval", ["-c", "import llm, retrieval"], 0.15, (*HEAVY, "numpy")),
+    ("service client", ["-c", "from service import get_service_client"], 0.2, (*HEAVY, "numpy", "esportsdata")),
+    ("vct player", ["vct.py", "--data-dir", "{data_dir}", "player", "TenZ"], 0.4, (*HEAVY, "numpy")),
+    ("vct team", ["vct.py", "--data-dir", "{data_dir}", "team", "SEN"], 0.4, (*HEAVY, "numpy")),
+    ("vct top", ["vct.py", "--stats-store", "{stats_store}", "top", "rating", "-k", "10"], 0.5, HEAVY),
+]
+
+# Runs the entry point in this fresh interpreter, then writes which of the forbidden
+# modules it loaded to the result file
+_HARNESS = """
+import json, runpy, sys
+result_path, forbidden, argv = sys.argv[1], sys.argv[2].split(","), sys.argv[3:]
+sys.path.insert(0, ".")
+try:
+    if argv[0] == "-c":
+        exec(compile(argv[1], "<startup>", "exec"), {"__name__": "__main__"})
+    else:
+        sys.argv = argv
+        runpy.run_path(argv[0], run_name="__main__")
+except SystemExit:
+    pass
+with open(result_path, "w") as f:
+    json.dump(sorted(name for name in forbidden if name in sys.modules), f)
+"""
+
+
+def _run(argv, forbidden):
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        result_path = f.name
+    try:
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", _HARNESS, result_path, ",".join(forbidden), *argv],
+            cwd=PROJECT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True,
+        )
+        seconds = time.perf_counter() - start
+        with open(result_path, encoding="utf-8") as f:
+            return seconds, json.load(f)
+    finally:
+        os.unlink(result_path)
+
+
+# A stats store with one snapshot of the generated stats page, for the top-k case
+def stats_store(work_dir, seed=0):
+    from vlrdata.store import StatsStore
+    from vlrdata.vlr_fetch import parse_stats
+
+    from .fixtures import write_stats_fixtures
+
+    root = os.path.join(work_dir, "startup-store")
+    store = StatsStore(root)
+    if not store.partitions():
+        html_path = write_stats_fixtures(os.path.join(work_dir, "fixtures"), (1000,), seed)[1000]
+        with open(html_path, encoding="utf-8") as f:
+            store.append_segments("na", "60", "2024-01-01", parse_stats(f.read()))
+    return root
+
+
+# Times every case in fresh processes against its budget. The first run of each case is
+# not timed, so snapshots and OS file caches are warm. Returns the results and whether
+# every case stayed within its budget and loaded none of its forbidden modules.
+def run_startup(data_dir, work_dir, repeat=5, slack=1.0):
+    paths = {"data_dir": data_dir, "stats_store": stats_store(work_dir)}
+    results = []
+    ok = True
+    for name, argv, budget, forbidden in STARTUP_CASES:
+        argv = [arg.format(**paths) for arg in argv]
+        _run(argv, forbidden)
+        times, loaded = [], []
+        for _ in range(repeat):
+            seconds, loaded = _run(argv, forbidden)
+            times.append(seconds)
+        median = statistics.median(times)
+        passed = median <= budget * slack and not loaded
+        ok = ok and passed
+        results.append({"case": name, "median_seconds": median, "budget_seconds": budget * slack, "forbidden_loaded": loaded, "passed": passed})
+        print(
+            f"{name:<22} {median * 1000:8.1f} ms  budget {budget * slack * 1000:6.0f} ms"
+            f"  {'ok' if passed else 'OVER BUDGET' if not loaded else 'loaded ' + ', '.join(loaded)}",
+            flush=True,
+        )
+    return results, ok
@@ -1,44 +1,214 @@
-import requests
+import argparse
 import json
-import gzip
-import shutil
 import os
-from io import BytesIO
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from esportsdata.shards import ALL_YEARS, tournament_years
+from esportsdata.stream import iter_json_file
 
 S3_BUCKET_URL = "https://vcthackathon-data.s3.us-west-2.amazonaws.com"
 
 LEAGUE = "game-changers"
 YEAR = 2022
 
-def download_gzip_and_write_to_json(file_name):
-    if os.path.isfile(f"{file_name}.json"):
-        return False
+ESPORTS_DATA_FILES = ["leagues", "tournaments", "players", "teams", "mapping_data"]
+MANIFEST_FILE = ".sync.json"  # ETag/size of every completed download, per destination folder
+MANIFEST_SAVE_INTERVAL = 2.0  # seconds; an interrupted sync re-checks at most this much work
+RETRIES = 3
+
+
+# The body ended before Content-Length; retried like any other request error
+class IncompleteDownload(requests.exceptions.RequestException):
+    pass
+
+
+def make_session(workers):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
-    remote_file = f"{S3_BUCKET_URL}/{file_name}.json.gz"
-    retries = 3
 
-    for attempt in range(retries):
+class SyncManifest:
+    def __init__(self, dest):
+        self.path = os.path.join(dest, MANIFEST_FILE)
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.isfile(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def get(self, key):
+        with self.lock:
+            return self.entries.get(key)
+
+    def set(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+
+    def save(self):
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(f"{self.path}.tmp", self.path)
+
+
+# Download one bucket key to dest/key, streaming to a .part file that later attempts resume with a Range request.
+# Returns "skipped", "downloaded" or "missing".
+def download_file(session, key, dest, manifest, base_url=S3_BUCKET_URL):
+    url = f"{base_url}/{key}"
+    output_file_name = os.path.join(dest, key)
+    part_file_name = f"{output_file_name}.part"
+
+    for attempt in range(RETRIES):
         try:
-            response = requests.get(remote_file, stream=True)
-
-            if response.status_code == 200:
-                gzip_bytes = BytesIO(response.content)
-                with gzip.GzipFile(fileobj=gzip_bytes, mode="rb") as gzipped_file:
-                    output_file_name = f"{file_name}.json"
-                    with open(output_file_name, 'w', encoding='utf-8') as json_file:
-                        json_data = json.load(gzipped_file)
-                        json.dump(json_data, json_file, indent=4)
-                    print(f"{output_file_name} written successfully.")
-                return True
-            elif response.status_code == 404:
-                print(f"File {file_name} not found on server.")
-                return False
+            head = session.head(url, timeout=30)
+            if head.status_code == 404:
+                return "missing"
+            head.raise_for_status()
+            etag = head.headers.get("ETag", "")
+            size = int(head.headers.get("Content-Length", -1))
+
+            recorded = manifest.get(key)
+            if (
+                recorded and os.path.isfile(output_file_name)
+                and recorded["etag"] == etag and recorded["size"] == size == os.path.getsize(output_file_name)
+            ):
+                return "skipped"
+
+            os.makedirs(os.path.dirname(output_file_name), exist_ok=True)
+            headers = {}
+            offset = os.path.getsize(part_file_name) if os.path.isfile(part_file_name) else 0
+            # Only resume a partial file that belongs to the same object version
+            if offset and etag and recorded and recorded.get("partial_etag") == etag and offset < size:
+                headers = {"Range": f"bytes={offset}-", "If-Range": etag}
             else:
-                print(f"Failed to download {file_name}. Status code: {response.status_code}")
+                offset = 0
+            manifest.set(key, {"etag": "", "size": -1, "partial_etag": etag})
+
+            with session.get(url, headers=headers, stream=True, timeout=60) as response:
+                if response.status_code == 404:
+                    return "missing"
+                response.raise_for_status()
+                mode = "ab" if headers and response.status_code == 206 else "wb"
+                with open(part_file_name, mode) as part_file:
+                    for chunk in response.iter_content(chunk_size=1 << 16):
+                        part_file.write(chunk)
+
+            if size >= 0 and os.path.getsize(part_file_name) != size:
+                raise IncompleteDownload(
+                    f"{key}: got {os.path.getsize(part_file_name)} of {size} bytes"
+                )
+            os.replace(part_file_name, output_file_name)
+            manifest.set(key, {"etag": etag, "size": os.path.getsize(output_file_name)})
+            return "downloaded"
         except requests.exceptions.RequestException as e:
-            print(f"Download failed (attempt {attempt+1}/{retries}): {e}")
-            if attempt < retries - 1:
+            print(f"Download of {key} failed (attempt {attempt+1}/{RETRIES}): {e}")
+            if attempt < RETRIES - 1:
                 time.sleep(2 ** attempt)
             else:
-                return False
+                raise
+
+
+def esports_data_keys(leagues, kinds):
+    return [f"{league}/esports-data/{kind}.json.gz" for league in leagues for kind in kinds]
+
+
+# Per-game files are listed by the league's mapping file, under the year of each game's
+# tournament, so both have to be synced first. A game whose year can't be told is tried
+# under every requested year.
+def game_keys(dest, league, years):
+    folder = os.path.join(dest, league, "esports-data")
+    mapping_file = os.path.join(folder, "mapping_data.json.gz")
+    if not os.path.isfile(mapping_file):
+        print(f"No mapping data for {league}, skipping games.")
+        return []
+    tournaments_file = os.path.join(folder, "tournaments.json.gz")
+    if os.path.isfile(tournaments_file):
+        years_by_tournament = tournament_years({tournament["id"]: tournament for tournament in iter_json_file(tournaments_file)})
+    else:
+        print(f"No tournaments for {league}, trying every game under every year.")
+        years_by_tournament = {}
+
+    wanted = {str(year) for year in years}
+    keys = []
+    for mapping in iter_json_file(mapping_file):
+        year = years_by_tournament.get(mapping.get("tournamentId", ""), ALL_YEARS)
+        for game_year in sorted(wanted) if year == ALL_YEARS else [year] if year in wanted else []:
+            keys.append(f"{league}/games/{game_year}/{mapping['platformGameId']}.json.gz")
+    return keys
+
+
+def download_all(session, keys, dest, manifest, workers, base_url):
+    results = {"downloaded": 0, "skipped": 0, "missing": 0, "failed": 0}
+    saved = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(download_file, session, key, dest, manifest, base_url): key for key in keys}
+            for done, future in enumerate(as_completed(futures), start=1):
+                key = futures[future]
+                try:
+                    status = future.result()
+                except (requests.exceptions.RequestException, OSError) as e:
+                    print(f"Giving up on {key}: {e}")
+                    status = "failed"
+                results[status] += 1
+                if status != "skipped":
+                    print(f"[{done}/{len(keys)}] {status}: {key}")
+                # Persist progress regularly so an interrupted sync knows what is already complete
+                if status != "skipped" and time.monotonic() - saved >= MANIFEST_SAVE_INTERVAL:
+                    manifest.save()
+                    saved = time.monotonic()
+    finally:
+        manifest.save()
+    return results
+
+
+def sync(leagues, years, kinds=ESPORTS_DATA_FILES, games=False, dest=".", workers=16, base_url=S3_BUCKET_URL):
+    manifest = SyncManifest(dest)
+    start = time.time()
+    if games:
+        # game_keys reads these to list the games of each year
+        kinds = [*kinds, *(kind for kind in ("tournaments", "mapping_data") if kind not in kinds)]
+    with make_session(workers) as session:
+        results = download_all(session, esports_data_keys(leagues, kinds), dest, manifest, workers, base_url)
+        if games:
+            keys = [key for league in leagues for key in game_keys(dest, league, years)]
+            for status, count in download_all(session, keys, dest, manifest, workers, base_url).items():
+                results[status] += count
+    print(f"Sync finished in {time.time() - start:.1f}s: {results}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync VCT hackathon data from S3")
+    parser.add_argument("--league", action="append", dest="leagues", help=f"league to sync (default {LEAGUE})")
+    parser.add_argument("--year", action="append", dest="years", type=int, help=f"year of game files (default {YEAR})")
+    parser.add_argument("--kind", action="append", dest="kinds", choices=ESPORTS_DATA_FILES, help="esports-data file to sync (default all)")
+    parser.add_argument("--games", action="store_true", help="also sync per-game files listed in mapping_data (also syncs tournaments and mapping_data)")
+    parser.add_argument("--dest", default=".", help="local folder that mirrors the bucket layout")
+    parser.add_argument("--workers", type=int, default=16, help="concurrent downloads")
+    parser.add_argument("--base-url", default=S3_BUCKET_URL, help="bucket URL, e.g. a local stand-in")
+    args = parser.parse_args(argv)
+
+    results = sync(
+        args.leagues or [LEAGUE],
+        args.years or [YEAR],
+        kinds=args.kinds or ESPORTS_DATA_FILES,
+        games=args.games,
+        dest=args.dest,
+        workers=args.workers,
+        base_url=args.base_url.rstrip("/"),
+    )
+    return 1 if results["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,20 @@
+from utils.lazy import lazy_exports
+
+# Analytics pulls in SciPy, so nothing is imported until it is used
+_EXPORTS = {
+    "EntityIndex": ".index",
+    "Analytics": ".analytics",
+    "get_analytics": ".analytics",
+    "load_json": ".loader",
+    "link_data": ".loader",
+    "FolderWatcher": ".ingest",
+    "Ingestor": ".ingest",
+    "get_ingestor": ".snapshot",
+    "load_index": ".snapshot",
+    "load_ingestor": ".snapshot",
+    "ShardRegistry": ".shards",
+    "get_registry": ".shards",
+    "split_dataset": ".shards",
+}
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,5 @@
+import sys
+
+from .snapshot import main
+
+sys.exit(main())
@@ -0,0 +1,247 @@
+import threading
+
+import numpy as np
+from scipy import sparse
+
+from utils.metrics import span, timed
+
+from .index import normalize_key
+
+
+def _grow(matrix, shape):
+    if matrix.shape != shape:
+        matrix = matrix.tolil()
+        matrix.resize(shape)
+    return matrix.tocsr()
+
+
+def _top(values, k):
+    if k < len(values):
+        candidates = np.argpartition(-values, k)[:k]
+    else:
+        candidates = np.arange(len(values))
+    return candidates[np.argsort(-values[candidates], kind="stable")]
+
+
+# Co-occurrence counts over the linked games of an EntityIndex, as sparse matrices indexed
+# by the index's player / team / tournament codes:
+#   teammates[a, b]     games a and b played on the same side
+#   opponents[a, b]     games a and b played on opposite sides
+#   player_teams[p, t]  games p played for team t
+#   player_tournaments[p, t], team_tournaments[t, u]  appearances per tournament
+# The side of a participant comes from their mapping slot (see GameRecord). Every game adds an outer product to these sums, so
+# refresh() only adds the games that changed and subtracts what they replaced.
+class Analytics:
+    def __init__(self, index):
+        self.index = index
+        self.records = {}  # game code -> GameRecord counted in the matrices
+        self.version = -1
+        self.teammates = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self.opponents = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self.player_teams = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self.player_tournaments = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self.team_tournaments = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self._lock = threading.Lock()
+        self.refresh()
+
+    # Rows of (player, team, side column, flipped side column, tournament) for each
+    # participant of records; side columns are 2 * position + side
+    def _appearances(self, records):
+        players, teams, sides, tournaments, positions = [], [], [], [], []
+        for position, record in enumerate(records):
+            players.extend(record.participants)
+            teams.extend(record.participant_teams())
+            sides.extend(record.sides)
+            tournaments.extend([record.tournament] * len(record.participants))
+            positions.extend([position] * len(record.participants))
+        players = np.array(players, dtype=np.int32)
+        positions = np.array(positions, dtype=np.int32)
+        sides = np.array(sides, dtype=np.int32)
+        return players, np.array(teams, dtype=np.int32), 2 * positions + sides, 2 * positions + 1 - sides, np.array(tournaments, dtype=np.int32)
+
+    # The matrix sums contributed by records, at the given shapes
+    def _counts(self, records, players_n, teams_n, tournaments_n):
+        players, teams, sides, flipped, tournaments = self._appearances(records)
+        ones = np.ones(len(players), dtype=np.int32)
+        columns = 2 * len(records)
+        side_matrix = sparse.csr_matrix((ones, (players, sides)), shape=(players_n, columns))
+        flipped_matrix = sparse.csr_matrix((ones, (players, flipped)), shape=(players_n, columns))
+
+        teammates = (side_matrix @ side_matrix.T).tocsr()
+        teammates.setdiag(0)
+        opponents = (side_matrix @ flipped_matrix.T).tocsr()
+
+        known_team = teams >= 0
+        player_teams = sparse.csr_matrix(
+            (ones[known_team], (players[known_team], teams[known_team])), shape=(players_n, teams_n)
+        )
+        known_tournament = tournaments >= 0
+        player_tournaments = sparse.csr_matrix(
+            (ones[known_tournament], (players[known_tournament], tournaments[known_tournament])), shape=(players_n, tournaments_n)
+        )
+
+        game_teams = [(team, record.tournament) for record in records for team in record.teams if record.tournament >= 0]
+        team_codes = np.array([team for team, _ in game_teams], dtype=np.int32)
+        tournament_codes = np.array([tournament for _, tournament in game_teams], dtype=np.int32)
+        team_tournaments = sparse.csr_matrix(
+            (np.ones(len(game_teams), dtype=np.int32), (team_codes, tournament_codes)), shape=(teams_n, tournaments_n)
+        )
+        return teammates, opponents, player_teams, player_tournaments, team_tournaments
+
+    # Bring the matrices up to date with the index, counting only the games that changed
+    def refresh(self):
+        index = self.index
+        with self._lock:
+            if self.version == index.version:
+                return False
+            version = index.version
+            current = {record.game: record for record in index.records()}
+            added = [record for code, record in current.items() if self.records.get(code) != record]
+            removed = [record for code, record in self.records.items() if current.get(code) != record]
+            if not added and not removed:
+                self.version = version
+                return False
+
+            with span("analytics_update"):
+                shapes = (len(index.player_ids), len(index.team_ids), len(index.tournament_ids))
+                players_n, teams_n, tournaments_n = shapes
+                matrices = [
+                    _grow(self.teammates, (players_n, players_n)),
+                    _grow(self.opponents, (players_n, players_n)),
+                    _grow(self.player_teams, (players_n, teams_n)),
+                    _grow(self.player_tournaments, (players_n, tournaments_n)),
+                    _grow(self.team_tournaments, (teams_n, tournaments_n)),
+                ]
+                if added:
+                    matrices = [matrix + delta for matrix, delta in zip(matrices, self._counts(added, *shapes))]
+                if removed:
+                    matrices = [matrix - delta for matrix, delta in zip(matrices, self._counts(removed, *shapes))]
+                for matrix in matrices:
+                    matrix.eliminate_zeros()
+
+            # Replace rather than mutate, so queries already running keep a consistent set
+            self.teammates, self.opponents, self.player_teams, self.player_tournaments, self.team_tournaments = matrices
+            self.records = current
+            self.version = version
+            return True
+
+    def _player_code(self, player):
+        player_id = player.get("id", "") if isinstance(player, dict) else normalize_key(player)
+        return self.index.player_ids.code(player_id)
+
+    def _team_code(self, team):
+        team_id = team.get("id", "") if isinstance(team, dict) else normalize_key(team)
+        return self.index.team_ids.code(team_id)
+
+    def _ranked_row(self, matrix, code, k):
+        if code < 0 or code >= matrix.shape[0]:
+            return []
+        row = matrix.getrow(code)
+        order = _top(row.data, k)
+        return [(self.index.player_ids.key(int(row.indices[position])), int(row.data[position])) for position in order]
+
+    # [(player id, games on the same side)], most games first
+    @timed("analytics_query")
+    def teammates_of(self, player, k=10):
+        self.refresh()
+        return self._ranked_row(self.teammates, self._player_code(player), k)
+
+    @timed("analytics_query")
+    def opponents_of(self, player, k=10):
+        self.refresh()
+        return self._ranked_row(self.opponents, self._player_code(player), k)
+
+    # Games the player appeared in, optionally only for one team and/or one tournament
+    @timed("analytics_query")
+    def appearances(self, player, team=None, tournament_id=None):
+        self.refresh()
+        code = self._player_code(player)
+        if code < 0 or code >= self.player_teams.shape[0]:
+            return 0
+        if team is not None and tournament_id is not None:
+            team_code = self._team_code(team)
+            tournament = self.index.tournament_ids.code(tournament_id)
+            records = [
+                self.records[game] for game in self.index.games_by_player.get(code, ())
+                if game in self.records and self.records[game].tournament == tournament
+            ]
+            if not records:
+                return 0
+            players, teams = self._appearances(records)[:2]
+            return int(np.count_nonzero((players == code) & (teams == team_code)))
+        if team is not None:
+            team_code = self._team_code(team)
+            return int(self.player_teams[code, team_code]) if 0 <= team_code < self.player_teams.shape[1] else 0
+        if tournament_id is not None:
+            tournament = self.index.tournament_ids.code(tournament_id)
+            return int(self.player_tournaments[code, tournament]) if 0 <= tournament < self.player_tournaments.shape[1] else 0
+        return len(self.index.games_by_player.get(code, ()))
+
+    # The k pairs of players with the most games on the same side: [(player id, player id,
+    # games)]. With team, only pairs who both played for it (games still count every team).
+    @timed("analytics_query")
+    def top_pairs(self, k=10, team=None):
+        self.refresh()
+        pairs = sparse.triu(self.teammates, k=1).tocoo()
+        if team is not None:
+            team_code = self._team_code(team)
+            if team_code < 0 or team_code >= self.player_teams.shape[1]:
+                return []
+            members = self.player_teams.getcol(team_code).toarray().ravel() > 0
+            keep = members[pairs.row] & members[pairs.col]
+            pairs = sparse.coo_matrix((pairs.data[keep], (pairs.row[keep], pairs.col[keep])), shape=pairs.shape)
+        keys = self.index.player_ids.key
+        return [
+            (keys(int(pairs.row[position])), keys(int(pairs.col[position])), int(pairs.data[position]))
+            for position in _top(pairs.data, k)
+        ]
+
+    # How much of a team's lineup stays the same: the share of its player-appearances made
+    # by its core_size most frequent players (1.0 when the same core played every game)
+    @timed("analytics_query")
+    def roster_stability(self, team, core_size=5):
+        self.refresh()
+        team_code = self._team_code(team)
+        if team_code < 0 or team_code >= self.player_teams.shape[1]:
+            return {"games": 0, "players_used": 0, "core": [], "stability": None}
+        column = self.player_teams.getcol(team_code).tocoo()
+        core = _top(column.data, core_size)
+        total = int(column.data.sum())
+        games = len(self.index.games_by_team.get(team_code, ()))
+        return {
+            "games": games,
+            "players_used": len(column.data),
+            "core": [(self.index.player_ids.key(int(column.row[position])), int(column.data[position])) for position in core],
+            "stability": float(column.data[core].sum() / total) if total else None,
+        }
+
+    # Games the team played in each tournament: [(tournament id, games)], most games first
+    @timed("analytics_query")
+    def team_tournaments_of(self, team):
+        self.refresh()
+        team_code = self._team_code(team)
+        if team_code < 0 or team_code >= self.team_tournaments.shape[0]:
+            return []
+        row = self.team_tournaments.getrow(team_code)
+        return [
+            (self.index.tournament_ids.key(int(row.indices[position])), int(row.data[position]))
+            for position in _top(row.data, len(row.data))
+        ]
+
+
+_analytics = None
+_analytics_lock = threading.Lock()
+
+
+# Process-wide Analytics for the live index, replaced when a different index is passed
+# (a rebuilt one); later calls for the same index refresh it incrementally
+def get_analytics(index):
+    global _analytics
+    with _analytics_lock:
+        analytics = _analytics
+        if analytics is None or analytics.index is not index:
+            with span("analytics_build"):
+                analytics = _analytics = Analytics(index)
+            return analytics
+    analytics.refresh()
+    return analytics
@@ -0,0 +1,118 @@
+from array import array
+from collections.abc import Mapping
+
+
+# Dense integer codes for string ids. Only the key list is pickled; the reverse dict is
+# rebuilt on load.
+class Interner:
+    def __init__(self, keys=()):
+        self.keys = []  # code -> key
+        self.codes = {}  # key -> code
+        for key in keys:
+            self.intern(key)
+
+    def __getstate__(self):
+        return self.keys
+
+    def __setstate__(self, keys):
+        self.keys = keys
+        self.codes = {key: code for code, key in enumerate(keys)}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def intern(self, key):
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.keys)
+            self.keys.append(key)
+        return code
+
+    # -1 for a key that was never interned
+    def code(self, key):
+        return self.codes.get(key, -1)
+
+    def key(self, code):
+        return self.keys[code] if code >= 0 else ""
+
+
+# One linked game as interned codes: tournament/league are -1 when the mapping has none,
+# teams and participants are int arrays of team/player codes, and team_sides / sides give
+# the side (0 or 1) of each team / participant by its mapping slot.
+class GameRecord:
+    __slots__ = ("game", "tournament", "league", "teams", "participants", "team_sides", "sides")
+
+    def __init__(self, game, tournament, league, teams, participants, team_sides, sides):
+        self.game = game
+        self.tournament = tournament
+        self.league = league
+        self.teams = array("i", teams)
+        self.participants = array("i", participants)
+        self.team_sides = array("b", team_sides)
+        self.sides = array("b", sides)
+
+    def __reduce__(self):
+        return GameRecord, (self.game, self.tournament, self.league, self.teams, self.participants, self.team_sides, self.sides)
+
+    def __eq__(self, other):
+        if not isinstance(other, GameRecord):
+            return NotImplemented
+        return (
+            self.game == other.game
+            and self.tournament == other.tournament
+            and self.league == other.league
+            and self.teams == other.teams
+            and self.participants == other.participants
+            and self.team_sides == other.team_sides
+            and self.sides == other.sides
+        )
+
+    __hash__ = None
+
+    # Team code playing each participant's side, -1 where that team isn't linked
+    def participant_teams(self):
+        by_side = {side: team for team, side in zip(self.teams, self.team_sides)}
+        return [by_side.get(side, -1) for side in self.sides]
+
+
+# Read-only view of a GameRecord with the same keys link_data produces. Entities are
+# looked up in the index only when a key is read, and nothing is cached on the view.
+class GameView(Mapping):
+    __slots__ = ("index", "record")
+
+    KEYS = ("platformGameId", "tournamentId", "teams", "participants", "team_sides", "participant_sides", "tournament_info", "league_info")
+
+    def __init__(self, index, record):
+        self.index = index
+        self.record = record
+
+    def __getitem__(self, key):
+        index, record = self.index, self.record
+        if key == "platformGameId":
+            return index.game_ids.key(record.game)
+        if key == "tournamentId":
+            return index.tournament_ids.key(record.tournament)
+        if key == "teams":
+            team_ids = (index.team_ids.key(code) for code in record.teams)
+            return {team_id: index.teams[team_id] for team_id in team_ids}
+        if key == "participants":
+            player_ids = (index.player_ids.key(code) for code in record.participants)
+            return {player_id: index.players[player_id] for player_id in player_ids}
+        if key == "team_sides":
+            return {index.team_ids.key(code): side for code, side in zip(record.teams, record.team_sides)}
+        if key == "participant_sides":
+            return {index.player_ids.key(code): side for code, side in zip(record.participants, record.sides)}
+        if key == "tournament_info":
+            return index.tournaments.get(index.tournament_ids.key(record.tournament), {})
+        if key == "league_info":
+            return index.leagues.get(index.league_ids.key(record.league), {})
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return f"GameView({self['platformGameId']!r})"
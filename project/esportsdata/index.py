@@ -0,0 +1,185 @@
+import logging
+import threading
+from array import array
+from collections import defaultdict
+
+from utils.fuzzy import FuzzyIndex, partial_ratio
+from utils.metrics import span, timed
+
+from .compact import GameRecord, GameView, Interner
+
+
+def normalize_key(value):
+    return (value or "").strip().lower()
+
+
+# Direct lookup tables over the output of load_json/link_data, built once so that
+# chatbot lookups cost the same no matter how many mapping files are loaded.
+# Linked games are kept as GameRecords over interned ids and only resolved to entity dicts
+# through GameView when read. Games can be added or replaced later with apply().
+class EntityIndex:
+    def __init__(self, data, linked_data):
+        self.data = data
+        self.games = {}  # game code -> GameRecord
+        self.players = data["players"]
+        self.teams = data["teams"]
+        self.tournaments = data["tournaments"]
+        self.leagues = data["leagues"]
+
+        self.game_ids = Interner()
+        self.player_ids = Interner()
+        self.team_ids = Interner()
+        self.tournament_ids = Interner()
+        self.league_ids = Interner()
+
+        self.players_by_handle = defaultdict(list)  # handle -> [player id]
+        self.team_by_name = {}  # name / acronym / slug -> team id
+        self.players_by_team = defaultdict(list)  # home team id -> [player id]
+        self.games_by_player = {}  # player code -> array of game codes
+        self.games_by_team = {}  # team code -> array of game codes
+        self.league_by_tournament = {}  # tournament id -> league id
+        self.handle_matcher = None
+        self.team_matcher = None
+        self.version = 0  # bumped by every apply(), so derived data knows when to rebuild
+        self._lock = threading.Lock()
+
+        with span("index_build"):
+            self._build(linked_data)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def linked_data(self):
+        return [GameView(self, record) for record in self.records()]
+
+    def records(self):
+        with self._lock:
+            return list(self.games.values())
+
+    def _build(self, linked_data):
+        for player_id, player in self.players.items():
+            handle = normalize_key(player.get("handle"))
+            if handle:
+                self.players_by_handle[handle].append(player_id)
+            team_id = normalize_key(player.get("home_team_id"))
+            if team_id:
+                self.players_by_team[team_id].append(player_id)
+
+        for team_id, team in self.teams.items():
+            # Names win over acronyms/slugs when two teams share a key
+            for key in ("slug", "acronym", "name"):
+                value = normalize_key(team.get(key))
+                if value:
+                    self.team_by_name[value] = team_id
+
+        for tournament_id, tournament in self.tournaments.items():
+            self.league_by_tournament[tournament_id] = tournament.get("league_id", "")
+
+        self.apply(linked_data)
+
+        self.handle_matcher = FuzzyIndex(self.players_by_handle, scorer=partial_ratio)
+        self.team_matcher = FuzzyIndex(self.team_by_name, scorer=partial_ratio)
+
+        logging.info(
+            f"Indexed {len(self.players_by_handle)} handles, {len(self.team_by_name)} team keys "
+            f"and {len(self.games)} games"
+        )
+
+    # GameRecord for a link_data entry, interning any ids seen for the first time
+    def compact(self, entry):
+        if isinstance(entry, GameRecord):
+            return entry
+        tournament_id = entry.get("tournamentId", "")
+        league_id = self.league_by_tournament.get(tournament_id, "")
+        return GameRecord(
+            self.game_ids.intern(entry["platformGameId"]),
+            self.tournament_ids.intern(tournament_id) if tournament_id else -1,
+            self.league_ids.intern(league_id) if league_id else -1,
+            [self.team_ids.intern(team_id) for team_id in entry["teams"]],
+            [self.player_ids.intern(player_id) for player_id in entry["participants"]],
+            [entry["team_sides"][team_id] for team_id in entry["teams"]],
+            [entry["participant_sides"][player_id] for player_id in entry["participants"]],
+        )
+
+    # Add or replace linked games (link_data entries or GameRecords) and drop removed ones.
+    # Lookup arrays are replaced rather than mutated, so readers on other threads never see
+    # one change under them.
+    def apply(self, linked_data=(), removed_game_ids=()):
+        records = [self.compact(entry) for entry in linked_data]
+        with self._lock:
+            player_changes = defaultdict(lambda: ([], []))  # code -> (added, removed game codes)
+            team_changes = defaultdict(lambda: ([], []))
+            for game_id in removed_game_ids:
+                record = self.games.pop(self.game_ids.code(game_id), None)
+                if record is None:
+                    continue
+                for player in record.participants:
+                    player_changes[player][1].append(record.game)
+                for team in record.teams:
+                    team_changes[team][1].append(record.game)
+            for record in records:
+                previous = self.games.get(record.game)
+                if previous is not None:
+                    for player in previous.participants:
+                        player_changes[player][1].append(record.game)
+                    for team in previous.teams:
+                        team_changes[team][1].append(record.game)
+                self.games[record.game] = record
+                for player in record.participants:
+                    player_changes[player][0].append(record.game)
+                for team in record.teams:
+                    team_changes[team][0].append(record.game)
+
+            for lookup, changes in ((self.games_by_player, player_changes), (self.games_by_team, team_changes)):
+                for code, (added, removed) in changes.items():
+                    games = (set(lookup.get(code, ())) - set(removed)) | set(added)
+                    lookup[code] = array("i", sorted(games))
+            self.version += 1
+
+    @timed("lookup")
+    def find_players(self, name, threshold=80, limit=5):
+        query = normalize_key(name)
+        if query in self.players_by_handle:
+            handles = [query]
+        else:
+            handles = [handle for handle, _ in self.handle_matcher.search(query, limit, threshold)]
+        return [self.players[player_id] for handle in handles for player_id in self.players_by_handle[handle]]
+
+    @timed("lookup")
+    def find_teams(self, name, threshold=80, limit=5):
+        query = normalize_key(name)
+        if query in self.team_by_name:
+            team_ids = [self.team_by_name[query]]
+        else:
+            keys = [key for key, _ in self.team_matcher.search(query, limit, threshold)]
+            team_ids = list(dict.fromkeys(self.team_by_name[key] for key in keys))
+        return [self.teams[team_id] for team_id in team_ids]
+
+    def team_for_player(self, player):
+        return self.teams.get(normalize_key(player.get("home_team_id")), {})
+
+    def roster(self, team):
+        return [self.players[player_id] for player_id in self.players_by_team.get(team.get("id", ""), [])]
+
+    def _games(self, lookup, interner, entity_id):
+        records = (self.games.get(game) for game in lookup.get(interner.code(entity_id), ()))
+        return [GameView(self, record) for record in records if record is not None]
+
+    def games_for_player(self, player):
+        return self._games(self.games_by_player, self.player_ids, player.get("id", ""))
+
+    def games_for_team(self, team):
+        return self._games(self.games_by_team, self.team_ids, team.get("id", ""))
+
+    def league_for_tournament(self, tournament_id):
+        return self.leagues.get(self.league_by_tournament.get(tournament_id, ""), {})
+
+    def league_for_team(self, team):
+        return self.leagues.get(team.get("home_league_id", ""), {})
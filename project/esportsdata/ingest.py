@@ -0,0 +1,180 @@
+import json
+import logging
+import os
+import threading
+
+from utils.metrics import span
+
+from .index import EntityIndex
+from .loader import file_kind, link_mapping, load_file, load_json, mapping_rank, source_files
+
+
+def file_state(folder_path, file_name):
+    stat = os.stat(os.path.join(folder_path, file_name))
+    return stat.st_size, stat.st_mtime_ns
+
+
+# The parts of a mapping that link_mapping reads; files that agree on them share one GameRecord
+def mapping_signature(mapping):
+    return (
+        mapping.get("platformGameId", ""),
+        mapping.get("tournamentId", ""),
+        tuple(mapping.get("teamMapping", {}).items()),
+        tuple(mapping.get("participantMapping", {}).items()),
+    )
+
+
+# Keeps an EntityIndex in step with the esports-data folder. Every mapping file's games are
+# remembered per file as GameRecords, so when one file is added, changed or removed only the
+# games it touches are re-resolved (highest mapping_rank wins). A game that several files map
+# the same way is linked once and its GameRecord shared between them. A change to players,
+# teams, tournaments or leagues affects every game and triggers a full rebuild.
+class Ingestor:
+    def __init__(self, folder_path):
+        self.folder_path = folder_path
+        self.files = {}  # source file -> (size, mtime_ns) when last read
+        self.file_records = {}  # mapping file -> {game code: GameRecord}
+        self.matchers = {}
+        self.index = None
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def build(self):
+        with self._lock:
+            files = {file_name: file_state(self.folder_path, file_name) for file_name in source_files(self.folder_path)}
+            file_mappings = {}
+            data = load_json(self.folder_path, file_mappings)
+            # Games are linked per file below; the merged list isn't kept
+            data.pop("mapping_data")
+            index = EntityIndex(data, ())
+            matchers = {}
+            shared = {}
+            file_records = {
+                file_name: self.link_file(index, mappings, matchers, shared)
+                for file_name, mappings in file_mappings.items()
+            }
+            index.apply(self.resolve(file_records, {code for records in file_records.values() for code in records})[0])
+
+            self.files = files
+            self.file_records = file_records
+            self.matchers = matchers
+            self.index = index
+            return self.index
+
+    # {game code: GameRecord} for one file's mappings. shared maps mapping_signature to the
+    # records already linked for other files, and is filled in as mappings are linked.
+    @staticmethod
+    def link_file(index, mappings, matchers, shared=None):
+        shared = {} if shared is None else shared
+        records = {}
+        with span("link"):
+            for mapping in mappings:
+                signature = mapping_signature(mapping)
+                record = shared.get(signature)
+                if record is None:
+                    record = shared[signature] = index.compact(link_mapping(index.data, mapping, matchers))
+                records[record.game] = record
+        return records
+
+    # Swap in the equal GameRecord another file already holds, so refreshed files keep sharing
+    def _share(self, file_name, records):
+        for code, record in records.items():
+            for other_name, other_records in self.file_records.items():
+                other = other_records.get(code)
+                if other_name != file_name and other == record:
+                    records[code] = other
+                    break
+        return records
+
+    # Winning record for each game code (highest mapping_rank first), and the codes no file carries
+    @staticmethod
+    def resolve(file_records, game_codes):
+        by_rank = sorted(file_records, key=mapping_rank, reverse=True)
+        winners, gone = [], []
+        for code in game_codes:
+            record = next((file_records[file_name][code] for file_name in by_rank if code in file_records[file_name]), None)
+            if record is None:
+                gone.append(code)
+            else:
+                winners.append(record)
+        return winners, gone
+
+    def changed_files(self):
+        current = {file_name: file_state(self.folder_path, file_name) for file_name in source_files(self.folder_path)}
+        changed = [file_name for file_name, state in current.items() if self.files.get(file_name) != state]
+        removed = [file_name for file_name in self.files if file_name not in current]
+        return current, changed, removed
+
+    # Apply whatever changed in the folder since the last build/refresh. Returns None when
+    # nothing changed, otherwise a summary of the delta.
+    def refresh(self):
+        with self._lock:
+            if self.index is None:
+                self.build()
+                return {"rebuilt": True}
+
+            current, changed, removed = self.changed_files()
+            if not changed and not removed:
+                return None
+            if any(file_kind(file_name) not in ("mapping_data", None) for file_name in changed + removed):
+                logging.info("Entity files changed, rebuilding the index")
+                self.build()
+                return {"rebuilt": True}
+
+            affected = set()
+            for file_name in removed:
+                affected.update(self.file_records.pop(file_name, {}))
+                self.files.pop(file_name, None)
+            for file_name in changed:
+                if file_kind(file_name) is None:
+                    self.files[file_name] = current[file_name]
+                    continue
+                try:
+                    mappings = load_file(self.folder_path, file_name)
+                except (json.JSONDecodeError, EOFError, OSError) as e:
+                    # Probably still being written; the next refresh picks it up
+                    logging.warning(f"Skipping {file_name} for now: {e}")
+                    continue
+                new = self._share(file_name, self.link_file(self.index, mappings, self.matchers))
+                old = self.file_records.get(file_name, {})
+                affected.update(code for code in new.keys() | old.keys() if old.get(code) != new.get(code))
+                self.file_records[file_name] = new
+                self.files[file_name] = current[file_name]
+
+            # Re-resolve only the affected games against every file that carries them
+            winners, gone = self.resolve(self.file_records, affected)
+            self.index.apply(winners, [self.index.game_ids.key(code) for code in gone])
+            delta = {"rebuilt": False, "linked": len(winners), "removed": len(gone), "files": changed + removed}
+            logging.info(f"Applied esports-data delta: {delta}")
+            return delta
+
+
+# Polls the folder and applies deltas to the live index from a background thread
+class FolderWatcher(threading.Thread):
+    def __init__(self, ingestor, interval=5.0, on_change=None):
+        super().__init__(daemon=True)
+        self.ingestor = ingestor
+        self.interval = interval
+        self.on_change = on_change
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                delta = self.ingestor.refresh()
+            except Exception as e:
+                logging.error(f"Refreshing {self.ingestor.folder_path} failed: {e}")
+                continue
+            if delta and self.on_change:
+                self.on_change(delta)
+
+    def stop(self):
+        self._stopped.set()
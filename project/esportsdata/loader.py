@@ -0,0 +1,230 @@
+import json
+import logging
+import os
+import sys
+
+from utils.fuzzy import FuzzyIndex, wratio
+from utils.metrics import count, span
+from .stream import iter_json_file
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "esports-data")
+
+
+# Files in the folder that load_json reads. The .json.gz archives are read directly;
+# a plain .json file is only used when there is no archive next to it.
+def source_files(folder_path):
+    file_names = [
+        file_name for file_name in os.listdir(folder_path)
+        if os.path.isfile(os.path.join(folder_path, file_name)) and file_name.endswith((".json", ".json.gz"))
+    ]
+    archived = {file_name[:-3] for file_name in file_names if file_name.endswith(".gz")}
+    return sorted(file_name for file_name in file_names if file_name not in archived)
+
+
+# Which loader dict a source file feeds, keyed by its name without .gz
+def file_kind(file_name):
+    base_name = file_name[:-3] if file_name.endswith(".gz") else file_name
+    if base_name == "mapping_data.json" or base_name.startswith("mapping_data_v2"):
+        return "mapping_data"
+    if base_name in ("players.json", "teams.json", "tournaments.json", "leagues.json"):
+        return base_name[:-len(".json")]
+    return None
+
+
+# Precedence of mapping files that carry the same platformGameId: any mapping_data_v2*
+# file beats the original mapping_data, and among equals the later file name wins
+def mapping_rank(file_name):
+    base_name = file_name[:-3] if file_name.endswith(".gz") else file_name
+    return (1 if base_name.startswith("mapping_data_v2") else 0, base_name)
+
+
+# One mapping per platformGameId, taken from the highest-ranked file
+def merge_mappings(mappings_by_file):
+    games = {}
+    for file_name in sorted(mappings_by_file, key=mapping_rank):
+        for mapping in mappings_by_file[file_name]:
+            games[mapping.get("platformGameId", "")] = mapping
+    return games
+
+
+ID_FIELDS = {"players": "id", "teams": "id", "tournaments": "id", "leagues": "league_id"}
+
+
+# Stream one file's records. Lists yield records; dicts keyed by id yield (id, record) pairs.
+def iter_records(file_path, kind):
+    for record in iter_json_file(file_path):
+        if kind == "mapping_data":
+            yield record
+        elif isinstance(record, tuple):
+            yield record
+        else:
+            yield record[ID_FIELDS[kind]], record
+
+
+# Parse one source file. Records are parsed one at a time and staged, so a corrupt file
+# can be skipped as a whole without the document ever being held in memory.
+# Mapping files give a list of mappings, entity files a dict keyed by id.
+def load_file(folder_path, file_name):
+    kind = file_kind(file_name)
+    staged = [] if kind == "mapping_data" else {}
+    with span("load"):
+        for record in iter_records(os.path.join(folder_path, file_name), kind):
+            if kind == "mapping_data":
+                staged.append(record)
+            else:
+                staged[record[0]] = record[1]
+    count("load.records", len(staged))
+    return staged
+
+
+# Load JSON Data. Pass mappings_by_file to also get each mapping file's own records.
+def load_json(folder_path, mappings_by_file=None):
+    # Check if the folder exists
+    if not os.path.exists(folder_path):
+        logging.error(f"Error: Folder path '{folder_path}' does not exist.")
+        sys.exit(f"Error: Folder path '{folder_path}' does not exist.")
+
+    # Print the contents of the folder to verify
+    logging.info("Contents of folder: %s", os.listdir(folder_path))
+
+    data = {
+        "mapping_data": [],
+        "players": {},  # Changed from list to dictionary
+        "teams": {},
+        "tournaments": {},
+        "leagues": {}
+    }
+
+    mappings_by_file = {} if mappings_by_file is None else mappings_by_file
+    try:
+        for file_name in source_files(folder_path):
+            kind = file_kind(file_name)
+            if kind is None:
+                continue
+
+            logging.info(f"Loading file: {file_name}")
+            try:
+                staged = load_file(folder_path, file_name)
+            except (json.JSONDecodeError, EOFError, OSError) as e:
+                logging.error(f"Skipping file {file_name} due to JSON decode error: {e}")
+                continue
+
+            if kind == "mapping_data":
+                mappings_by_file[file_name] = staged
+                logging.info(f"Loaded {len(staged)} mappings from {file_name}")
+            else:
+                data[kind].update(staged)
+                logging.info(f"Loaded {len(data[kind])} {kind} from {file_name}")
+                if kind == "players":
+                    logging.debug("Player data loaded: %s", data["players"])
+    except Exception as e:
+        sys.exit(f"Error loading JSON files: {str(e)}")
+
+    # The mapping files overlap, so keep each game once
+    data["mapping_data"] = list(merge_mappings(mappings_by_file).values())
+    logging.info(f"Loaded {len(data['mapping_data'])} distinct games from {len(mappings_by_file)} mapping files")
+
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("Data loaded from folder: %s", json.dumps(data, indent=2))
+    return data
+
+
+def _slot_order(slot_mapping):
+    return sorted(slot_mapping, key=lambda slot: (0, int(slot)) if str(slot).isdigit() else (1, str(slot)))
+
+
+# Which side (0 or 1) each slot of a mapping is on. Participant slots 1-5 are one team and
+# 6-10 the other; the team with the higher teamMapping slot plays participant slots 1-5.
+def mapping_sides(mapping):
+    participant_slots = _slot_order(mapping.get("participantMapping", {}))
+    half = (len(participant_slots) + 1) // 2
+    team_slots = _slot_order(mapping.get("teamMapping", {}))[::-1]
+    return (
+        {slot: min(position, 1) for position, slot in enumerate(team_slots)},
+        {slot: 0 if position < half else 1 for position, slot in enumerate(participant_slots)},
+    )
+
+
+# One mapping_data entry with its team and participant ids resolved against data. The
+# sides are keyed like teams / participants, so dropping an unlinked id leaves the rest.
+def link_mapping(data, mapping, matchers):
+    linked_team_data = {}
+    linked_participant_data = {}
+    team_sides, participant_sides = {}, {}
+    team_slot_sides, participant_slot_sides = mapping_sides(mapping)
+
+    # Link team data
+    for team_slot, team_id in mapping.get("teamMapping", {}).items():
+        team_id_normalized = team_id.strip().lower()  # Normalize team ID
+        logging.debug("Original team ID: %s, Normalized: %s", team_id, team_id_normalized)
+        if team_id_normalized in data["teams"]:
+            linked_team_data[team_id_normalized] = data["teams"][team_id_normalized]
+            team_sides[team_id_normalized] = team_slot_sides[team_slot]
+            logging.debug("Linked team: %s", data["teams"][team_id_normalized].get("name", "Unknown"))
+        else:
+            count("link.unknown_teams")
+            logging.debug("Team ID '%s' not found in team data.", team_id)
+
+    # Link participant data
+    for slot, participant_id in mapping.get("participantMapping", {}).items():
+        participant_id_normalized = participant_id.strip().lower()  # Normalize participant ID
+        logging.debug("Original participant ID: %s, Normalized: %s", participant_id, participant_id_normalized)
+        if participant_id_normalized in data["players"]:
+            linked_participant_data[participant_id_normalized] = data["players"][participant_id_normalized]
+            participant_sides[participant_id_normalized] = participant_slot_sides[slot]
+            logging.debug("Linked participant: %s", data["players"][participant_id_normalized].get("name", "Unknown"))
+        else:
+            # Fuzzy matching as a fallback to find closest match
+            logging.debug("Participant ID '%s' not found in players data. Attempting fuzzy match...", participant_id)
+            if "player_ids" not in matchers:
+                matchers["player_ids"] = FuzzyIndex(data["players"], scorer=wratio)
+            best_match, match_score = matchers["player_ids"].best(participant_id_normalized, threshold=0)
+            logging.debug("Best match for '%s' is '%s' with score %s", participant_id_normalized, best_match, match_score)
+            if match_score > 80:  # Set a threshold for matching accuracy
+                linked_participant_data[best_match] = data["players"][best_match]
+                participant_sides[best_match] = participant_slot_sides[slot]
+                count("link.fuzzy_participants")
+                logging.debug("Fuzzy linked participant: %s (Match Score: %s)", data["players"][best_match].get("name", "Unknown"), match_score)
+            else:
+                count("link.unmatched_participants")
+                logging.debug("No close match found for participant ID '%s'.", participant_id_normalized)
+
+    # Print out all player names to verify data linkage
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        player_names = [
+            data["players"].get(participant_id.strip().lower(), {}).get('name', 'Unknown')
+            for participant_id in mapping.get("participantMapping", {}).values()
+        ]
+        logging.debug("Participants in mapping: %s", player_names)
+
+    count("link.games")
+
+    return {
+        "platformGameId": mapping.get("platformGameId", ""),
+        "tournamentId": mapping.get("tournamentId", ""),
+        "teams": linked_team_data,
+        "participants": linked_participant_data,
+        "team_sides": team_sides,
+        "participant_sides": participant_sides,
+        "tournament_info": data["tournaments"].get(mapping.get("tournamentId", ""), {}),
+        "league_info": data["leagues"].get(data["tournaments"].get(mapping.get("tournamentId", ""), {}).get("league_id", ""), {})
+    }
+
+
+# Link the given mappings (all of data["mapping_data"] by default). matchers caches the fuzzy
+# participant-ID index across calls; it is built on the first participant that needs it.
+def link_data(data, mappings=None, matchers=None):
+    matchers = {} if matchers is None else matchers
+    with span("link"):
+        linked_data = [
+            link_mapping(data, mapping, matchers)
+            for mapping in (data["mapping_data"] if mappings is None else mappings)
+        ]
+
+    logging.info(f"Total number of linked mappings: {len(linked_data)}")
+    if linked_data:
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("Linked data example: %s", json.dumps(linked_data[0], indent=2))
+    elif mappings is None:
+        logging.error("No linked data was created.")
+    return linked_data
@@ -0,0 +1,431 @@
+import argparse
+import bisect
+import gzip
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+from collections import OrderedDict, defaultdict
+
+from utils.config import SHARD_MEMORY_MB, SHARDS_DIR
+from utils.fuzzy import FuzzyIndex, partial_ratio
+from utils.metrics import count, span
+
+from .index import normalize_key
+from .loader import link_mapping, load_json, source_files
+from .snapshot import SNAPSHOT_DIR, load_index, snapshot_path
+
+YEAR_RE = re.compile(r"(?<!\d)(20\d\d)(?!\d)")
+UNAFFILIATED = "unaffiliated"  # league of games, players and teams with no known league
+ALL_YEARS = "all"
+CATALOG_FILE = "catalog.json"  # next to the shard's snapshot, so it is not taken for a source file
+CATALOG_VERSION = 1
+# Resident EntityIndex bytes per byte of its snapshot, measured on esports-data/
+RESIDENT_FACTOR = 4.5
+
+
+# Year of every tournament. Names usually end in the year; tournament ids grow over time,
+# so one without a year takes the year of the dated tournament with the nearest id.
+def tournament_years(tournaments):
+    dated = []
+    for tournament_id, tournament in tournaments.items():
+        match = YEAR_RE.search(tournament.get("name") or "")
+        if match and tournament_id.isdigit():
+            dated.append((int(tournament_id), match[1]))
+    dated.sort()
+    ids = [tournament_id for tournament_id, _ in dated]
+
+    years = {}
+    for tournament_id, tournament in tournaments.items():
+        match = YEAR_RE.search(tournament.get("name") or "")
+        if match:
+            years[tournament_id] = match[1]
+        elif dated and tournament_id.isdigit():
+            position = bisect.bisect_left(ids, int(tournament_id))
+            neighbours = dated[max(0, position - 1):position + 1]
+            years[tournament_id] = min(neighbours, key=lambda entry: abs(entry[0] - int(tournament_id)))[1]
+        else:
+            years[tournament_id] = ALL_YEARS
+    return years
+
+
+def _write_records(path, records):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8", compresslevel=4) as f:
+            json.dump(records, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+# Split esports-data folders (the bundled one, or each league synced by download_s3_data.py)
+# into shards of one league and year: <root>/<league slug>/<year>/, each an esports-data
+# folder of its own. A shard holds its tournaments' games, the players and teams in them,
+# and every league. Players and teams that never played go to the latest shard of their
+# home league. Returns {(league, year): games}.
+def split_dataset(source_folders, root=SHARDS_DIR):
+    data = {"players": {}, "teams": {}, "tournaments": {}, "leagues": {}, "mapping_data": {}}
+    with span("shard_split"):
+        for folder in source_folders:
+            loaded = load_json(folder)
+            for kind in ("players", "teams", "tournaments", "leagues"):
+                data[kind].update(loaded[kind])
+            for mapping in loaded["mapping_data"]:
+                data["mapping_data"][mapping.get("platformGameId", "")] = mapping
+
+        league_slugs = {
+            league_id: normalize_key(league.get("slug") or league.get("name") or league_id)
+            for league_id, league in data["leagues"].items()
+        }
+        years = tournament_years(data["tournaments"])
+
+        def tournament_shard(tournament_id):
+            tournament = data["tournaments"].get(tournament_id)
+            if tournament is None:
+                return UNAFFILIATED, ALL_YEARS
+            return league_slugs.get(tournament.get("league_id"), UNAFFILIATED), years[tournament_id]
+
+        shards = defaultdict(lambda: {"games": [], "players": set(), "teams": set(), "tournaments": set()})
+        matchers = {}
+        for mapping in data["mapping_data"].values():
+            key = tournament_shard(mapping.get("tournamentId", ""))
+            shard = shards[key]
+            shard["games"].append(mapping)
+            if mapping.get("tournamentId") in data["tournaments"]:
+                shard["tournaments"].add(mapping["tournamentId"])
+            # Linked the way the Ingestor will link them, so participant ids with typos
+            # bring along the player they resolve to
+            linked = link_mapping(data, mapping, matchers)
+            shard["players"].update(linked["participants"])
+            shard["teams"].update(linked["teams"])
+        for tournament_id in data["tournaments"]:
+            shards[tournament_shard(tournament_id)]["tournaments"].add(tournament_id)
+
+        latest = {}
+        for league, year in shards:
+            if year != ALL_YEARS and year > latest.get(league, ""):
+                latest[league] = year
+        placed_players = set().union(*(shard["players"] for shard in shards.values()))
+        placed_teams = set().union(*(shard["teams"] for shard in shards.values()))
+
+        def home_shard(team):
+            league = league_slugs.get(team.get("home_league_id"), UNAFFILIATED)
+            return (league, latest[league]) if league in latest else (UNAFFILIATED, ALL_YEARS)
+
+        for team_id, team in data["teams"].items():
+            if team_id not in placed_teams:
+                shards[home_shard(team)]["teams"].add(team_id)
+        for player_id, player in data["players"].items():
+            if player_id not in placed_players:
+                shards[home_shard(data["teams"].get(normalize_key(player.get("home_team_id")), {}))]["players"].add(player_id)
+        # Home teams come along so team_for_player works inside the shard
+        for shard in shards.values():
+            for player_id in shard["players"]:
+                team_id = normalize_key(data["players"][player_id].get("home_team_id"))
+                if team_id in data["teams"]:
+                    shard["teams"].add(team_id)
+
+        written = {}
+        leagues = list(data["leagues"].values())
+        for (league, year), shard in sorted(shards.items()):
+            folder = os.path.join(root, league, year)
+            os.makedirs(folder, exist_ok=True)
+            _write_records(os.path.join(folder, "leagues.json.gz"), leagues)
+            _write_records(os.path.join(folder, "tournaments.json.gz"), [data["tournaments"][key] for key in sorted(shard["tournaments"])])
+            _write_records(os.path.join(folder, "players.json.gz"), [data["players"][key] for key in sorted(shard["players"])])
+            _write_records(os.path.join(folder, "teams.json.gz"), [data["teams"][key] for key in sorted(shard["teams"])])
+            _write_records(os.path.join(folder, "mapping_data_v2.json.gz"), shard["games"])
+            write_catalog(folder, league, year, {key: data["players"][key] for key in shard["players"]}, {key: data["teams"][key] for key in shard["teams"]}, len(shard["games"]))
+            written[(league, year)] = len(shard["games"])
+    logging.info(f"Split {len(data['mapping_data'])} games into {len(written)} shards under {root}")
+    return written
+
+
+def _manifest(folder):
+    manifest = {}
+    for file_name in source_files(folder):
+        stat = os.stat(os.path.join(folder, file_name))
+        manifest[file_name] = [stat.st_size, stat.st_mtime_ns]
+    return manifest
+
+
+# What a shard holds, small enough to read for every shard at startup: its handles and
+# team keys, so queries can go straight to the shards that have what they ask for
+def write_catalog(folder, league, year, players, teams, games):
+    handles = defaultdict(list)
+    for player_id, player in players.items():
+        handle = normalize_key(player.get("handle"))
+        if handle:
+            handles[handle].append(player_id)
+    team_keys = defaultdict(list)
+    for team_id, team in teams.items():
+        for field in ("slug", "acronym", "name"):
+            value = normalize_key(team.get(field))
+            if value and team_id not in team_keys[value]:
+                team_keys[value].append(team_id)
+    catalog = {
+        "version": CATALOG_VERSION,
+        "league": league,
+        "year": year,
+        "manifest": _manifest(folder),
+        "games": games,
+        "handles": handles,
+        "teams": team_keys,
+    }
+    os.makedirs(os.path.join(folder, SNAPSHOT_DIR), exist_ok=True)
+    with open(os.path.join(folder, SNAPSHOT_DIR, CATALOG_FILE), "w", encoding="utf-8") as f:
+        json.dump(catalog, f)
+    return catalog
+
+
+# The shard's catalog, or None when it is missing or its files have changed since
+def read_catalog(folder):
+    try:
+        with open(os.path.join(folder, SNAPSHOT_DIR, CATALOG_FILE), encoding="utf-8") as f:
+            catalog = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if catalog.get("version") != CATALOG_VERSION or catalog.get("manifest") != _manifest(folder):
+        return None
+    return catalog
+
+
+# Copies of one entity from several shards as one record: the most recently updated copy
+# (for teams, the copy from the latest shard), plus the "shards" it appears in
+def reconcile(copies):
+    copies = sorted(copies, key=lambda copy: (copy[1].get("updated_at") or "", copy[0]))
+    return dict(copies[-1][1], shards=sorted({"/".join(key) for key, _ in copies}))
+
+
+# Shards of <root>/<league>/<year>/, each loaded (from its snapshot) the first time a query
+# needs it. Loaded shards are kept in least-recently-used order, and the oldest are dropped
+# once their estimated size passes the memory budget. The shard just loaded always stays,
+# so a budget smaller than one shard still answers queries.
+# Queries use the catalogs to load only the shards that hold the player or team asked
+# about; a shard without a current catalog is searched directly, and its catalog is
+# written once it is loaded.
+class ShardRegistry:
+    def __init__(self, root=SHARDS_DIR, memory_budget_mb=SHARD_MEMORY_MB):
+        self.root = root
+        self.memory_budget = int(memory_budget_mb * (1 << 20))
+        self.catalogs = {}  # (league, year) -> catalog or None
+        self.handle_shards = defaultdict(set)  # handle -> {(league, year)}
+        self.team_shards = defaultdict(set)  # team name / acronym / slug -> {(league, year)}
+        self.handle_matcher = None
+        self.team_matcher = None
+        self._resident = OrderedDict()  # (league, year) -> (EntityIndex, estimated bytes)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.discover()
+
+    def discover(self):
+        catalogs = {}
+        if os.path.isdir(self.root):
+            for league in sorted(os.listdir(self.root)):
+                league_dir = os.path.join(self.root, league)
+                if not os.path.isdir(league_dir):
+                    continue
+                for year in sorted(os.listdir(league_dir)):
+                    folder = os.path.join(league_dir, year)
+                    if os.path.isdir(folder) and not year.startswith(".") and source_files(folder):
+                        catalogs[(league, year)] = read_catalog(folder)
+        with self._lock:
+            self.catalogs = catalogs
+            self._index_catalogs()
+        logging.info(f"Found {len(catalogs)} shards under {self.root} ({sum(catalog is None for catalog in catalogs.values())} without a catalog)")
+
+    def _index_catalogs(self):
+        self.handle_shards = defaultdict(set)
+        self.team_shards = defaultdict(set)
+        for key, catalog in self.catalogs.items():
+            for handle in (catalog or {}).get("handles", ()):
+                self.handle_shards[handle].add(key)
+            for team_key in (catalog or {}).get("teams", ()):
+                self.team_shards[team_key].add(key)
+        self.handle_matcher = self.team_matcher = None
+
+    def folder(self, key):
+        return os.path.join(self.root, *key)
+
+    def keys(self, league=None, year=None):
+        return [
+            key for key in sorted(self.catalogs)
+            if (league is None or key[0] == normalize_key(league)) and (year is None or key[1] == str(year))
+        ]
+
+    def resident(self):
+        with self._lock:
+            return [(key, size) for key, (_, size) in self._resident.items()]
+
+    def resident_bytes(self):
+        return sum(size for _, size in self.resident())
+
+    def evict(self, key):
+        with self._lock:
+            if self._resident.pop(key, None) is not None:
+                count("shards.evictions")
+
+    # The shard's EntityIndex, loading it on first use
+    def index(self, key):
+        with self._lock:
+            entry = self._resident.get(key)
+            if entry is not None:
+                self._resident.move_to_end(key)
+                count("shards.hits")
+                return entry[0]
+
+        with self._load_lock:
+            with self._lock:
+                entry = self._resident.get(key)
+            if entry is not None:
+                return entry[0]
+            folder = self.folder(key)
+            with span("shard_load"):
+                index = load_index(folder)
+            count("shards.loads")
+            size = int(os.path.getsize(snapshot_path(folder)) * RESIDENT_FACTOR) if os.path.isfile(snapshot_path(folder)) else 0
+            if self.catalogs.get(key) is None:
+                catalog = write_catalog(folder, key[0], key[1], index.players, index.teams, len(index.games))
+                with self._lock:
+                    self.catalogs[key] = catalog
+                    self._index_catalogs()
+
+            with self._lock:
+                self._resident[key] = (index, size)
+                total = sum(size for _, size in self._resident.values())
+                while total > self.memory_budget and len(self._resident) > 1:
+                    evicted, (_, evicted_size) = self._resident.popitem(last=False)
+                    total -= evicted_size
+                    count("shards.evictions")
+                    logging.debug("Evicted shard %s (%s bytes)", "/".join(evicted), evicted_size)
+            return index
+
+    # (matching catalog names, shards holding them, shards without a catalog to search)
+    def _candidates(self, shard_map, matcher_name, name, league, year, threshold, limit):
+        query = normalize_key(name)
+        with self._lock:
+            if query in shard_map:
+                names = [query]
+            else:
+                matcher = getattr(self, matcher_name)
+                if matcher is None:
+                    matcher = FuzzyIndex(shard_map, scorer=partial_ratio)
+                    setattr(self, matcher_name, matcher)
+                names = [match for match, _ in matcher.search(query, limit, threshold)]
+            wanted = self.keys(league, year)
+            uncatalogued = [key for key in wanted if self.catalogs.get(key) is None]
+            keys = {key for match in names for key in shard_map[match] if key in wanted}
+        return names, sorted(keys.union(uncatalogued)), set(uncatalogued)
+
+    # Players by handle across the shards, one reconciled record per player id
+    def find_players(self, name, league=None, year=None, threshold=80, limit=5):
+        handles, keys, uncatalogued = self._candidates(self.handle_shards, "handle_matcher", name, league, year, threshold, limit)
+        copies = defaultdict(list)
+        for key in keys:
+            index = self.index(key)
+            if key in uncatalogued:
+                found = index.find_players(name, threshold, limit)
+            else:
+                found = [index.players[player_id] for handle in handles for player_id in index.players_by_handle.get(handle, ())]
+            for player in found:
+                copies[player["id"]].append((key, player))
+        return [reconcile(player_copies) for player_copies in copies.values()]
+
+    # Teams by name, acronym or slug across the shards, one reconciled record per team id
+    def find_teams(self, name, league=None, year=None, threshold=80, limit=5):
+        team_keys, keys, uncatalogued = self._candidates(self.team_shards, "team_matcher", name, league, year, threshold, limit)
+        copies = defaultdict(list)
+        for key in keys:
+            index = self.index(key)
+            if key in uncatalogued:
+                found = index.find_teams(name, threshold, limit)
+            else:
+                team_ids = dict.fromkeys(index.team_by_name[team_key] for team_key in team_keys if team_key in index.team_by_name)
+                found = [index.teams[team_id] for team_id in team_ids]
+            for team in found:
+                copies[team["id"]].append((key, team))
+        return [reconcile(team_copies) for team_copies in copies.values()]
+
+    def _shard_keys(self, entity, league, year):
+        wanted = set(self.keys(league, year))
+        return [tuple(shard.split("/", 1)) for shard in entity.get("shards", ()) if tuple(shard.split("/", 1)) in wanted]
+
+    # Games across the shards a reconciled player or team appears in
+    def games_for_player(self, player, league=None, year=None):
+        return [game for key in self._shard_keys(player, league, year) for game in self.index(key).games_for_player(player)]
+
+    def games_for_team(self, team, league=None, year=None):
+        return [game for key in self._shard_keys(team, league, year) for game in self.index(key).games_for_team(team)]
+
+    def roster(self, team, league=None, year=None):
+        copies = defaultdict(list)
+        for key in self._shard_keys(team, league, year):
+            for player in self.index(key).roster(team):
+                copies[player["id"]].append((key, player))
+        return [reconcile(player_copies) for player_copies in copies.values()]
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(root=SHARDS_DIR, memory_budget_mb=SHARD_MEMORY_MB):
+    root = os.path.abspath(root)
+    with _registries_lock:
+        if root not in _registries:
+            _registries[root] = ShardRegistry(root, memory_budget_mb)
+        return _registries[root]
+
+
+def _player_line(registry, player, league, year):
+    games = registry.games_for_player(player, league, year)
+    return f"{player.get('handle')} ({player['id']}): {len(games)} games in {', '.join(player['shards'])}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m esportsdata.shards", description="Split esports-data into league/year shards and query them")
+    parser.add_argument("--root", default=SHARDS_DIR, help="shards directory")
+    parser.add_argument("--memory-mb", type=float, default=SHARD_MEMORY_MB, help="budget for loaded shards")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    split_parser = subparsers.add_parser("split", help="(re)write the shards from esports-data folders")
+    split_parser.add_argument("sources", nargs="+", help="esports-data folders, e.g. esports-data or <league>/esports-data from download_s3_data.py")
+    subparsers.add_parser("list", help="list the shards and their sizes")
+    for name in ("player", "team"):
+        query_parser = subparsers.add_parser(name, help=f"find a {name} across the shards")
+        query_parser.add_argument("name")
+        query_parser.add_argument("--league")
+        query_parser.add_argument("--year")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=os.environ.get("VCT_LOG_LEVEL", "WARNING").upper())
+
+    if args.command == "split":
+        for (league, year), games in split_dataset(args.sources, args.root).items():
+            print(f"{league}/{year}: {games} games")
+        return 0
+
+    registry = ShardRegistry(args.root, args.memory_mb)
+    if args.command == "list":
+        for key, catalog in registry.catalogs.items():
+            games = catalog["games"] if catalog else "?"
+            print(f"{'/'.join(key)}: {games} games, {len((catalog or {}).get('handles', ()))} handles")
+        return 0
+
+    if args.command == "player":
+        lines = [_player_line(registry, player, args.league, args.year) for player in registry.find_players(args.name, args.league, args.year)]
+    else:
+        lines = [
+            f"{team.get('name')} ({team['id']}): {len(registry.games_for_team(team, args.league, args.year))} games in {', '.join(team['shards'])}"
+            for team in registry.find_teams(args.name, args.league, args.year)
+        ]
+    print("\n".join(lines) if lines else f"No {args.command} found")
+    print(f"{len(registry.resident())} of {len(registry.catalogs)} shards loaded ({registry.resident_bytes() / (1 << 20):.1f} MB)", file=sys.stderr)
+    return 0 if lines else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
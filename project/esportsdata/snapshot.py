@@ -0,0 +1,208 @@
+import argparse
+import hashlib
+import logging
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import threading
+
+from utils.metrics import span
+
+from .ingest import FolderWatcher, Ingestor
+from .loader import DEFAULT_DATA_DIR, source_files
+
+# Bump when the pickled layout of Ingestor/EntityIndex or the loader output changes
+SNAPSHOT_VERSION = 5
+SNAPSHOT_MAGIC = b"VCTSNAP1"
+SNAPSHOT_DIR = ".snapshot"
+SNAPSHOT_FILE = "dataset.pickle"
+
+# File layout: magic, header length, pickled header, pickled Ingestor.
+# The header is small so staleness can be checked without touching the payload.
+_HEADER_LENGTH = struct.Struct("<Q")
+
+
+def snapshot_path(folder_path):
+    return os.path.join(folder_path, SNAPSHOT_DIR, SNAPSHOT_FILE)
+
+
+def file_hash(file_path):
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(folder_path):
+    manifest = {}
+    for file_name in source_files(folder_path):
+        file_path = os.path.join(folder_path, file_name)
+        stat = os.stat(file_path)
+        manifest[file_name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": file_hash(file_path)}
+    return manifest
+
+
+# None when the snapshot still matches the folder, otherwise the reason it is stale.
+# Size/mtime are checked first; a changed mtime with the same content hash still counts as fresh,
+# and the file's new (size, mtime_ns) goes into touched so it needn't be hashed again next time.
+def stale_reason(header, folder_path, touched=None):
+    manifest = header.get("manifest", {})
+    current = source_files(folder_path)
+    if sorted(manifest) != current:
+        return "source files added or removed"
+
+    for file_name in current:
+        file_path = os.path.join(folder_path, file_name)
+        stat = os.stat(file_path)
+        recorded = manifest[file_name]
+        if stat.st_size != recorded["size"]:
+            return f"{file_name} changed size"
+        if stat.st_mtime_ns != recorded["mtime_ns"]:
+            if file_hash(file_path) != recorded["sha1"]:
+                return f"{file_name} changed content"
+            if touched is not None:
+                touched[file_name] = (stat.st_size, stat.st_mtime_ns)
+    return None
+
+
+def write_snapshot(ingestor, folder_path, manifest=None):
+    path = snapshot_path(folder_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    header = pickle.dumps({
+        "version": SNAPSHOT_VERSION,
+        "python": sys.version_info[:2],
+        "manifest": manifest if manifest is not None else build_manifest(folder_path),
+    }, protocol=pickle.HIGHEST_PROTOCOL)
+
+    # Write to a temp file and rename so a crashed build never leaves a torn snapshot
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(_HEADER_LENGTH.pack(len(header)))
+            f.write(header)
+            pickle.dump(ingestor, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    logging.info(f"Wrote dataset snapshot to {path} ({os.path.getsize(path)} bytes)")
+    return path
+
+
+# Returns (ingestor, reason, manifest). A stale snapshot still comes back with the reason it
+# is stale, so the caller can apply just the delta; an unusable one comes back as None. When
+# only mtimes moved, manifest is the header's manifest with the new (size, mtime_ns) filled in
+# (ingestor.files has them too) so the caller can write it back; otherwise it is None.
+def read_snapshot(folder_path):
+    path = snapshot_path(folder_path)
+    if not os.path.isfile(path):
+        return None, "no snapshot", None
+
+    with open(path, "rb") as f:
+        try:
+            if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                return None, "not a dataset snapshot", None
+            (header_length,) = _HEADER_LENGTH.unpack(f.read(_HEADER_LENGTH.size))
+            header = pickle.loads(f.read(header_length))
+            if header.get("version") != SNAPSHOT_VERSION or header.get("python") != sys.version_info[:2]:
+                return None, "snapshot format changed", None
+
+            touched = {}
+            reason = stale_reason(header, folder_path, touched)
+            with span("snapshot_load"):
+                ingestor = pickle.load(f)
+        except (pickle.UnpicklingError, struct.error, EOFError, AttributeError, ImportError) as e:
+            return None, f"unreadable snapshot: {e}", None
+
+    ingestor.folder_path = folder_path
+    if reason is not None or not touched:
+        return ingestor, reason, None
+    manifest = header["manifest"]
+    for file_name, (size, mtime_ns) in touched.items():
+        manifest[file_name] = {**manifest[file_name], "size": size, "mtime_ns": mtime_ns}
+    ingestor.files.update(touched)
+    return ingestor, None, manifest
+
+
+def build_ingestor(folder_path):
+    ingestor = Ingestor(folder_path)
+    ingestor.build()
+    return ingestor
+
+
+# Load the linked dataset and its indexes from the on-disk snapshot. When source files
+# changed since it was written, only their delta is applied; a missing or unreadable
+# snapshot (or rebuild=True) means a full load.
+def load_ingestor(folder_path=DEFAULT_DATA_DIR, rebuild=False):
+    ingestor = None
+    if not rebuild:
+        ingestor, reason, manifest = read_snapshot(folder_path)
+        if ingestor is not None and reason is None:
+            logging.info(f"Loaded dataset snapshot from {snapshot_path(folder_path)}")
+            if manifest is not None:
+                # Same content under new mtimes; record them so the next start skips the hashing
+                save_snapshot(ingestor, folder_path, manifest)
+            return ingestor
+        logging.info(f"{'Updating' if ingestor is not None else 'Rebuilding'} dataset snapshot: {reason}")
+
+    manifest = build_manifest(folder_path)
+    if ingestor is not None:
+        ingestor.refresh()
+    else:
+        ingestor = build_ingestor(folder_path)
+    save_snapshot(ingestor, folder_path, manifest)
+    return ingestor
+
+
+def save_snapshot(ingestor, folder_path, manifest=None):
+    try:
+        write_snapshot(ingestor, folder_path, manifest)
+    except OSError as e:
+        logging.warning(f"Could not write dataset snapshot: {e}")
+
+
+def load_index(folder_path=DEFAULT_DATA_DIR, rebuild=False):
+    return load_ingestor(folder_path, rebuild).index
+
+
+_ingestors = {}
+_ingestors_lock = threading.Lock()
+
+
+# Process-wide ingestor per folder, so it outlives Streamlit reruns. With watch=True a
+# FolderWatcher applies folder changes to the live index and refreshes the snapshot.
+def get_ingestor(folder_path=DEFAULT_DATA_DIR, watch=False, interval=5.0):
+    folder_path = os.path.abspath(folder_path)
+    with _ingestors_lock:
+        if folder_path not in _ingestors:
+            ingestor = load_ingestor(folder_path)
+            if watch:
+                FolderWatcher(ingestor, interval, on_change=lambda delta: save_snapshot(ingestor, folder_path)).start()
+            _ingestors[folder_path] = ingestor
+        return _ingestors[folder_path]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or check the esports-data snapshot")
+    parser.add_argument("folder", nargs="?", default=DEFAULT_DATA_DIR, help="esports-data folder")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild even if the snapshot is fresh")
+    parser.add_argument("--check", action="store_true", help="only report whether the snapshot is fresh")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        _, reason, _ = read_snapshot(args.folder)
+        print(f"stale: {reason}" if reason else "fresh")
+        return 1 if reason else 0
+
+    load_ingestor(args.folder, rebuild=args.rebuild)
+    print(snapshot_path(args.folder))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
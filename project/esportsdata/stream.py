@@ -0,0 +1,91 @@
+import gzip
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+_NUMBER_CHARS = set("0123456789+-.eE")
+
+
+def open_text(file_path):
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path, "rt", encoding="utf-8")
+    return open(file_path, "r", encoding="utf-8")
+
+
+class _Reader:
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has already been consumed so the buffer stays around one record long
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars or not char:
+            raise json.JSONDecodeError(f"Expecting one of {chars!r}", self.buf, self.pos)
+        self.pos += 1
+        return char
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A number cut by the end of the buffer ("1", "1.", "1e+") decodes as its prefix, so
+            # read on while everything after it could still belong to it
+            if all(char in _NUMBER_CHARS for char in self.buf[end:]) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+# Yield the records of a top-level JSON array one at a time, or (key, value) pairs
+# of a top-level object, without reading the whole document into memory
+def iter_json(f, chunk_size=1 << 16):
+    reader = _Reader(f, chunk_size)
+    opening = reader.expect("[{")
+    closing = "]" if opening == "[" else "}"
+
+    if reader.peek() == closing:
+        reader.pos += 1
+        return
+    while True:
+        if opening == "[":
+            yield reader.value()
+        else:
+            key = reader.value()
+            reader.expect(":")
+            yield key, reader.value()
+        if reader.expect("," + closing) == closing:
+            return
+
+
+def iter_json_file(file_path, chunk_size=1 << 16):
+    with open_text(file_path) as f:
+        yield from iter_json(f, chunk_size)
@@ -0,0 +1,16 @@
+from utils.lazy import lazy_exports
+
+_EXPORTS = {
+    "CachedLLM": ".cache",
+    "ResponseCache": ".cache",
+    "get_response_cache": ".cache",
+    "DeadlineExceeded": ".client",
+    "LLMClient": ".client",
+    "QueueFull": ".client",
+    "TokenBucket": ".client",
+    "get_client": ".client",
+    "StubModel": ".stub",
+    "ThrottlingException": ".stub",
+}
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
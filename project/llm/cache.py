@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from utils.metrics import count, span
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "llm.sqlite3")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt_text):
+    return _WHITESPACE.sub(" ", prompt_text).strip()
+
+
+def cache_key(prompt_text, model_id, model_kwargs):
+    payload = json.dumps([normalize_prompt(prompt_text), model_id, model_kwargs or {}], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Size-bounded LRU of model responses with a TTL, an optional SQLite tier that survives
+# restarts, and in-flight coalescing: concurrent misses on one key share a single model call.
+# The SQLite tier drops expired rows and keeps at most max_rows, the newest ones.
+class ResponseCache:
+    def __init__(self, max_entries=512, ttl=24 * 3600, path=None, max_rows=10000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.max_rows = max_rows
+        self._entries = OrderedDict()  # key -> (stored_at, response)
+        self._inflight = {}  # key -> Future
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, stored_at REAL, response TEXT)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_stored_at ON responses (stored_at)")
+            self._trim()
+            self._db.commit()
+
+    def _fresh(self, stored_at):
+        return not self.ttl or time.time() - stored_at < self.ttl
+
+    # Called with the lock held (or before the cache is shared); the caller commits
+    def _trim(self):
+        if self.ttl:
+            self._db.execute("DELETE FROM responses WHERE stored_at <= ?", (time.time() - self.ttl,))
+        if self.max_rows:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,),
+            )
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._fresh(entry[0]):
+                self._entries.move_to_end(key)
+                return entry[1]
+            self._entries.pop(key, None)
+
+            if self._db is not None:
+                row = self._db.execute("SELECT stored_at, response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and self._fresh(row[0]):
+                    self._remember(key, row[0], row[1])
+                    return row[1]
+        return None
+
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def _remember(self, key, stored_at, response):
+        self._entries[key] = (stored_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, key, response):
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, stored_at, response)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, stored_at, response))
+                self._trim()
+                self._db.commit()
+
+    def get_or_compute(self, key, compute):
+        response = self.get(key)
+        if response is not None:
+            self.record_hit()
+            return response
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            self.record_hit()
+            return future.result()
+
+        self.record_miss()
+        try:
+            response = compute()
+        except BaseException as e:
+            future.set_exception(e)  # Waiters see the same failure; errors are never cached
+            raise
+        else:
+            self.put(key, response)
+            future.set_result(response)
+            return response
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+# Process-wide caches, so they outlive Streamlit reruns of the script that uses them
+def get_response_cache(path=DEFAULT_CACHE_PATH, **kwargs):
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ResponseCache(path=path, **kwargs)
+        return _caches[path]
+
+
+# Wraps a prompt -> text callable (an LLM chain, a Bedrock client, a local stub) with a ResponseCache.
+# stream, when given, is a prompt -> iterator of text chunks for the same model.
+class CachedLLM:
+    def __init__(self, invoke, model_id, model_kwargs=None, cache=None, stream=None):
+        self.invoke_model = invoke
+        self.stream_model = stream
+        self.model_id = model_id
+        self.model_kwargs = model_kwargs or {}
+        self.cache = cache if cache is not None else get_response_cache()
+
+    def invoke(self, prompt_text):
+        key = cache_key(prompt_text, self.model_id, self.model_kwargs)
+        count("llm.requests")
+        return self.cache.get_or_compute(key, lambda: self._call_model(prompt_text))
+
+    def _call_model(self, prompt_text):
+        with span("llm_call"):
+            return self.invoke_model(prompt_text)
+
+    # Yields the response in chunks as the model produces them. A cached response comes
+    # back as one chunk; a streamed one is cached once it has been read to the end, and
+    # closing the iterator early cancels the model call and caches nothing. Streams are not
+    # coalesced: identical prompts streamed at the same time each call the model; only
+    # calls made after one of them has finished read its response from the cache.
+    def stream(self, prompt_text):
+        key = cache_key(prompt_text, self.model_id, self.model_kwargs)
+        count("llm.requests")
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.record_hit()
+            yield cached
+            return
+        if self.stream_model is None:
+            yield self.cache.get_or_compute(key, lambda: self._call_model(prompt_text))
+            return
+
+        self.cache.record_miss()
+        parts = []
+        chunks = iter(self.stream_model(prompt_text))
+        try:
+            with span("llm_first_token"):
+                chunk = next(chunks, None)
+            while chunk is not None:
+                parts.append(chunk)
+                yield chunk
+                chunk = next(chunks, None)
+        except GeneratorExit:
+            count("llm.streams_cancelled")
+            raise
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+        self.cache.put(key, "".join(parts))
@@ -0,0 +1,301 @@
+import heapq
+import itertools
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import CancelledError, Future, TimeoutError as FutureTimeout
+
+
+class QueueFull(Exception):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def is_throttled(error):
+    return "ThrottlingException" in str(error) or "TooManyRequests" in str(error)
+
+
+# Token bucket refilled at `rate` tokens per second, holding at most `capacity`
+class TokenBucket:
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Take a token if one is available; otherwise return how long until one will be
+    def try_acquire(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    # After a throttle response, hold everyone back until the bucket refills
+    def drain(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0)
+
+
+class _Request:
+    def __init__(self, prompt_text, priority, deadline, streaming=False):
+        self.prompt_text = prompt_text
+        self.priority = priority
+        self.deadline = deadline
+        self.attempt = 0
+        self.future = Future()
+        self.chunks = queue.Queue() if streaming else None  # text chunks, then _DONE or an exception
+        self.streamed = False  # a chunk reached the caller, so the call can't be retried
+        self.cancelled = False
+
+    # Cancelled, or past its deadline: fail it without spending a token
+    def dead(self, now):
+        return self.cancelled or self.future.cancelled() or (self.deadline is not None and now > self.deadline)
+
+
+_DONE = object()
+
+
+# Chunks of one streamed response, in order, as the worker receives them. Closing it early
+# or calling cancel() makes the worker stop reading from the model.
+class TokenStream:
+    def __init__(self, request):
+        self.request = request
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        request = self.request
+        timeout = None if request.deadline is None else max(0, request.deadline - time.monotonic())
+        try:
+            chunk = request.chunks.get(timeout=timeout)
+        except queue.Empty:
+            self.cancel()
+            raise DeadlineExceeded("Model stream did not finish in time")
+        if chunk is _DONE:
+            raise StopIteration
+        if isinstance(chunk, BaseException):
+            raise chunk
+        return chunk
+
+    def cancel(self):
+        self.request.cancelled = True
+        self.request.future.cancel()  # Drops it from the queue if it hasn't started yet
+
+    close = cancel
+
+
+# Runs model calls on worker threads behind a shared token bucket. Callers get a Future right
+# away; throttled calls are re-queued with jittered backoff instead of sleeping in anyone's thread.
+# Lower priority values run first. Requests past their deadline fail with DeadlineExceeded.
+# stream, when given, is a prompt -> iterator of text chunks used by stream(); a throttled
+# stream is only retried before its first chunk.
+class LLMClient:
+    def __init__(self, invoke, bucket, workers=4, max_queue=64, max_retries=4, base_delay=1.0, max_delay=20.0, stream=None):
+        self.invoke_model = invoke
+        self.stream_model = stream
+        self.bucket = bucket
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._ready = []  # (priority, seq, request)
+        self._delayed = []  # (ready_at, seq, request)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def pending(self):
+        with self._cond:
+            return len(self._ready) + len(self._delayed)
+
+    def submit(self, prompt_text, priority=0, timeout=None):
+        request = _Request(prompt_text, priority, time.monotonic() + timeout if timeout else None)
+        self._enqueue(request)
+        return request.future
+
+    # TokenStream of the response; timeout covers the whole stream, including waiting
+    # for the rate limiter
+    def stream(self, prompt_text, priority=0, timeout=None):
+        if self.stream_model is None:
+            raise RuntimeError("LLM client has no streaming model")
+        request = _Request(prompt_text, priority, time.monotonic() + timeout if timeout else None, streaming=True)
+        self._enqueue(request)
+        return TokenStream(request)
+
+    def _enqueue(self, request):
+        dead = []
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("LLM client is closed")
+            if len(self._ready) + len(self._delayed) >= self.max_queue:
+                dead = self._take_dead(time.monotonic())
+            if len(self._ready) + len(self._delayed) >= self.max_queue:
+                raise QueueFull(f"{self.max_queue} model requests already queued")
+            heapq.heappush(self._ready, (request.priority, next(self._seq), request))
+            self._cond.notify()
+        # Drop it from the queue as soon as the caller cancels it
+        request.future.add_done_callback(self._on_done)
+        for expired in dead:
+            self._run(expired)
+
+    def _on_done(self, future):
+        if future.cancelled():
+            with self._cond:
+                dead = self._take_dead(time.monotonic())
+            for request in dead:
+                self._run(request)
+
+    # Remove cancelled and expired requests from both queues and return them. Call with
+    # the lock held.
+    def _take_dead(self, now):
+        dead = []
+        for entries in (self._ready, self._delayed):
+            alive = [entry for entry in entries if not entry[2].dead(now)]
+            if len(alive) < len(entries):
+                dead.extend(entry[2] for entry in entries if entry[2].dead(now))
+                entries[:] = alive
+                heapq.heapify(entries)
+        return dead
+
+    def invoke(self, prompt_text, priority=0, timeout=None):
+        future = self.submit(prompt_text, priority, timeout)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            future.cancel()  # Drops it from the queue if it hasn't started yet
+            raise DeadlineExceeded(f"No model response within {timeout} seconds")
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    # The requests a worker should handle next: any dead ones, which are failed without
+    # calling the model, else the first ready request once the bucket has a token
+    def _next_requests(self):
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, seq, request = heapq.heappop(self._delayed)
+                    heapq.heappush(self._ready, (request.priority, seq, request))
+
+                dead = self._take_dead(now)
+                if dead:
+                    return dead
+                if self._ready:
+                    wait = self.bucket.try_acquire()
+                    if wait == 0:
+                        return [heapq.heappop(self._ready)[2]]
+                elif self._delayed:
+                    wait = self._delayed[0][0] - now
+                else:
+                    wait = None
+                self._cond.wait(wait)
+        return None
+
+    def _work(self):
+        while True:
+            requests = self._next_requests()
+            if requests is None:
+                return
+            for request in requests:
+                self._run(request)
+
+    def _run(self, request):
+        if request.attempt == 0 and not request.future.set_running_or_notify_cancel():
+            return
+        if request.cancelled:
+            self._fail(request, CancelledError())
+            return
+        if request.deadline is not None and time.monotonic() > request.deadline:
+            self._fail(request, DeadlineExceeded("Model request expired in the queue"))
+            return
+
+        try:
+            if request.chunks is None:
+                response = self.invoke_model(request.prompt_text)
+            else:
+                response = self._stream(request)
+        except Exception as e:
+            self._failed(request, e)
+        else:
+            request.future.set_result(response)
+
+    def _stream(self, request):
+        parts = []
+        chunks = self.stream_model(request.prompt_text)
+        try:
+            for chunk in chunks:
+                if request.cancelled:
+                    break
+                parts.append(chunk)
+                request.streamed = True
+                request.chunks.put(chunk)
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+        request.chunks.put(_DONE)
+        return "".join(parts)
+
+    def _fail(self, request, error):
+        request.future.set_exception(error)
+        if request.chunks is not None:
+            request.chunks.put(error)
+
+    def _failed(self, request, error):
+        if not is_throttled(error) or request.attempt >= self.max_retries or request.streamed or request.cancelled:
+            self._fail(request, error)
+            return
+
+        self.bucket.drain()
+        request.attempt += 1
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** request.attempt))
+        ready_at = time.monotonic() + delay
+        if request.deadline is not None and ready_at > request.deadline:
+            self._fail(request, DeadlineExceeded("Model request throttled past its deadline"))
+            return
+
+        logging.info(f"Throttled, retrying in {delay:.2f} seconds...")
+        with self._cond:
+            heapq.heappush(self._delayed, (ready_at, next(self._seq), request))
+            self._cond.notify()
+
+
+_buckets = {}
+_clients = {}
+_registry_lock = threading.Lock()
+
+
+# Process-wide limiter per model quota, shared by every client and Streamlit session
+def get_token_bucket(name, rate, capacity=1):
+    with _registry_lock:
+        if name not in _buckets:
+            _buckets[name] = TokenBucket(rate, capacity)
+        return _buckets[name]
+
+
+def get_client(name, invoke, rate, capacity=1, **kwargs):
+    bucket = get_token_bucket(name, rate, capacity)
+    with _registry_lock:
+        if name not in _clients:
+            _clients[name] = LLMClient(invoke, bucket, **kwargs)
+        return _clients[name]
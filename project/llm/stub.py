@@ -0,0 +1,44 @@
+import random
+import time
+
+from .client import TokenBucket
+
+
+# What Bedrock raises when the account is over its request quota; the message matches the
+# botocore ClientError text that llm.client.is_throttled looks for
+class ThrottlingException(Exception):
+    def __init__(self, message="An error occurred (ThrottlingException) when calling the InvokeModel operation: Too many requests, please wait before trying again."):
+        super().__init__(message)
+
+
+# Stands in for the model in offline runs and benchmarks: echoes the question after a
+# fixed (optionally jittered) latency, so batch throughput can be measured without Bedrock.
+# stream() yields the same answer word by word, token_latency apart. rate, when given, is the
+# account quota in requests per second (bursts of burst, default max(1, rate)): a call arriving
+# with the quota spent raises ThrottlingException before any text, as Bedrock would.
+class StubModel:
+    def __init__(self, latency=0.0, jitter=0.0, seed=0, token_latency=0.0, rate=None, burst=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_latency = token_latency
+        self.quota = TokenBucket(rate, burst or max(1.0, rate)) if rate else None
+        self.calls = 0
+        self.throttled = 0
+        self._rng = random.Random(seed)
+
+    def __call__(self, prompt_text):
+        return "".join(self.stream(prompt_text))
+
+    def stream(self, prompt_text):
+        self.calls += 1
+        if self.quota is not None and self.quota.try_acquire():
+            self.throttled += 1
+            raise ThrottlingException()
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        question = prompt_text.rsplit("\n\n", 1)[-1]
+        for position, word in enumerate(f"[stub answer] {question}".split(" ")):
+            if position and self.token_latency:
+                time.sleep(self.token_latency)
+            yield word if not position else " " + word
@@ -1,63 +1,64 @@
-from langchain.chains import LLMChain
-from langchain_aws import BedrockLLM  # Updated import
-from langchain.prompts import PromptTemplate
-import boto3
+import logging
 import os
+
 import streamlit as st
-import json
-import sys
-import logging  # Added logging import
-
-sys.path.append(os.path.abspath('/Users/jadendang/Documents/GitHub/VCT-Team-Builder/project'))
-from vlrdata.vlr_fetch import fetch_stats
-
-# Set up AWS profile
-os.environ["AWS_PROFILE"] = "Hackthon"
-
-# Bedrock Client
-bedrock_client = boto3.client(
-    service_name="bedrock-runtime",
-    region_name="ap-northeast-1"  # Tokyo region
-)
-
-modelID = "amazon.titan-text-express-v1"
-llm = BedrockLLM(
-    model_id=modelID,
-    client=bedrock_client,
-    model_kwargs={"maxTokenCount": 300, "temperature": 0.7}  # Reduce token limit for testing
-)
-
-region = "na"
-timespan = "60"
-scrape_data = fetch_stats(region, timespan)
-logging.basicConfig(level=logging.INFO)
-logging.info(f"Scraped Data: {scrape_data}")  # Added logging to check scraped data
+
+from retrieval import DEFAULT_INDEX_DIR, load_or_build, stats_documents
+from utils.config import AWS_PROFILE, AWS_REGION, MODEL_ID
+from vlrdata.fetcher import get_fetcher
+
+# Run from the project folder: streamlit run ragtest.py
+
+REGION = "na"
+TIMESPAN = "60"
+CONTEXT_TOKENS = 400
+
+
+# Bedrock model, built once per process
+@st.cache_resource
+def get_llm():
+    import boto3
+    from langchain_aws import BedrockLLM
+
+    os.environ.setdefault("AWS_PROFILE", AWS_PROFILE)
+    bedrock_client = boto3.client(service_name="bedrock-runtime", region_name=AWS_REGION)
+    return BedrockLLM(
+        model_id=MODEL_ID,
+        client=bedrock_client,
+        model_kwargs={"maxTokenCount": 300, "temperature": 0.7}  # Reduce token limit for testing
+    )
+
+
+# The scraped stats and a retriever over them, served from the on-disk caches on reruns
+@st.cache_resource
+def load_stats(region=REGION, timespan=TIMESPAN):
+    scrape_data = get_fetcher().fetch(region, timespan)
+    logging.debug("Scraped Data: %s", scrape_data)
+    if not scrape_data or 'data' not in scrape_data or 'segments' not in scrape_data['data']:
+        return scrape_data, None
+    stats_retriever = load_or_build(
+        stats_documents(scrape_data["data"]["segments"], region),
+        os.path.join(DEFAULT_INDEX_DIR, f"stats-{region}-{timespan}"),
+    )
+    return scrape_data, stats_retriever
+
 
 # Chatbot function
-def vct_chatbot(freeform_text, scraped_data):
-    if not scraped_data or 'data' not in scraped_data or 'segments' not in scraped_data['data']:
+def vct_chatbot(freeform_text, stats_retriever):
+    from langchain.chains import LLMChain
+    from langchain.prompts import PromptTemplate
+
+    if stats_retriever is None:
         return "Sorry, I couldn't retrieve any player statistics. Please try again later."
 
     base_prompt = "You are a chatbot that helps analyze player stats and build teams for VCT based on that data. Answer the following:\n\n"
     prompt_text = base_prompt + freeform_text
-    scraped_data_info = "Here are the player statistics:\n\n"
-    
-    player_count = 0
-    for entry in scraped_data['data']['segments']:
-        if player_count < 3:  # Limit to 3 players for concise output
-            scraped_data_info += (
-                f"- Player: {entry['player']}, Org: {entry['org']}, Agents: {entry['agents']}, "
-                f"Roles: {entry['roles']}, Rounds Played: {entry['rounds_played']}, Rating: {entry['rating']}, "
-                f"ACS: {entry['average_combat_score']}, Avg Dmg per round: {entry['average_damage_per_round']}, "
-                f"Headshot %: {entry['headshot_percentage']}, Clutch %: {entry['clutch_success_percentage']}\n"
-            )
-            player_count += 1
-        else:
-            break
-
+    # The stats rows most relevant to the question, within a fixed token budget
+    scraped_data_info = "Here are the player statistics:\n\n" + stats_retriever.context(freeform_text, budget=CONTEXT_TOKENS)
     prompt_text += scraped_data_info
+
     prompt = PromptTemplate(input_variables=["prompt_text"], template="{prompt_text}")
-    bedrock_chain = LLMChain(llm=llm, prompt=prompt)
+    bedrock_chain = LLMChain(llm=get_llm(), prompt=prompt)
 
     try:
         response = bedrock_chain({"prompt_text": prompt_text})
@@ -67,11 +68,18 @@ def vct_chatbot(freeform_text, scraped_data):
 
     return response["text"] if "text" in response else "Sorry, I couldn't generate a valid response."
 
-# Streamlit UI
-st.title("VCT Team Builder")
 
-freeform_text = st.sidebar.text_area(label="What is your question", max_chars=100)
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    # Streamlit UI
+    st.title("VCT Team Builder")
+    freeform_text = st.sidebar.text_area(label="What is your question", max_chars=100)
+
+    if freeform_text:
+        _, stats_retriever = load_stats()
+        st.write(vct_chatbot(freeform_text, stats_retriever))
+
 
-if freeform_text:
-    response = vct_chatbot(freeform_text, scrape_data)
-    st.write(response)
+if __name__ == "__main__":
+    main()
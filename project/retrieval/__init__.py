@@ -0,0 +1,18 @@
+from utils.lazy import lazy_exports
+
+_EXPORTS = {
+    "BM25Index": ".bm25",
+    "tokenize": ".bm25",
+    "Document": ".documents",
+    "entity_documents": ".documents",
+    "stats_documents": ".documents",
+    "DEFAULT_INDEX_DIR": ".retriever",
+    "Retriever": ".retriever",
+    "estimate_tokens": ".retriever",
+    "get_entity_retriever": ".retriever",
+    "load_or_build": ".retriever",
+    "HashingVectorizer": ".vectors",
+    "VectorIndex": ".vectors",
+}
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
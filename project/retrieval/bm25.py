@@ -0,0 +1,94 @@
+import json
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+# Okapi BM25 over an inverted index held as flat arrays: the postings of term t are
+# doc_ids/freqs[offsets[t]:offsets[t + 1]]. A query only touches its own terms' postings.
+class BM25Index:
+    def __init__(self, terms, offsets, doc_ids, freqs, doc_lengths, k1=1.5, b=0.75):
+        self.terms = terms  # term id -> term
+        self.vocab = {term: term_id for term_id, term in enumerate(terms)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.freqs = freqs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+
+        count = len(doc_lengths)
+        document_frequency = np.diff(offsets)
+        self.idf = np.log1p((count - document_frequency + 0.5) / (document_frequency + 0.5))
+        average = doc_lengths.mean() if count else 1.0
+        # Per-document part of the BM25 denominator, computed once
+        self.norms = (k1 * (1 - b + b * doc_lengths / (average or 1.0))).astype(np.float32)
+
+    @classmethod
+    def build(cls, texts, **kwargs):
+        postings = {}  # term -> ([doc ids], [term frequencies])
+        doc_lengths = np.zeros(len(texts), dtype=np.float32)
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_lengths[doc_id] = sum(counts.values())
+            for term, freq in counts.items():
+                docs, freqs = postings.setdefault(term, ([], []))
+                docs.append(doc_id)
+                freqs.append(freq)
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[term][0]) for term in terms])
+        doc_ids = np.fromiter((doc_id for term in terms for doc_id in postings[term][0]), dtype=np.int32, count=offsets[-1])
+        freqs = np.fromiter((freq for term in terms for freq in postings[term][1]), dtype=np.float32, count=offsets[-1])
+        return cls(terms, offsets, doc_ids, freqs, doc_lengths, **kwargs)
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def scores(self, query):
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs, freqs = self.doc_ids[start:end], self.freqs[start:end]
+            # A term appears once per document in its postings, so plain fancy-index += is safe
+            scores[docs] += self.idf[term_id] * freqs * (self.k1 + 1) / (freqs + self.norms[docs])
+        return scores
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        np.savez(
+            os.path.join(path, "bm25.npz"),
+            offsets=self.offsets,
+            doc_ids=self.doc_ids,
+            freqs=self.freqs,
+            doc_lengths=self.doc_lengths,
+        )
+        with open(os.path.join(path, "terms.json"), "w", encoding="utf-8") as f:
+            json.dump({"terms": self.terms, "k1": self.k1, "b": self.b}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "terms.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        with np.load(os.path.join(path, "bm25.npz")) as arrays:
+            return cls(
+                meta["terms"],
+                arrays["offsets"],
+                arrays["doc_ids"],
+                arrays["freqs"],
+                arrays["doc_lengths"],
+                k1=meta["k1"],
+                b=meta["b"],
+            )
@@ -0,0 +1,71 @@
+from collections import namedtuple
+
+# key is unique per record ("player:<id>", "team:<id>", "series:<tournament id>:<team ids>",
+# "stats:<region>:<player>"); text is what gets indexed and quoted in prompts
+Document = namedtuple("Document", ["key", "kind", "text"])
+
+
+def player_document(index, player_id, player):
+    team = index.team_for_player(player)
+    games = index.games_for_player(player)
+    tournaments = sorted({game["tournament_info"].get("name", "Unknown") for game in games})
+    return Document(
+        f"player:{player_id}",
+        "player",
+        f"Player {player.get('handle', 'Unknown').strip()} ({player.get('first_name', '')} {player.get('last_name', '')}), "
+        f"team {team.get('name', 'Unknown')}, status {player.get('status', 'unknown')}, "
+        f"{len(games)} games, tournaments: {', '.join(tournaments) or 'none'}",
+    )
+
+
+def team_document(index, team_id, team):
+    league = index.league_for_team(team)
+    roster = [player.get("handle", "Unknown").strip() for player in index.roster(team)]
+    return Document(
+        f"team:{team_id}",
+        "team",
+        f"Team {team.get('name', 'Unknown')} ({team.get('acronym', '')}), region {league.get('region', 'Unknown')}, "
+        f"league {league.get('name', 'Unknown')}, {len(index.games_for_team(team))} games, "
+        f"players: {', '.join(roster) or 'none'}",
+    )
+
+
+# Games between the same teams in the same tournament (the maps of a series) share one document
+def series_document(games):
+    game = games[0]
+    teams = sorted(team.get("name", "Unknown") for team in game["teams"].values())
+    players = sorted({player.get("handle", "Unknown").strip() for game in games for player in game["participants"].values()})
+    return Document(
+        f"series:{game['tournamentId']}:{','.join(sorted(game['teams']))}",
+        "series",
+        f"{len(games)} games in {game['tournament_info'].get('name', 'Unknown')} ({game['league_info'].get('region', 'Unknown')}): "
+        f"{' vs '.join(teams) or 'unknown teams'}, players: {', '.join(players)}",
+    )
+
+
+# Every player, team and series in an EntityIndex
+def entity_documents(index):
+    documents = [player_document(index, player_id, player) for player_id, player in index.players.items()]
+    for team_id, team in index.teams.items():
+        documents.append(team_document(index, team_id, team))
+    series = {}
+    for game in index.linked_data:
+        series.setdefault((game["tournamentId"], frozenset(game["teams"])), []).append(game)
+    for games in series.values():
+        documents.append(series_document(games))
+    return documents
+
+
+# One document per scraped vlr.gg stats row
+def stats_documents(segments, region=""):
+    return [
+        Document(
+            f"stats:{region}:{row['player']}",
+            "stats",
+            f"Player: {row['player']}, Org: {row['org']}, Region: {region or 'Unknown'}, Agents: {row['agents']}, "
+            f"Roles: {row['roles']}, Rounds Played: {row['rounds_played']}, Rating: {row['rating']}, "
+            f"ACS: {row['average_combat_score']}, Avg Dmg per round: {row['average_damage_per_round']}, "
+            f"Headshot %: {row['headshot_percentage']}, Clutch %: {row['clutch_success_percentage']}",
+        )
+        for row in segments
+    ]
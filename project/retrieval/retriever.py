@@ -0,0 +1,180 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+from utils.metrics import span
+
+from .bm25 import BM25Index
+from .documents import Document, entity_documents
+from .vectors import VectorIndex
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "retrieval")
+INDEX_VERSION = 1
+
+# Rough model token count: one per word or punctuation mark
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    return len(_TOKEN_RE.findall(text))
+
+
+def fingerprint(documents):
+    digest = hashlib.sha1()
+    for document in documents:
+        digest.update(f"{document.key}\0{document.kind}\0{document.text}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+# BM25 over the document texts, optionally fused with hashed-vector cosine similarity.
+# search() returns the best (document, score) pairs; context() packs the best documents
+# into a fixed token budget so prompts stay the same size however much data is indexed.
+class Retriever:
+    def __init__(self, documents, bm25, vectors=None, vector_weight=0.5):
+        self.documents = documents
+        self.positions = {document.key: position for position, document in enumerate(documents)}
+        self.kinds = np.array([document.kind for document in documents], dtype=object)
+        self.bm25 = bm25
+        self.vectors = vectors
+        self.vector_weight = vector_weight
+
+    @classmethod
+    def build(cls, documents, vectors=True, dim=512, **kwargs):
+        texts = [document.text for document in documents]
+        return cls(
+            documents,
+            BM25Index.build(texts),
+            VectorIndex.build(texts, dim) if vectors else None,
+            **kwargs,
+        )
+
+    def __len__(self):
+        return len(self.documents)
+
+    def scores(self, query):
+        scores = self.bm25.scores(query)
+        top = scores.max() if len(scores) else 0
+        if top > 0:
+            scores = scores / top
+        if self.vectors is not None:
+            scores = scores + self.vector_weight * np.clip(self.vectors.scores(query), 0, None)
+        return scores
+
+    def search(self, query, k=8, kinds=None):
+        if not len(self):
+            return []
+        with span("retrieve"):
+            scores = self.scores(query)
+            if kinds is not None:
+                scores = np.where(np.isin(self.kinds, list(kinds)), scores, 0)
+            candidates = np.flatnonzero(scores > 0)
+            if k < len(candidates):
+                candidates = candidates[np.argpartition(-scores[candidates], k)[:k]]
+            ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [(self.documents[position], float(scores[position])) for position in ranked]
+
+    # Text of the pinned documents followed by the best matches, one per line, stopping
+    # before the token budget is exceeded
+    def context(self, query, budget=400, k=12, kinds=None, pinned=()):
+        lines = []
+        used = 0
+        seen = set()
+        documents = [self.documents[self.positions[key]] for key in pinned if key in self.positions]
+        documents += [document for document, _ in self.search(query, k, kinds)]
+        for document in documents:
+            if document.key in seen:
+                continue
+            seen.add(document.key)
+            line = f"- {document.text}"
+            cost = estimate_tokens(line)
+            if used + cost > budget:
+                continue  # A shorter document further down may still fit
+            lines.append(line)
+            used += cost
+        return "\n".join(lines)
+
+    def save(self, path, key=None):
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        # Build in a temp directory and swap it in, so readers never see half an index
+        tmp_path = tempfile.mkdtemp(dir=parent, suffix=".tmp")
+        try:
+            self.bm25.save(tmp_path)
+            if self.vectors is not None:
+                self.vectors.save(tmp_path)
+            with open(os.path.join(tmp_path, "documents.json"), "w", encoding="utf-8") as f:
+                json.dump([list(document) for document in self.documents], f)
+            with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({
+                    "version": INDEX_VERSION,
+                    "fingerprint": key or fingerprint(self.documents),
+                    "vector_weight": self.vector_weight,
+                }, f)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        meta = read_meta(path)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError("retrieval index format changed")
+        with open(os.path.join(path, "documents.json"), encoding="utf-8") as f:
+            documents = [Document(*document) for document in json.load(f)]
+        vectors = VectorIndex.load(path) if os.path.isfile(os.path.join(path, "vectors.npy")) else None
+        return cls(documents, BM25Index.load(path), vectors, vector_weight=meta["vector_weight"])
+
+
+def read_meta(path):
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# The saved index at path when it was built from the same documents, otherwise a new one
+# (saved for next time)
+def load_or_build(documents, path, vectors=True, **kwargs):
+    key = fingerprint(documents)
+    if read_meta(path).get("fingerprint") == key:
+        try:
+            retriever = Retriever.load(path)
+            if (retriever.vectors is not None) == vectors:
+                return retriever
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Rebuilding retrieval index at {path}: {e}")
+
+    with span("retrieval_build"):
+        retriever = Retriever.build(documents, vectors=vectors, **kwargs)
+    try:
+        retriever.save(path, key)
+    except OSError as e:
+        logging.warning(f"Could not save retrieval index to {path}: {e}")
+    return retriever
+
+
+_retrievers = {}
+_retrievers_lock = threading.Lock()
+
+
+# Process-wide retriever over an EntityIndex, rebuilt when the index changes
+def get_entity_retriever(index, path=os.path.join(DEFAULT_INDEX_DIR, "esports"), vectors=True):
+    with _retrievers_lock:
+        cached = _retrievers.get(path)
+        if cached is not None and cached[0] is index and cached[1] == index.version:
+            return cached[2]
+        version = index.version
+        retriever = load_or_build(entity_documents(index), path, vectors)
+        _retrievers[path] = (index, version, retriever)
+        return retriever
@@ -0,0 +1,54 @@
+import os
+import zlib
+
+import numpy as np
+
+from .bm25 import tokenize
+
+
+# Word and character-trigram features hashed into a fixed number of signed buckets, so
+# vectors can be computed locally with no vocabulary or model to download
+class HashingVectorizer:
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def features(self, text):
+        for token in tokenize(text):
+            yield token
+            padded = f"#{token}#"
+            for start in range(len(padded) - 2):
+                yield padded[start:start + 3]
+
+    def transform(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self.features(text):
+                digest = zlib.crc32(feature.encode("utf-8"))
+                matrix[row, digest % self.dim] += 1.0 if digest & 0x80000000 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms > 0, norms, 1.0)
+
+
+# Unit-length document vectors; a query's cosine similarity to every document is one mat-vec.
+# Saved as .npy and memory-mapped on load.
+class VectorIndex:
+    def __init__(self, matrix, vectorizer):
+        self.matrix = matrix
+        self.vectorizer = vectorizer
+
+    @classmethod
+    def build(cls, texts, dim=512):
+        vectorizer = HashingVectorizer(dim)
+        return cls(vectorizer.transform(texts), vectorizer)
+
+    def scores(self, query):
+        return self.matrix @ self.vectorizer.transform([query])[0]
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "vectors.npy"), self.matrix)
+
+    @classmethod
+    def load(cls, path):
+        matrix = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        return cls(matrix, HashingVectorizer(matrix.shape[1]))
@@ -0,0 +1 @@
+from .client import ServiceClient, ServiceError, ServiceUnavailable, get_service_client
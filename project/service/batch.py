@@ -0,0 +1,102 @@
+import json
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utils.metrics import count, span
+
+DEFAULT_CONCURRENCY = 8
+
+
+# (id, question) pairs from JSONL lines: {"id": ..., "question": ...} objects, JSON
+# strings or plain text. Blank lines are skipped; ids default to the line number.
+def read_questions(lines):
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            item = line
+        if isinstance(item, dict):
+            yield item.get("id", number), item.get("question")
+        else:
+            yield number, item
+
+
+# Answer many questions against one index and yield a result per question as soon as it
+# is ready: {"id", "question", "answer"} or {"id", "question", "error"}.
+# Each distinct player/team lookup runs once for the whole batch, and questions that
+# build the same prompt share one model call. Questions are read as they are needed: at
+# most `concurrency` model calls are in flight, and reading waits while they are. The
+# shared rate limiter decides how fast the calls actually go.
+def answer_batch(chatbot, questions, concurrency=DEFAULT_CONCURRENCY):
+    index = chatbot.index
+    concurrency = max(1, concurrency)
+    lookups = {}
+    running = {}  # future -> prompt
+    waiting = {}  # prompt in flight -> [(id, question)]
+    finished = {}  # prompt -> {"answer": ...} or {"error": ...}
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def collect(timeout):
+        done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            prompt_text = running.pop(future)
+            try:
+                result = {"answer": future.result()}
+            except Exception as e:
+                count("batch.errors")
+                result = {"error": f"{type(e).__name__}: {e}"}
+            finished[prompt_text] = result
+            for item_id, question in waiting.pop(prompt_text):
+                yield {"id": item_id, "question": question, **result}
+
+    try:
+        for item_id, question in questions:
+            count("batch.questions")
+            if not isinstance(question, str) or not question.strip():
+                yield {"id": item_id, "question": question, "error": "question is required"}
+                continue
+            try:
+                with span("batch_prompts"):
+                    prompt_text, reply = chatbot.prompt(question, index, lookups)
+            except Exception as e:
+                logging.error(f"Building the prompt for {item_id!r} failed: {e}")
+                yield {"id": item_id, "question": question, "error": f"{type(e).__name__}: {e}"}
+                continue
+
+            if reply:
+                yield {"id": item_id, "question": question, "answer": reply}
+            elif prompt_text in finished:
+                yield {"id": item_id, "question": question, **finished[prompt_text]}
+            elif prompt_text in waiting:
+                waiting[prompt_text].append((item_id, question))
+            else:
+                while len(running) >= concurrency:
+                    yield from collect(None)
+                running[executor.submit(chatbot.complete, prompt_text)] = prompt_text
+                waiting[prompt_text] = [(item_id, question)]
+            if running:
+                yield from collect(0)
+
+        while running:
+            yield from collect(None)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+# answer_batch over JSONL in, JSONL out. Returns a summary of the run.
+def run_batch(chatbot, lines, output, concurrency=DEFAULT_CONCURRENCY):
+    start = time.perf_counter()
+    answered = errors = 0
+    for result in answer_batch(chatbot, read_questions(lines), concurrency):
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+        if "error" in result:
+            errors += 1
+        else:
+            answered += 1
+    seconds = time.perf_counter() - start
+    return {"answered": answered, "errors": errors, "seconds": seconds, "per_second": (answered + errors) / seconds if seconds else None}
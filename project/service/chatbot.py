@@ -0,0 +1,280 @@
+import json
+import logging
+import os
+import re
+import threading
+
+from esportsdata import get_analytics, get_ingestor
+from llm import CachedLLM, DeadlineExceeded, QueueFull, get_client, get_response_cache
+from retrieval import get_entity_retriever
+from utils.config import AWS_PROFILE, AWS_REGION, DATA_DIR, MODEL_ID, REQUESTS_PER_SECOND
+from utils.metrics import span
+
+MODEL_KWARGS = {"maxTokenCount": 300, "temperature": 0.7}  # Reduce token limit for testing
+
+# Model calls run on worker threads behind one token bucket shared by every caller,
+# sized to the account quota (REQUESTS_PER_SECOND). Throttled calls back off there
+# instead of sleeping in the caller's thread. Workers only matter while calls are slower
+# than the quota, so there are enough to keep it full during a batch.
+LLM_WORKERS = 16
+RESPONSE_TIMEOUT = 30  # seconds a question may wait for the model, including retries
+
+# Most tokens of retrieved records sent with a question, however large the dataset grows
+CONTEXT_TOKENS = 400
+
+
+# prompt -> text over Bedrock through LangChain. Imported here rather than at module level
+# so that loading the data never waits on boto3/langchain.
+def bedrock_invoke(model_id=MODEL_ID, model_kwargs=MODEL_KWARGS):
+    import boto3
+    from langchain.chains import LLMChain
+    from langchain.prompts import PromptTemplate
+    from langchain_aws import BedrockLLM
+
+    os.environ.setdefault("AWS_PROFILE", AWS_PROFILE)
+    bedrock_client = boto3.client(service_name="bedrock-runtime", region_name=AWS_REGION)
+    llm = BedrockLLM(model_id=model_id, client=bedrock_client, model_kwargs=model_kwargs)
+    bedrock_chain = LLMChain(llm=llm, prompt=PromptTemplate(input_variables=["prompt_text"], template="{prompt_text}"))
+
+    def run_bedrock_chain(prompt_text):
+        return bedrock_chain.run(prompt_text=prompt_text)
+    return run_bedrock_chain
+
+
+# prompt -> iterator of text chunks from Titan's streaming API, called through boto3
+# directly since the chain only returns whole responses
+def bedrock_stream(model_id=MODEL_ID, model_kwargs=MODEL_KWARGS):
+    import boto3
+
+    os.environ.setdefault("AWS_PROFILE", AWS_PROFILE)
+    bedrock_client = boto3.client(service_name="bedrock-runtime", region_name=AWS_REGION)
+
+    def stream_titan(prompt_text):
+        response = bedrock_client.invoke_model_with_response_stream(
+            modelId=model_id,
+            contentType="application/json",
+            accept="application/json",
+            body=json.dumps({"inputText": prompt_text, "textGenerationConfig": model_kwargs}),
+        )
+        for event in response["body"]:
+            if "chunk" not in event:
+                raise RuntimeError(f"Bedrock stream failed: {event}")  # e.g. throttlingException
+            text = json.loads(event["chunk"]["bytes"]).get("outputText")
+            if text:
+                yield text
+    return stream_titan
+
+
+def _handle(index, player_id):
+    return index.players.get(player_id, {}).get("handle") or player_id
+
+
+# One line of appearance and teammate counts for the prompt
+def player_facts(index, player, k=3):
+    analytics = get_analytics(index)
+    games = analytics.appearances(player)
+    if not games:
+        return ""
+    teammates = ", ".join(f"{_handle(index, player_id)} ({together})" for player_id, together in analytics.teammates_of(player, k))
+    return f"{player.get('handle')} played {games} games; most games together with: {teammates or 'nobody recorded'}"
+
+
+def team_facts(index, team):
+    stability = get_analytics(index).roster_stability(team)
+    if not stability["games"]:
+        return ""
+    core = ", ".join(f"{_handle(index, player_id)} ({games})" for player_id, games in stability["core"])
+    return (
+        f"{team.get('name')} played {stability['games']} games with {stability['players_used']} players; "
+        f"core lineup {core} made {stability['stability']:.0%} of its appearances"
+    )
+
+
+PLAYER_NAME_KEYWORDS = ["player", "tell me about", "information on", "who is"]
+TEAM_NAME_KEYWORDS = ["team", "who is team"]
+
+# Compiled once rather than for every question
+_PLAYER_NAME_RE = re.compile(r'\b(?:' + '|'.join(PLAYER_NAME_KEYWORDS) + r')\s+([\w\s]+)')
+_TEAM_NAME_RE = re.compile(r'\b(?:' + '|'.join(TEAM_NAME_KEYWORDS) + r')\s+([\w\s]+)')
+
+
+# ("player" | "team", name) when the question asks about a specific player or team,
+# else (None, None)
+def parse_intent(freeform_text):
+    text = freeform_text.lower()
+    # Identify if the query contains any keywords for player or team information
+    if any(keyword in text for keyword in PLAYER_NAME_KEYWORDS):
+        kind, match = "player", _PLAYER_NAME_RE.search(text)
+    elif any(keyword in text for keyword in TEAM_NAME_KEYWORDS):
+        kind, match = "team", _TEAM_NAME_RE.search(text)
+    else:
+        return None, None
+    name = match.group(1).strip() if match else ""
+    return (kind, name) if name else (None, None)
+
+
+# (pinned document keys, prompt facts) for a player or team name, or None when nothing matches
+def lookup(index, kind, name):
+    if kind == "player":
+        # Look the player up by handle instead of scanning every game
+        players = index.find_players(name)
+        if not players:
+            return None
+        return [f"player:{player['id']}" for player in players], [player_facts(index, player) for player in players[:2]]
+    # Look the team up by name, acronym or slug
+    teams = index.find_teams(name)
+    if not teams:
+        return None
+    return [f"team:{team['id']}" for team in teams], [team_facts(index, team) for team in teams[:2]]
+
+
+# Prompt for the question, or a reply to show directly when the model isn't needed.
+# lookups memoizes lookup() by (kind, name), so a batch of questions about the same
+# players resolves each one once.
+def build_prompt(freeform_text, index, lookups=None):
+    if not index.games:
+        return None, "Sorry, I couldn't find any relevant data right now. Please try again later."
+
+    # Records the question names go first; the rest of the context is whatever the
+    # retrieval index ranks highest, cut to CONTEXT_TOKENS
+    pinned = []
+    facts = []
+    kind, name = parse_intent(freeform_text)
+    if kind:
+        key = (kind, name)
+        if lookups is None or key not in lookups:
+            found = lookup(index, kind, name)
+            if lookups is not None:
+                lookups[key] = found
+        else:
+            found = lookups[key]
+        if found is None:
+            prefix = "team " if kind == "team" else ""
+            return None, f"Sorry, no data available for {prefix}{name.capitalize()}."
+        pinned, facts = found
+
+    context = get_entity_retriever(index).context(freeform_text, budget=CONTEXT_TOKENS, pinned=pinned)
+    context = "\n".join(["- " + fact for fact in facts if fact] + ([context] if context else []))
+    prompt_text = (
+        "You are a chatbot that helps with general VCT esports inquiries. Use these records where they are relevant:\n\n"
+        + context
+        + "\n\nPlease answer the following:\n\n"
+        + freeform_text
+    )
+
+    return prompt_text, None
+
+
+# The loaded dataset, its indexes and the model client, kept warm for every question.
+# Nothing here knows about Streamlit or HTTP; the UI, the query service and the CLI all
+# answer through ask().
+class Chatbot:
+    def __init__(self, data_dir=DATA_DIR, invoke=None, model_id=MODEL_ID, watch=True, stream=None):
+        self.data_dir = os.path.abspath(data_dir)
+        self.ingestor = get_ingestor(self.data_dir, watch=watch)
+        self.model_id = model_id
+        self._invoke = invoke
+        self._stream = stream
+        self._cached_llm = None
+        self._lock = threading.Lock()
+
+    # Read on every question: a rebuild after entity files change replaces the index
+    @property
+    def index(self):
+        return self.ingestor.index
+
+    @property
+    def cached_llm(self):
+        with self._lock:
+            if self._cached_llm is None:
+                if self._invoke is None:
+                    self._invoke, self._stream = bedrock_invoke(self.model_id), bedrock_stream(self.model_id)
+                llm_client = get_client(
+                    self.model_id,
+                    self._invoke,
+                    rate=REQUESTS_PER_SECOND,
+                    capacity=REQUESTS_PER_SECOND,
+                    workers=LLM_WORKERS,
+                    stream=self._stream,
+                )
+                # Repeat questions are answered from the response cache without calling the model
+                self._cached_llm = CachedLLM(
+                    lambda prompt_text: llm_client.invoke(prompt_text, timeout=RESPONSE_TIMEOUT),
+                    self.model_id,
+                    MODEL_KWARGS,
+                    get_response_cache(),
+                    stream=(lambda prompt_text: llm_client.stream(prompt_text, timeout=RESPONSE_TIMEOUT)) if self._stream else None,
+                )
+            return self._cached_llm
+
+    # Build the derived indexes now rather than on the first question
+    def warm(self):
+        index = self.index
+        get_entity_retriever(index)
+        get_analytics(index)
+        return index
+
+    # Apply data folder changes now instead of waiting for the watcher
+    def reload(self):
+        delta = self.ingestor.refresh()
+        self.warm()
+        return delta
+
+    def prompt(self, freeform_text, index=None, lookups=None):
+        return build_prompt(freeform_text, index or self.index, lookups)
+
+    # Model answer for a built prompt; errors are raised, not turned into replies
+    def complete(self, prompt_text):
+        return self.cached_llm.invoke(prompt_text)
+
+    def ask(self, freeform_text):
+        with span("prompt_build"):
+            prompt_text, reply = self.prompt(freeform_text)
+        if reply:
+            return reply
+
+        try:
+            logging.info("Running Bedrock Chain...")
+            return self.complete(prompt_text)
+        except (DeadlineExceeded, QueueFull) as e:
+            logging.warning(f"Request limit reached: {e}")
+            return "Request limit reached. Please try again later."
+        except Exception as e:
+            logging.error(f"Error generating response: {str(e)}")
+            return f"Sorry, there was an issue generating a response: {str(e)}"
+
+
+    # Same answers as ask(), yielded in chunks as the model produces them. Closing the
+    # iterator early (the user asked something else) cancels the model call.
+    def ask_stream(self, freeform_text):
+        with span("prompt_build"):
+            prompt_text, reply = self.prompt(freeform_text)
+        if reply:
+            yield reply
+            return
+
+        streamed = False
+        try:
+            logging.info("Streaming Bedrock response...")
+            for chunk in self.cached_llm.stream(prompt_text):
+                streamed = True
+                yield chunk
+        except (DeadlineExceeded, QueueFull) as e:
+            logging.warning(f"Request limit reached: {e}")
+            yield ("\n\n" if streamed else "") + "Request limit reached. Please try again later."
+        except Exception as e:
+            logging.error(f"Error generating response: {str(e)}")
+            yield ("\n\n" if streamed else "") + f"Sorry, there was an issue generating a response: {str(e)}"
+
+
+_chatbots = {}
+_chatbots_lock = threading.Lock()
+
+
+# Process-wide chatbot per data folder, so it outlives Streamlit reruns
+def get_chatbot(data_dir=DATA_DIR, **kwargs):
+    data_dir = os.path.abspath(data_dir)
+    with _chatbots_lock:
+        if data_dir not in _chatbots:
+            _chatbots[data_dir] = Chatbot(data_dir, **kwargs)
+        return _chatbots[data_dir]
@@ -0,0 +1,127 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+from utils.config import DATA_DIR, SERVICE_HOST, SERVICE_PORT, SERVICE_URL, STATS_STORE_DIR
+
+from .batch import DEFAULT_CONCURRENCY, read_questions
+from .client import ServiceClient, ServiceError, ServiceUnavailable
+
+
+def _print(result):
+    print(result if isinstance(result, str) else json.dumps(result, indent=2))
+
+
+def _stub(latency, rate=None):
+    from llm.stub import StubModel
+    stub = StubModel(latency, token_latency=0.02, rate=rate)
+    return {"invoke": stub, "stream": stub.stream, "model_id": "stub"}
+
+
+def batch(client, args):
+    lines = sys.stdin if args.questions == "-" else open(args.questions, encoding="utf-8")
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        if args.local or args.stub is not None or not client.available():
+            from .batch import run_batch
+            from .chatbot import get_chatbot
+            kwargs = _stub(args.stub, args.stub_rate) if args.stub is not None else {}
+            summary = run_batch(get_chatbot(args.data_dir, watch=False, **kwargs), lines, output, args.concurrency)
+        else:
+            start = time.perf_counter()
+            answered = errors = 0
+            questions = [{"id": item_id, "question": question} for item_id, question in read_questions(lines)]
+            for result in client.batch(questions, args.concurrency):
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+                errors += "error" in result
+                answered += "error" not in result
+            seconds = time.perf_counter() - start
+            summary = {"answered": answered, "errors": errors, "seconds": seconds, "per_second": (answered + errors) / seconds if seconds else None}
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+        if output is not sys.stdout:
+            output.close()
+    print(
+        f"{summary['answered']} answered, {summary['errors']} failed in {summary['seconds']:.1f}s "
+        f"({summary['per_second'] or 0:.1f} questions/s)",
+        file=sys.stderr,
+    )
+    return 1 if summary["errors"] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m service", description="Run or query the VCT query service")
+    parser.add_argument("--url", default=SERVICE_URL, help="query service URL for the client commands")
+    subparsers = parser.add_subparsers(dest="command")
+
+    serve_parser = subparsers.add_parser("serve", help="load the data and answer questions over HTTP (default)")
+    serve_parser.add_argument("--host", default=SERVICE_HOST)
+    serve_parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    serve_parser.add_argument("--data-dir", default=DATA_DIR, help="esports-data folder")
+    serve_parser.add_argument("--stats-store", default=STATS_STORE_DIR, help="vlr.gg stats history store")
+
+    serve_parser.add_argument("--stub", type=float, metavar="LATENCY", help="answer with a local stub model taking LATENCY seconds per call instead of Bedrock")
+    serve_parser.add_argument("--stub-rate", type=float, metavar="RPS", help="requests per second the stub accepts before throttling, to exercise the retry backoff")
+
+    ask_parser = subparsers.add_parser("ask", help="ask the running service a question")
+    ask_parser.add_argument("question", nargs="+")
+    batch_parser = subparsers.add_parser("batch", help="answer a JSONL file of questions, writing JSONL results as they finish")
+    batch_parser.add_argument("questions", help="JSONL file of {\"id\", \"question\"} objects or one question per line; - for stdin")
+    batch_parser.add_argument("--output", "-o", help="results file (default: stdout)")
+    batch_parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="model calls in flight at once")
+    batch_parser.add_argument("--local", action="store_true", help="answer in this process instead of the running service")
+    batch_parser.add_argument("--stub", type=float, metavar="LATENCY", help="answer locally with a stub model (implies --local)")
+    batch_parser.add_argument("--stub-rate", type=float, metavar="RPS", help="requests per second the stub accepts before throttling, to exercise the retry backoff")
+    batch_parser.add_argument("--data-dir", default=DATA_DIR, help="esports-data folder for --local")
+    subparsers.add_parser("health", help="show what the running service has loaded")
+    subparsers.add_parser("reload", help="apply data folder changes now")
+    metrics_parser = subparsers.add_parser("metrics", help="show the service's timings and counters")
+    metrics_parser.add_argument("--prometheus", action="store_true")
+    history_parser = subparsers.add_parser("history", help="a player's stats over the last snapshots")
+    history_parser.add_argument("player")
+    history_parser.add_argument("--metric", default="rating")
+    history_parser.add_argument("--last", type=int, default=6)
+    history_parser.add_argument("--region")
+    history_parser.add_argument("--timespan", default="60")
+
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0].startswith("-") and argv[0] not in ("-h", "--help", "--url"):
+        argv = ["serve", *argv]
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=os.environ.get("VCT_LOG_LEVEL", "INFO").upper())
+
+    if args.command in (None, "serve"):
+        from .server import serve  # Only the server needs the data and model code
+        stub = getattr(args, "stub", None)
+        serve(
+            getattr(args, "host", SERVICE_HOST),
+            getattr(args, "port", SERVICE_PORT),
+            getattr(args, "data_dir", DATA_DIR),
+            getattr(args, "stats_store", STATS_STORE_DIR),
+            **(_stub(stub, getattr(args, "stub_rate", None)) if stub is not None else {}),
+        )
+        return 0
+
+    client = ServiceClient(args.url)
+    try:
+        if args.command == "batch":
+            return batch(client, args)
+        if args.command == "ask":
+            _print(client.ask(" ".join(args.question)))
+        elif args.command == "health":
+            _print(client.health())
+        elif args.command == "reload":
+            _print(client.reload())
+        elif args.command == "metrics":
+            _print(client.metrics(args.prometheus))
+        elif args.command == "history":
+            _print(client.history(args.player, args.metric, args.last, args.region, args.timespan))
+    except (ServiceUnavailable, ServiceError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,109 @@
+import codecs
+import http.client
+import json
+import socket
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from utils.config import SERVICE_URL
+
+
+class ServiceUnavailable(Exception):
+    pass
+
+
+class ServiceError(Exception):
+    pass
+
+
+# Talks to the query service over localhost HTTP. Only the standard library is imported,
+# so a UI or CLI using it starts without loading any data or model code.
+class ServiceClient:
+    def __init__(self, url=SERVICE_URL, timeout=60):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _open(self, method, path, body=None, query=None, timeout=None):
+        url = self.url + path + ("?" + urllib.parse.urlencode(query) if query else "")
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        request = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+        try:
+            return urllib.request.urlopen(request, timeout=timeout or self.timeout)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise ServiceError(f"{method} {path} failed ({e.code}): {message}")
+        except urllib.error.URLError as e:
+            if isinstance(e.reason, (ConnectionRefusedError, FileNotFoundError, socket.gaierror)):
+                raise ServiceUnavailable(f"No query service at {self.url}")
+            raise ServiceError(f"{method} {path} failed: {e.reason}")
+        except socket.timeout:
+            raise ServiceError(f"{method} {path} timed out after {timeout or self.timeout} seconds")
+        except ConnectionError as e:
+            raise ServiceUnavailable(f"Query service at {self.url} went away: {e}")
+
+    def _request(self, method, path, body=None, query=None, timeout=None):
+        with self._open(method, path, body, query, timeout) as resp:
+            payload = resp.read()
+            content_type = resp.headers.get("Content-Type", "")
+        return json.loads(payload) if content_type.startswith("application/json") else payload.decode("utf-8")
+
+    def health(self, timeout=2):
+        return self._request("GET", "/health", timeout=timeout)
+
+    def available(self):
+        try:
+            self.health()
+            return True
+        except (ServiceUnavailable, ServiceError):
+            return False
+
+    def ask(self, question):
+        return self._request("POST", "/ask", {"question": question})["answer"]
+
+    # The answer in chunks as the service streams it. Closing the iterator early drops the
+    # connection, which cancels the model call on the service.
+    def ask_stream(self, question):
+        with self._open("POST", "/ask", {"question": question, "stream": True}) as resp:
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            try:
+                for data in iter(lambda: resp.read1(4096), b""):
+                    text = decoder.decode(data)
+                    if text:
+                        yield text
+            except (ConnectionError, http.client.HTTPException, socket.timeout) as e:
+                raise ServiceError(f"Answer stream broke off: {e}")
+
+    # Yields {"id", "question", "answer" | "error"} per question as the service finishes them.
+    # questions are strings or {"id", "question"} dicts.
+    def batch(self, questions, concurrency=None, timeout=3600):
+        query = {"concurrency": concurrency} if concurrency else None
+        with self._open("POST", "/batch", {"questions": list(questions)}, query, timeout) as resp:
+            for line in resp:
+                if line.strip():
+                    yield json.loads(line)
+
+    def reload(self):
+        return self._request("POST", "/reload")
+
+    # Metrics snapshot as a dict, or Prometheus text with prometheus=True
+    def metrics(self, prometheus=False):
+        return self._request("GET", "/metrics", query={"format": "prometheus"} if prometheus else None)
+
+    def history(self, player, metric="rating", last=6, region=None, timespan="60"):
+        query = {"player": player, "metric": metric, "last": last, "timespan": timespan}
+        if region:
+            query["region"] = region
+        return self._request("GET", "/history", query=query)["history"]
+
+
+_clients = {}
+
+
+def get_service_client(url=SERVICE_URL):
+    if url not in _clients:
+        _clients[url] = ServiceClient(url)
+    return _clients[url]
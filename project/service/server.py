@@ -0,0 +1,217 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from utils.config import DATA_DIR, MODEL_ID, SERVICE_HOST, SERVICE_PORT, STATS_STORE_DIR
+from utils.metrics import metrics, span
+from vlrdata.store import StatsStore
+
+from .batch import DEFAULT_CONCURRENCY, answer_batch, read_questions
+from .chatbot import get_chatbot
+
+MAX_BODY_BYTES = 1 << 20
+MAX_BATCH_CONCURRENCY = 64
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# One thread per connection. Handlers only read the shared chatbot and store, which swap
+# in new indexes rather than changing them in place, so no request-wide lock is needed.
+class ServiceHandler(BaseHTTPRequestHandler):
+    server_version = "VCTService/1"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logging.debug("%s %s", self.address_string(), format % args)
+
+    def _send(self, status, payload, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_json(self, status, body):
+        self._send(status, json.dumps(body).encode("utf-8"), "application/json")
+
+    # Streams text with chunked encoding, so each piece goes out as soon as it is ready.
+    # If the client goes away the pieces' generator is closed, which cancels its work.
+    def _send_chunks(self, chunks, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                payload = chunk.encode("utf-8")
+                if payload:
+                    self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+                    self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except ConnectionError:
+            self.close_connection = True
+            logging.info(f"Client went away during {self.command} {self.path}")
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+    def _send_lines(self, lines):
+        self._send_chunks((line + "\n" for line in lines), "application/x-ndjson")
+
+    def _raw_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise RequestError(413, "request body too large")
+        return self.rfile.read(length) if length else b""
+
+    def _body(self):
+        raw = self._raw_body()
+        if not raw:
+            return {}
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            raise RequestError(400, "request body is not JSON")
+        if not isinstance(body, dict):
+            raise RequestError(400, "request body must be a JSON object")
+        return body
+
+    def _dispatch(self, routes):
+        url = urlsplit(self.path)
+        route = routes.get(url.path)
+        try:
+            if route is None:
+                raise RequestError(404, f"no route for {self.command} {url.path}")
+            route(self, {key: values[-1] for key, values in parse_qs(url.query).items()})
+        except RequestError as e:
+            self._send_json(e.status, {"error": str(e)})
+        except Exception as e:
+            logging.exception(f"{self.command} {url.path} failed")
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        self._dispatch(GET_ROUTES)
+
+    def do_POST(self):
+        self._dispatch(POST_ROUTES)
+
+    def health(self, query):
+        index = self.server.chatbot.index
+        self._send_json(200, {
+            "status": "ok",
+            "uptime_seconds": time.time() - self.server.started_at,
+            "data_dir": self.server.chatbot.data_dir,
+            "index_version": index.version,
+            "games": len(index.games),
+            "players": len(index.players),
+            "teams": len(index.teams),
+        })
+
+    def metrics(self, query):
+        if query.get("format") == "prometheus":
+            self._send(200, metrics.to_prometheus().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            self._send_json(200, metrics.snapshot())
+
+    def history(self, query):
+        if not query.get("player"):
+            raise RequestError(400, "player is required")
+        try:
+            points = self.server.stats_store.history(
+                query["player"],
+                query.get("metric", "rating"),
+                int(query.get("last", 6)),
+                query.get("region"),
+                query.get("timespan", "60"),
+            )
+        except (KeyError, ValueError) as e:
+            raise RequestError(400, str(e))
+        self._send_json(200, {"history": points})
+
+    # {"question"} -> {"answer"}, or with "stream": true the answer as chunked plain text
+    def ask(self, query):
+        body = self._body()
+        question = body.get("question")
+        if not isinstance(question, str) or not question.strip():
+            raise RequestError(400, "question is required")
+        if body.get("stream"):
+            self._send_chunks(self.server.chatbot.ask_stream(question), "text/plain; charset=utf-8")
+            return
+        with span("service_ask"):
+            answer = self.server.chatbot.ask(question)
+        self._send_json(200, {"answer": answer})
+
+    # Questions as {"questions": [...]} (strings or {"id", "question"} objects) or as a
+    # JSONL body; results stream back as JSONL in the order they complete
+    def batch(self, query):
+        if self.headers.get("Content-Type", "").startswith("application/x-ndjson"):
+            questions = read_questions(self._raw_body().decode("utf-8").splitlines())
+        else:
+            items = self._body().get("questions")
+            if not isinstance(items, list):
+                raise RequestError(400, "questions must be a list")
+            questions = (
+                (item.get("id", number), item.get("question")) if isinstance(item, dict) else (number, item)
+                for number, item in enumerate(items, start=1)
+            )
+        try:
+            concurrency = min(int(query.get("concurrency", DEFAULT_CONCURRENCY)), MAX_BATCH_CONCURRENCY)
+        except ValueError:
+            raise RequestError(400, "concurrency must be an integer")
+        with span("service_batch"):
+            results = answer_batch(self.server.chatbot, questions, concurrency)
+            self._send_lines(json.dumps(result) for result in results)
+
+    def reload(self, query):
+        self._body()
+        with self.server.reload_lock, span("service_reload"):
+            delta = self.server.chatbot.reload()
+        index = self.server.chatbot.index
+        self._send_json(200, {"delta": delta, "index_version": index.version, "games": len(index.games)})
+
+
+GET_ROUTES = {
+    "/health": ServiceHandler.health,
+    "/metrics": ServiceHandler.metrics,
+    "/history": ServiceHandler.history,
+}
+POST_ROUTES = {
+    "/ask": ServiceHandler.ask,
+    "/batch": ServiceHandler.batch,
+    "/reload": ServiceHandler.reload,
+}
+
+
+class ServiceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, chatbot, stats_store):
+        super().__init__(address, ServiceHandler)
+        self.chatbot = chatbot
+        self.stats_store = stats_store
+        self.reload_lock = threading.Lock()
+        self.started_at = time.time()
+
+
+# Load everything once, then answer until interrupted. Binds to localhost by default;
+# there is no authentication.
+def serve(host=SERVICE_HOST, port=SERVICE_PORT, data_dir=DATA_DIR, stats_store_dir=STATS_STORE_DIR, invoke=None, model_id=MODEL_ID, stream=None):
+    with span("service_start"):
+        chatbot = get_chatbot(data_dir, invoke=invoke, model_id=model_id, stream=stream)
+        chatbot.warm()
+    server = ServiceServer((host, port), chatbot, StatsStore(stats_store_dir))
+    logging.info(f"Query service listening on http://{host}:{server.server_address[1]} ({len(chatbot.index.games)} games loaded)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,13 +1,10 @@
-import sys
-import os
-
-sys.path.append(os.path.abspath('/Users/jadendang/Documents/GitHub/VCT-Team-Builder/project'))
-
 from vlrdata.vlr_fetch import fetch_stats
 
+# Run from the project folder: python test_import.py
+
 if __name__ == "__main__":
     try:
         stats = fetch_stats("na", "60")
         print(stats)
     except Exception as e:
-        print(f"Error fetching stats: {e}")
\ No newline at end of file
+        print(f"Error fetching stats: {e}")
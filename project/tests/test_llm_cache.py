@@ -0,0 +1,45 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from llm.cache import ResponseCache
+
+
+# The SQLite tier is trimmed to the newest max_rows rows, and expired rows are dropped on open
+class ResponseCacheTrimTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "llm.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def stored_keys(self):
+        with sqlite3.connect(self.path) as db:
+            return sorted(key for (key,) in db.execute("SELECT key FROM responses"))
+
+    def test_row_cap(self):
+        cache = ResponseCache(path=self.path, max_rows=3)
+        for i in range(10):
+            cache.put(f"key{i}", f"response{i}")
+        self.assertEqual(self.stored_keys(), ["key7", "key8", "key9"])
+        self.assertEqual(cache.get("key9"), "response9")
+
+    def test_expired_rows_dropped_on_open(self):
+        cache = ResponseCache(path=self.path, ttl=60)
+        cache.put("old", "response")
+        cache.put("new", "response")
+        cache._db.close()
+        with sqlite3.connect(self.path) as db:
+            db.execute("UPDATE responses SET stored_at = ? WHERE key = 'old'", (time.time() - 120,))
+
+        cache = ResponseCache(path=self.path, ttl=60)
+        self.assertEqual(self.stored_keys(), ["new"])
+        self.assertIsNone(cache.get("old"))
+
+
+if __name__ == "__main__":
+    unittest.main()
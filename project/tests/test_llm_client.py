@@ -0,0 +1,44 @@
+import unittest
+from concurrent.futures import wait
+
+from llm.client import LLMClient, TokenBucket, is_throttled
+from llm.stub import StubModel
+from utils.config import REQUESTS_PER_SECOND
+
+
+# The stub's quota is REQUESTS_PER_SECOND, as the account's is; a client paced to it should
+# never be throttled, and one calling faster should be
+class StubQuotaTest(unittest.TestCase):
+    def run_calls(self, client_rate, calls):
+        stub = StubModel(rate=REQUESTS_PER_SECOND)
+        client = LLMClient(stub, TokenBucket(client_rate, max(1.0, client_rate)), max_retries=0)
+        try:
+            futures = [client.submit(f"question {number}") for number in range(calls)]
+            wait(futures, timeout=30)
+        finally:
+            client.close()
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        return stub, errors
+
+    def test_client_at_the_quota_is_not_throttled(self):
+        stub, errors = self.run_calls(REQUESTS_PER_SECOND, int(2 * REQUESTS_PER_SECOND) + 2)
+        self.assertEqual(stub.throttled, 0)
+        self.assertEqual(errors, [])
+
+    def test_client_above_the_quota_is_throttled(self):
+        stub, errors = self.run_calls(4 * REQUESTS_PER_SECOND, int(4 * REQUESTS_PER_SECOND) + 2)
+        self.assertGreater(stub.throttled, 0)
+        self.assertTrue(errors)
+        self.assertTrue(all(is_throttled(error) for error in errors))
+
+    def test_a_call_past_the_burst_is_throttled(self):
+        stub = StubModel(rate=1.0)
+        self.assertTrue(stub("first").endswith("first"))
+        with self.assertRaises(Exception) as raised:
+            stub("second")
+        self.assertTrue(is_throttled(raised.exception))
+        self.assertEqual((stub.calls, stub.throttled), (2, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
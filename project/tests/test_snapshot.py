@@ -0,0 +1,54 @@
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from esportsdata.loader import source_files
+from esportsdata.snapshot import load_ingestor, read_snapshot
+from utils.config import DATA_DIR
+
+
+# A touched file (new mtime, same content) keeps the snapshot fresh and is recorded in it,
+# so the next start neither hashes it again nor relinks it
+@unittest.skipUnless(os.path.isdir(DATA_DIR) and source_files(DATA_DIR), "no esports-data folder")
+class SnapshotTouchTest(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.INFO)
+        self.folder = tempfile.mkdtemp()
+        for file_name in source_files(DATA_DIR):
+            shutil.copy(os.path.join(DATA_DIR, file_name), self.folder)
+        load_ingestor(self.folder)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(self.folder)
+
+    def test_touched_file_is_recorded(self):
+        file_name = source_files(self.folder)[0]
+        file_path = os.path.join(self.folder, file_name)
+        stat = os.stat(file_path)
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        state = (stat.st_size, stat.st_mtime_ns + 10**9)
+
+        ingestor, reason, manifest = read_snapshot(self.folder)
+        self.assertIsNone(reason)
+        self.assertEqual((manifest[file_name]["size"], manifest[file_name]["mtime_ns"]), state)
+        self.assertEqual(ingestor.files[file_name], state)
+
+        load_ingestor(self.folder)
+        ingestor, reason, manifest = read_snapshot(self.folder)
+        self.assertIsNone(reason)
+        self.assertIsNone(manifest)
+        self.assertIsNone(ingestor.refresh())
+
+    def test_changed_file_is_stale(self):
+        file_name = source_files(self.folder)[-1]
+        with open(os.path.join(self.folder, file_name), "ab") as f:
+            f.write(b" ")
+        _, reason, _ = read_snapshot(self.folder)
+        self.assertEqual(reason, f"{file_name} changed size")
+
+
+if __name__ == "__main__":
+    unittest.main()
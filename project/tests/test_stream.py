@@ -0,0 +1,46 @@
+import io
+import json
+import unittest
+
+from esportsdata.stream import iter_json
+
+DOCUMENTS = [
+    "[1.5, 2]",
+    "[-1, -2.5e-3, 1E+2, 0, 10, 12345678901234567890, 3.25]",
+    '[true, false, null, "a,b", "x\\"y", "\\u00e9t\\u00e9", "ünïcode"]',
+    '[{"k": [1, 2.0, {"n": -0.5}]}, [], {}, [[1], [2, 3]]]',
+    '{"a": 1.25, "bb": [true, false, null], "ccc": "text", "d": -7e2}',
+    " [ 1 ,\n 2.5 ,\t-3 ] ",
+    "[]",
+    "{}",
+]
+
+
+def read(document, chunk_size):
+    records = list(iter_json(io.StringIO(document), chunk_size))
+    return dict(records) if document.strip().startswith("{") else records
+
+
+# Numbers and tokens split across chunks must decode the same as the whole document
+class IterJsonTest(unittest.TestCase):
+    def test_chunk_boundaries(self):
+        for document in DOCUMENTS:
+            for chunk_size in range(1, len(document) + 2):
+                with self.subTest(document=document, chunk_size=chunk_size):
+                    self.assertEqual(read(document, chunk_size), json.loads(document))
+
+    def test_number_split_after_point_or_exponent(self):
+        for chunk_size in (1, 2, 3):
+            self.assertEqual(read("[1.5, 2]", chunk_size), [1.5, 2])
+            self.assertEqual(read("[1e5,-2E-1]", chunk_size), [1e5, -0.2])
+
+    def test_invalid_documents_raise(self):
+        for document in ("[1.x]", "[1, 2", "[tru]", '{"a" 1}', "[1 2]"):
+            for chunk_size in (1, 3, 1 << 16):
+                with self.subTest(document=document, chunk_size=chunk_size):
+                    with self.assertRaises(json.JSONDecodeError):
+                        read(document, chunk_size)
+
+
+if __name__ == "__main__":
+    unittest.main()
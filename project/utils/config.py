@@ -0,0 +1,27 @@
+import os
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Paths and endpoints shared by the query service, the Streamlit UI and the CLI. Each one
+# can be overridden with the environment variable next to it.
+DATA_DIR = os.environ.get("VCT_DATA_DIR", os.path.join(PROJECT_DIR, "esports-data"))
+STATS_STORE_DIR = os.environ.get("VCT_STATS_STORE", os.path.join(PROJECT_DIR, ".cache", "vlr-history"))
+# esports-data split into league/year shards, and how much of it may be loaded at once
+SHARDS_DIR = os.environ.get("VCT_SHARDS_DIR", os.path.join(PROJECT_DIR, "shards"))
+SHARD_MEMORY_MB = float(os.environ.get("VCT_SHARD_MEMORY_MB", "256"))
+# vlr.gg player -> esports-data player links, and the hand-kept corrections applied on top
+PLAYER_LINKS_PATH = os.environ.get("VCT_PLAYER_LINKS", os.path.join(PROJECT_DIR, ".cache", "player-links.json"))
+PLAYER_OVERRIDES_PATH = os.environ.get("VCT_PLAYER_OVERRIDES", os.path.join(PROJECT_DIR, "player-overrides.csv"))
+# Requests the stats fetcher has open to vlr.gg at once; more pages queue behind them
+VLR_MAX_PER_HOST = int(os.environ.get("VCT_VLR_MAX_PER_HOST", "4"))
+
+SERVICE_HOST = os.environ.get("VCT_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.environ.get("VCT_SERVICE_PORT", "8765"))
+SERVICE_URL = os.environ.get("VCT_SERVICE_URL", f"http://{SERVICE_HOST}:{SERVICE_PORT}")
+
+AWS_PROFILE = os.environ.get("AWS_PROFILE", "Hackthon")  # Needs Bedrock access in AWS_REGION
+AWS_REGION = os.environ.get("VCT_AWS_REGION", "ap-northeast-1")  # Tokyo region
+MODEL_ID = os.environ.get("VCT_MODEL_ID", "amazon.titan-text-express-v1")
+
+# Model requests per second allowed by the account quota, shared by every caller
+REQUESTS_PER_SECOND = float(os.environ.get("VCT_REQUESTS_PER_SECOND", "2"))
@@ -0,0 +1,221 @@
+import difflib
+import heapq
+import re
+from collections import defaultdict
+
+from utils.metrics import timed
+
+
+# Scorers on a 0-100 scale, matching fuzzywuzzy's pure-python implementations
+def similarity(name1, name2):
+    return 100 * difflib.SequenceMatcher(None, name1, name2).ratio()
+
+
+def ratio(name1, name2):
+    if not name1 or not name2:
+        return 0
+    return int(round(similarity(name1, name2)))
+
+
+def partial_ratio(name1, name2):
+    if not name1 or not name2:
+        return 0
+    shorter, longer = (name1, name2) if len(name1) <= len(name2) else (name2, name1)
+
+    best = 0
+    for block in difflib.SequenceMatcher(None, shorter, longer).get_matching_blocks():
+        long_start = max(0, block[1] - block[0])
+        window = longer[long_start:long_start + len(shorter)]
+        score = difflib.SequenceMatcher(None, shorter, window).ratio()
+        if score > 0.995:
+            return 100
+        best = max(best, score)
+    return int(round(100 * best))
+
+
+_NON_ALPHANUMERIC = re.compile(r"(?ui)\W")
+_EXTENDED_ASCII = {code: None for code in range(128, 256)}
+
+
+# fuzzywuzzy's full_process: drop extended-ASCII characters, turn everything that isn't a
+# letter or digit into a space, lowercase and strip
+def full_process(name):
+    return _NON_ALPHANUMERIC.sub(" ", (name or "").translate(_EXTENDED_ASCII)).lower().strip()
+
+
+def token_sort_ratio(name1, name2, scorer=ratio):
+    sorted1 = " ".join(sorted(name1.split()))
+    sorted2 = " ".join(sorted(name2.split()))
+    return scorer(sorted1, sorted2)
+
+
+def token_set_ratio(name1, name2, scorer=ratio):
+    tokens1, tokens2 = set(name1.split()), set(name2.split())
+    common = " ".join(sorted(tokens1 & tokens2))
+    combined1 = f"{common} {' '.join(sorted(tokens1 - tokens2))}".strip()
+    combined2 = f"{common} {' '.join(sorted(tokens2 - tokens1))}".strip()
+    return max(scorer(common, combined1), scorer(common, combined2), scorer(combined1, combined2))
+
+
+# fuzzywuzzy's WRatio (the default scorer of process.extractOne): the best of ratio and the
+# token ratios, switching to their partial forms, scaled down, when one name is 1.5x longer
+def wratio(name1, name2, ratio=ratio, partial_ratio=partial_ratio):
+    name1, name2 = full_process(name1), full_process(name2)
+    if not name1 or not name2:
+        return 0
+
+    base = ratio(name1, name2)
+    length_ratio = max(len(name1), len(name2)) / min(len(name1), len(name2))
+    if length_ratio < 1.5:
+        return int(round(max(base, token_sort_ratio(name1, name2, ratio) * 0.95, token_set_ratio(name1, name2, ratio) * 0.95)))
+
+    partial_scale = 0.6 if length_ratio > 8 else 0.9
+    return int(round(max(
+        base,
+        partial_ratio(name1, name2) * partial_scale,
+        token_sort_ratio(name1, name2, partial_ratio) * 0.95 * partial_scale,
+        token_set_ratio(name1, name2, partial_ratio) * 0.95 * partial_scale,
+    )))
+
+
+# Length of the longest common subsequence, bit-parallel over name1's positions (Hyyrö):
+# the blocks difflib matches are in order in both names, so they never match more
+def common_subsequence(name1, name2):
+    positions = {}
+    for index, char in enumerate(name1):
+        positions[char] = positions.get(char, 0) | 1 << index
+    everything = (1 << len(name1)) - 1
+    unmatched = everything
+    for char in name2:
+        matched = unmatched & positions.get(char, 0)
+        unmatched = (unmatched + matched | unmatched - matched) & everything
+    return len(name1) - bin(unmatched).count("1")
+
+
+# Upper bounds on the scorers above from the common subsequence alone, computed and rounded
+# the same way so a candidate can be skipped without running difflib
+def similarity_bound(name1, name2):
+    if not name1 and not name2:
+        return 100.0
+    return 100 * (2.0 * common_subsequence(name1, name2) / (len(name1) + len(name2)))
+
+
+def ratio_bound(name1, name2):
+    if not name1 or not name2:
+        return 0
+    return int(round(similarity_bound(name1, name2)))
+
+
+# A window of the longer name matches at most as many characters as it has, so no window
+# beats the shorter name matching a whole common subsequence in a window of just that
+def partial_ratio_bound(name1, name2):
+    if not name1 or not name2:
+        return 0
+    shorter = name1 if len(name1) <= len(name2) else name2
+    shared = common_subsequence(name1, name2)
+    return int(round(100 * (2.0 * shared / (len(shorter) + shared))))
+
+
+def wratio_bound(name1, name2):
+    return wratio(name1, name2, ratio=ratio_bound, partial_ratio=partial_ratio_bound)
+
+
+UPPER_BOUNDS = {
+    similarity: similarity_bound,
+    ratio: ratio_bound,
+    partial_ratio: partial_ratio_bound,
+    wratio: wratio_bound,
+}
+
+
+def normalize(name):
+    return (name or "").strip().lower()
+
+
+def trigrams(text):
+    padded = f" {text} "
+    if len(padded) < 3:
+        return {padded}
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Trigram inverted index over a set of names. Candidates are the names sharing the
+# most trigrams with the query; only those are rescored with the exact scorer, and not
+# even those whose upper bound can't pass the threshold or beat the matches found so far.
+class FuzzyIndex:
+    def __init__(self, names=(), scorer=ratio, candidates=32, dense_posting=2000):
+        self.scorer = scorer
+        self.bound = UPPER_BOUNDS.get(scorer)
+        self.candidates = candidates
+        # Trigrams shared by more names than this only re-rank existing candidates
+        self.dense_posting = dense_posting
+        self.names = []
+        self.exact = {}  # normalized name -> [name id]
+        self.postings = defaultdict(set)  # trigram -> {name id}
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    # Name ids follow insertion order, so callers can keep rows in a parallel list
+    def add(self, name):
+        key = normalize(name)
+        name_id = len(self.names)
+        self.names.append(name)
+        self.exact.setdefault(key, []).append(name_id)
+        for gram in trigrams(key):
+            self.postings[gram].add(name_id)
+        return name_id
+
+    def _candidates(self, query):
+        grams = [gram for gram in trigrams(query) if gram in self.postings]
+        grams.sort(key=lambda gram: len(self.postings[gram]))
+
+        counts = defaultdict(int)
+        for gram in grams:
+            posting = self.postings[gram]
+            if len(posting) <= self.dense_posting or not counts:
+                for name_id in posting:
+                    counts[name_id] += 1
+            else:
+                for name_id in counts:
+                    if name_id in posting:
+                        counts[name_id] += 1
+        return heapq.nlargest(self.candidates, counts, key=counts.__getitem__)
+
+    @timed("fuzzy_match")
+    def search_ids(self, query, limit=5, threshold=80):
+        query = normalize(query)
+        if not query:
+            return []
+
+        scored = {}
+        for name_id in self.exact.get(query, []):
+            scored[name_id] = 100
+        kept = heapq.nlargest(limit, (score for score in scored.values() if score > threshold))
+        heapq.heapify(kept)  # the best limit scores above threshold so far
+        for name_id in self._candidates(query):
+            if name_id in scored:
+                continue
+            name = normalize(self.names[name_id])
+            # Ties go to earlier names, so one that can at most tie the kept scores can't place
+            floor = kept[0] if limit and len(kept) == limit else threshold
+            if self.bound and self.bound(query, name) <= floor:
+                continue
+            scored[name_id] = score = self.scorer(query, name)
+            if score > threshold:
+                if len(kept) < limit:
+                    heapq.heappush(kept, score)
+                else:
+                    heapq.heappushpop(kept, score)
+
+        matches = [(name_id, score) for name_id, score in scored.items() if score > threshold]
+        return heapq.nlargest(limit, matches, key=lambda match: match[1])
+
+    def search(self, query, limit=5, threshold=80):
+        return [(self.names[name_id], score) for name_id, score in self.search_ids(query, limit, threshold)]
+
+    def best(self, query, threshold=80):
+        matches = self.search(query, limit=1, threshold=threshold)
+        return matches[0] if matches else (None, 0)
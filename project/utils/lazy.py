@@ -0,0 +1,19 @@
+import importlib
+import sys
+
+
+# Module-level __getattr__ and __dir__ for a package that re-exports names from its
+# submodules. Each submodule is imported the first time one of its names is read, so
+# `from vlrdata import StatsStore` doesn't load the scraper's dependencies along with it.
+def lazy_exports(package, exports):
+    def __getattr__(name):
+        if name not in exports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(exports[name], package), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        return sorted({*vars(sys.modules[package]), *exports})
+
+    return __getattr__, __dir__
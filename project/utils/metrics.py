@@ -0,0 +1,126 @@
+import functools
+import json
+import os
+import re
+import threading
+import time
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, error=exc_type is not None)
+        return False
+
+
+# Named timing spans and counters for the app's phases (load, link, index_build, lookup,
+# fuzzy_match, scrape, prompt_build, llm_call). When disabled, span() hands back a shared
+# no-op context and count() returns straight away.
+class Metrics:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.spans = {}  # name -> [calls, total seconds, max seconds, errors]
+        self.counters = {}  # name -> value
+        self._lock = threading.Lock()
+
+    def span(self, name):
+        return _Span(self, name) if self.enabled else _NULL_SPAN
+
+    # Decorator form of span() for whole functions
+    def timed(self, name):
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def observe(self, name, seconds, error=False):
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = [0, 0.0, 0.0, 0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] += 1 if error else 0
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "spans": {
+                    name: {"calls": calls, "total_seconds": total, "max_seconds": longest, "errors": errors}
+                    for name, (calls, total, longest, errors) in sorted(self.spans.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def to_json(self, indent=None):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    # Prometheus text exposition format
+    def to_prometheus(self, prefix="vct"):
+        snapshot = self.snapshot()
+        lines = []
+        for metric, field, kind in (
+            ("span_calls_total", "calls", "counter"),
+            ("span_seconds_total", "total_seconds", "counter"),
+            ("span_seconds_max", "max_seconds", "gauge"),
+            ("span_errors_total", "errors", "counter"),
+        ):
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            for name, stats in snapshot["spans"].items():
+                lines.append(f'{prefix}_{metric}{{span="{name}"}} {stats[field]}')
+        for name, value in snapshot["counters"].items():
+            metric = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry; set VCT_METRICS=0 to turn it off
+metrics = Metrics(enabled=os.environ.get("VCT_METRICS", "1") != "0")
+
+
+def span(name):
+    return metrics.span(name)
+
+
+def timed(name):
+    return metrics.timed(name)
+
+
+def count(name, value=1):
+    metrics.count(name, value)
@@ -0,0 +1,159 @@
+import argparse
+import json
+import logging
+import os
+import sys
+
+from utils.config import DATA_DIR, STATS_STORE_DIR
+
+# Data-only queries from the command line: player, team, game and tournament lookups over
+# the esports-data snapshot, and top-k over the stats history store. Only the index
+# (and NumPy, for stats) is loaded; the model, UI and scraper code never are.
+
+
+def _print(result, as_json=True):
+    if as_json:
+        print(json.dumps(result, indent=2))
+        return
+    for item in result if isinstance(result, list) else [result]:
+        print("\n".join(f"{key}: {', '.join(map(str, value)) if isinstance(value, list) else value}" for key, value in item.items()))
+        print()
+
+
+def _index(args):
+    from esportsdata.snapshot import load_index
+    return load_index(args.data_dir)
+
+
+def _name(entity, *fields):
+    return next((entity[field] for field in fields if entity.get(field)), "")
+
+
+def player_summary(index, player):
+    games = index.games_for_player(player)
+    return {
+        "id": player.get("id"),
+        "handle": player.get("handle"),
+        "name": " ".join(part for part in (player.get("first_name"), player.get("last_name")) if part),
+        "team": _name(index.team_for_player(player), "name"),
+        "league": _name(index.league_for_team(index.team_for_player(player)), "name"),
+        "games": len(games),
+        "tournaments": sorted({_name(game["tournament_info"], "name", "id") for game in games} - {""}),
+    }
+
+
+def team_summary(index, team):
+    return {
+        "id": team.get("id"),
+        "name": team.get("name"),
+        "acronym": team.get("acronym"),
+        "league": _name(index.league_for_team(team), "name"),
+        "roster": sorted(player.get("handle") or "" for player in index.roster(team)),
+        "games": len(index.games_for_team(team)),
+    }
+
+
+def game_summary(game):
+    return {
+        "id": game["platformGameId"],
+        "tournament": _name(game["tournament_info"], "name", "id"),
+        "league": _name(game["league_info"], "name"),
+        "teams": [_name(team, "name", "id") for team in game["teams"].values()],
+        "players": [_name(player, "handle", "id") for player in game["participants"].values()],
+    }
+
+
+# Tournaments by id, by exact name, else every one whose name contains the query
+def find_tournaments(index, query):
+    if query in index.tournaments:
+        return [index.tournaments[query]]
+    query = query.strip().lower()
+    exact = [tournament for tournament in index.tournaments.values() if (tournament.get("name") or "").lower() == query]
+    return exact or [tournament for tournament in index.tournaments.values() if query in (tournament.get("name") or "").lower()]
+
+
+def tournament_summary(index, tournament):
+    code = index.tournament_ids.code(tournament.get("id", ""))
+    records = [record for record in index.records() if record.tournament == code] if code >= 0 else []
+    teams = {index.team_ids.key(team) for record in records for team in record.teams}
+    return {
+        "id": tournament.get("id"),
+        "name": tournament.get("name"),
+        "league": _name(index.leagues.get(tournament.get("league_id", ""), {}), "name"),
+        "games": len(records),
+        "teams": sorted(_name(index.teams.get(team_id, {}), "name") or team_id for team_id in teams),
+    }
+
+
+def player(args):
+    index = _index(args)
+    return [player_summary(index, found) for found in index.find_players(args.name, limit=args.limit)]
+
+
+def team(args):
+    index = _index(args)
+    return [team_summary(index, found) for found in index.find_teams(args.name, limit=args.limit)]
+
+
+def game(args):
+    from esportsdata.compact import GameView
+    index = _index(args)
+    record = index.games.get(index.game_ids.code(args.game_id))
+    return [game_summary(GameView(index, record))] if record is not None else []
+
+
+def tournament(args):
+    index = _index(args)
+    return [tournament_summary(index, found) for found in find_tournaments(index, args.name)[:args.limit]]
+
+
+def top(args):
+    from vlrdata.store import StatsStore
+    table = StatsStore(args.stats_store).table(args.date, args.timespan, [args.region] if args.region else None)
+    return table.top_k(args.metric, args.k, args.ascending, role=args.role, agent=args.agent, org=args.org, min_rounds=args.min_rounds)
+
+
+COMMANDS = {"player": player, "team": team, "game": game, "tournament": tournament, "top": top}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python vct.py", description="Look up VCT players, teams, games, tournaments and stats without the chatbot")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="esports-data folder")
+    parser.add_argument("--stats-store", default=STATS_STORE_DIR, help="vlr.gg stats history store")
+    parser.add_argument("--text", action="store_true", help="print key: value lines instead of JSON")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("player", "players by handle"), ("team", "teams by name, acronym or slug"), ("tournament", "tournaments by id or name")):
+        lookup_parser = subparsers.add_parser(name, help=help_text)
+        lookup_parser.add_argument("name")
+        lookup_parser.add_argument("--limit", type=int, default=5)
+    game_parser = subparsers.add_parser("game", help="a game by platformGameId")
+    game_parser.add_argument("game_id")
+    top_parser = subparsers.add_parser("top", help="the best players by a stats metric, from the latest snapshot")
+    top_parser.add_argument("metric", help="rating, acs, kd, adr, ... or a full metric name")
+    top_parser.add_argument("-k", type=int, default=10)
+    top_parser.add_argument("--ascending", action="store_true", help="lowest first")
+    top_parser.add_argument("--region")
+    top_parser.add_argument("--role")
+    top_parser.add_argument("--agent")
+    top_parser.add_argument("--org")
+    top_parser.add_argument("--min-rounds", type=float)
+    top_parser.add_argument("--date", help="snapshot date (default: the latest)")
+    top_parser.add_argument("--timespan", default="60")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=os.environ.get("VCT_LOG_LEVEL", "WARNING").upper())
+    try:
+        result = COMMANDS[args.command](args)
+    except (KeyError, ValueError) as e:
+        print(f"{args.command}: {e.args[0] if e.args else e}", file=sys.stderr)
+        return 2
+    if not result:
+        print(f"No {args.command} found", file=sys.stderr)
+        return 1
+    _print(result, not args.text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
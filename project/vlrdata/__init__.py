@@ -1 +1,15 @@
-from .vlr_fetch import fetch_stats
+from utils.lazy import lazy_exports
+
+# requests and selectolax are only needed to scrape, so nothing is imported until it is used
+_EXPORTS = {
+    "fetch_stats": ".vlr_fetch",
+    "StatsFetcher": ".fetcher",
+    "get_fetcher": ".fetcher",
+    "StatsTable": ".table",
+    "build_rosters": ".team_builder",
+    "StatsStore": ".store",
+    "JoinTable": ".resolve",
+    "Resolver": ".resolve",
+}
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,147 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from .store import DEFAULT_STORE_DIR, StatsStore
+from .vlr_fetch import parse_stats
+
+# Saved pages are named <region>_<timespan>[_<YYYY-MM-DD>].html. Without a date in the
+# name the parent directory's name is used when it is a date, else the file's mtime.
+PAGE_RE = re.compile(r"^(?P<region>[a-z0-9-]+)_(?P<timespan>[a-z0-9]+)(?:_(?P<date>\d{4}-\d{2}-\d{2}))?\.html?$", re.IGNORECASE)
+DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _date(timestamp):
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp))
+
+
+# One stats page to backfill: where it comes from and which partition it fills
+def _page(path, region, timespan, date, kind):
+    return {"path": path, "region": region.lower(), "timespan": timespan.lower(), "date": date, "kind": kind, "mtime": os.path.getmtime(path)}
+
+
+def _html_page(path):
+    match = PAGE_RE.match(os.path.basename(path))
+    if not match:
+        return None
+    date = match["date"]
+    if not date:
+        parent = os.path.basename(os.path.dirname(os.path.abspath(path)))
+        date = parent if DATE_RE.match(parent) else _date(os.path.getmtime(path))
+    return _page(path, match["region"], match["timespan"], date, "html")
+
+
+# StatsFetcher cache entries already hold parsed segments; the region and timespan come
+# from the URL and the date from when it was fetched
+def _cache_page(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+        query = parse_qs(urlsplit(entry["url"]).query)
+        timespan = query["timespan"][0]
+        timespan = timespan[:-1] if timespan.endswith("d") else timespan  # stats_url sends 60 as "60d"
+        return _page(path, query["region"][0], timespan, _date(entry["fetched_at"]), "cache")
+    except (OSError, ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+# Every page under the given files or directories, one per partition (the newest source wins)
+def find_pages(sources):
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            for directory, _, file_names in os.walk(source):
+                paths.extend(os.path.join(directory, file_name) for file_name in sorted(file_names))
+        else:
+            paths.append(source)
+
+    pages = {}
+    for path in paths:
+        if path.endswith((".html", ".htm")):
+            page = _html_page(path)
+        elif path.endswith(".json"):
+            page = _cache_page(path)
+        else:
+            page = None
+        if page is None:
+            logging.debug("Skipping %s: not a stats page", path)
+            continue
+        key = (page["region"], page["timespan"], page["date"])
+        if key not in pages or pages[key]["mtime"] < page["mtime"]:
+            pages[key] = page
+    return [pages[key] for key in sorted(pages)]
+
+
+# Runs in a worker process: parse one page and write its partition. Errors are returned,
+# not raised, so one bad page doesn't stop the backfill.
+def backfill_page(page, store_root):
+    start = time.perf_counter()
+    try:
+        if page["kind"] == "html":
+            with open(page["path"], encoding="utf-8", errors="replace") as f:
+                segments = parse_stats(f.read())
+        else:
+            with open(page["path"], encoding="utf-8") as f:
+                segments = json.load(f)["segments"]
+        StatsStore(store_root).append_segments(page["region"], page["timespan"], page["date"], segments)
+        return {**page, "rows": len(segments), "seconds": time.perf_counter() - start}
+    except Exception as e:
+        return {**page, "error": f"{type(e).__name__}: {e}"}
+
+
+# Parse pages in a process pool and write each into its partition. Partitions newer than
+# their source are skipped unless force is set. Returns {"written", "skipped", "failed",
+# "rows", "seconds"}.
+def backfill(sources, store_root=DEFAULT_STORE_DIR, workers=None, force=False):
+    start = time.perf_counter()
+    store = StatsStore(store_root)
+    pages = find_pages(sources)
+    todo = []
+    skipped = 0
+    for page in pages:
+        path = store.partition_path(page["region"], page["timespan"], page["date"])
+        if not force and os.path.isfile(path) and os.path.getmtime(path) >= page["mtime"]:
+            skipped += 1
+        else:
+            todo.append(page)
+
+    written, failed, rows = 0, [], 0
+    if todo:
+        workers = min(workers or os.cpu_count() or 1, len(todo))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(backfill_page, todo, [store_root] * len(todo), chunksize=max(1, len(todo) // (workers * 4))):
+                if "error" in result:
+                    logging.error(f"Backfilling {result['path']} failed: {result['error']}")
+                    failed.append(result)
+                else:
+                    logging.debug("Backfilled %s/%s/%s: %s rows", result["region"], result["timespan"], result["date"], result["rows"])
+                    written += 1
+                    rows += result["rows"]
+    return {"written": written, "skipped": skipped, "failed": failed, "rows": rows, "seconds": time.perf_counter() - start}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m vlrdata.backfill", description="Load saved vlr.gg stats pages into the stats history store")
+    parser.add_argument("sources", nargs="+", help="saved pages (<region>_<timespan>[_<YYYY-MM-DD>].html), fetcher cache entries, or directories of them")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR, help="stats store directory")
+    parser.add_argument("--workers", type=int, help="parser processes (default: one per core)")
+    parser.add_argument("--force", action="store_true", help="rewrite partitions that are already up to date")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=os.environ.get("VCT_LOG_LEVEL", "INFO").upper())
+    summary = backfill(args.sources, args.store, args.workers, args.force)
+    print(
+        f"{summary['written']} partitions written ({summary['rows']} rows), {summary['skipped']} up to date, "
+        f"{len(summary['failed'])} failed in {summary['seconds']:.1f}s"
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.config import VLR_MAX_PER_HOST
+from utils.metrics import count, span
+from utils.utils import headers, region as regions
+from .vlr_fetch import VLR_URL, parse_stats, stats_url
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "vlr")
+
+
+# Fetches vlr.gg stats pages concurrently over one pooled session. Responses are kept
+# on disk with their parsed segments: within the TTL they are served without touching
+# the network, after it they are revalidated with If-None-Match / If-Modified-Since.
+# Every region is on the same host, so at most max_per_host of a sweep's pages are in
+# flight at once and the rest queue for a free slot.
+class StatsFetcher:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=3600, max_per_host=VLR_MAX_PER_HOST, workers=16, base_url=VLR_URL, session=None):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_per_host = max_per_host
+        self.workers = workers
+        self.base_url = base_url.rstrip("/")
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_per_host, pool_maxsize=max_per_host)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(headers)
+        self.session = session
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[host]
+
+    def _cache_path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _read_cache(self, url):
+        path = self._cache_path(url)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable cache entry for {url}: {e}")
+            return None
+        return entry if entry.get("url") == url else None
+
+    def _write_cache(self, url, entry):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._cache_path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def fetch_url(self, url):
+        with span("scrape"):
+            return self._fetch_url(url)
+
+    def _fetch_url(self, url):
+        entry = self._read_cache(url)
+        if entry and self.ttl and time.time() - entry["fetched_at"] < self.ttl:
+            count("scrape.cache_hits")
+            return entry["segments"]
+
+        request_headers = {}
+        if entry:
+            if entry.get("etag"):
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        with self._host_slot(url):
+            resp = self.session.get(url, headers=request_headers, timeout=30)
+
+        if resp.status_code == 304 and entry:
+            count("scrape.not_modified")
+            entry["fetched_at"] = time.time()
+            self._write_cache(url, entry)
+            return entry["segments"]
+        if resp.status_code != 200:
+            raise Exception("API response: {}".format(resp.status_code))
+
+        count("scrape.downloads")
+        segments = parse_stats(resp.text)
+        self._write_cache(url, {
+            "url": url,
+            "fetched_at": time.time(),
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "segments": segments,
+        })
+        return segments
+
+    # Same shape as vlr_fetch.fetch_stats
+    def fetch(self, region, timespan):
+        segments = self.fetch_url(stats_url(region, timespan, self.base_url))
+        return {"data": {"status": 200, "segments": segments}}
+
+    # Fetch every region x timespan pair at once. Failed pages map to their exception
+    # so one bad region doesn't lose the rest of the sweep.
+    def fetch_many(self, region_keys=None, timespans=("60",)):
+        pairs = [(region, timespan) for region in (region_keys or regions) for timespan in timespans]
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(pairs)) or 1) as executor:
+            futures = {pair: executor.submit(self.fetch, *pair) for pair in pairs}
+            for pair, future in futures.items():
+                try:
+                    results[pair] = future.result()
+                except Exception as e:
+                    logging.error(f"Fetching stats for {pair[0]}/{pair[1]} failed: {e}")
+                    results[pair] = e
+        return results
+
+
+_default_fetcher = None
+
+
+def get_fetcher():
+    global _default_fetcher
+    if _default_fetcher is None:
+        _default_fetcher = StatsFetcher()
+    return _default_fetcher
@@ -0,0 +1,304 @@
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from utils.config import DATA_DIR, PLAYER_LINKS_PATH, PLAYER_OVERRIDES_PATH, STATS_STORE_DIR
+from utils.fuzzy import normalize, similarity
+from utils.metrics import count, span
+
+from .store import StatsStore
+
+NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+UNKNOWN_ORGS = {"", "n/a", "-"}
+
+# Handle scores on a 0-1 scale, scaled by what the scraped org says about the candidate
+NORMALIZED_SCORE = 0.95  # same handle once case and punctuation are dropped
+SAME_TEAM = 1.0
+UNKNOWN_TEAM = 0.9  # no org, or an org that names no team
+OTHER_TEAM = 0.8  # the org names teams, but not the candidate's home team
+MIN_CONFIDENCE = 0.7
+# Candidates this close to the best one halve its confidence at worst
+AMBIGUITY_MARGIN = 0.1
+GLOBAL_CANDIDATES = 10
+GLOBAL_THRESHOLD = 70  # 0-100, for the index's trigram handle matcher
+
+LINKS_VERSION = 1
+
+
+# Blocking key: lowercase letters and digits only, so "Less." and "LESS" share a block
+def handle_key(name):
+    return NON_ALNUM_RE.sub("", (name or "").lower())
+
+
+def link_key(player, org):
+    return f"{(player or '').strip().lower()}\t{(org or '').strip().lower()}"
+
+
+# Links scraped vlr.gg players (a display name and an org token) to esports-data players.
+# Candidates come from blocks instead of comparing every pair:
+#   exact handle, then the same handle_key, then fuzzy handles on the org's rosters,
+#   and only when none of those is good enough, the index's trigram handle matcher.
+# Each candidate's handle score is scaled by whether its home team is one the org names,
+# and the best one is discounted when another candidate scores nearly as well.
+class Resolver:
+    def __init__(self, index):
+        self.index = index
+        self.players_by_key = defaultdict(list)  # handle_key -> [player id]
+        for handle, player_ids in index.players_by_handle.items():
+            self.players_by_key[handle_key(handle)].extend(player_ids)
+        self.teams_by_key = defaultdict(set)  # handle_key of acronym / slug / name -> {team id}
+        for team_id, team in index.teams.items():
+            for field in ("acronym", "slug", "name"):
+                key = handle_key(team.get(field))
+                if key:
+                    self.teams_by_key[key].add(team_id)
+        self._player_keys = {}  # player id -> handle_key
+        self.fingerprint = self._fingerprint()
+
+    # Changes whenever a player's handle or home team, or a team's names, change
+    def _fingerprint(self):
+        digest = hashlib.sha1()
+        for player_id in sorted(self.index.players):
+            player = self.index.players[player_id]
+            digest.update(f"{player_id}\t{player.get('handle')}\t{player.get('home_team_id')}\n".encode("utf-8"))
+        for team_id in sorted(self.index.teams):
+            team = self.index.teams[team_id]
+            digest.update(f"{team_id}\t{team.get('acronym')}\t{team.get('slug')}\t{team.get('name')}\n".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def _player_key(self, player_id):
+        key = self._player_keys.get(player_id)
+        if key is None:
+            key = self._player_keys[player_id] = handle_key(self.index.players.get(player_id, {}).get("handle"))
+        return key
+
+    def _person(self, player_id):
+        player = self.index.players.get(player_id, {})
+        return self._player_key(player_id), normalize(player.get("first_name")), normalize(player.get("last_name")), player.get("home_team_id")
+
+    def org_teams(self, org):
+        org = (org or "").strip().lower()
+        if org in UNKNOWN_ORGS:
+            return set()
+        return self.teams_by_key.get(handle_key(org), set())
+
+    # player id -> (handle score, method) for one scraped name
+    def _candidates(self, player, teams):
+        name = (player or "").strip().lower()
+        key = handle_key(name)
+        if not key:
+            return {}
+
+        scores = {player_id: (1.0, "exact") for player_id in self.index.players_by_handle.get(name, ())}
+        for player_id in self.players_by_key.get(key, ()):
+            scores.setdefault(player_id, (NORMALIZED_SCORE, "normalized"))
+        if scores:
+            return scores
+
+        for team_id in teams:
+            for player_id in self.index.players_by_team.get(team_id, ()):
+                scores[player_id] = (similarity(key, self._player_key(player_id)) / 100, "roster")
+        if any(score * SAME_TEAM >= MIN_CONFIDENCE for score, _ in scores.values()):
+            return scores
+
+        count("resolve.global_searches")
+        for handle, _ in self.index.handle_matcher.search(name, GLOBAL_CANDIDATES, GLOBAL_THRESHOLD):
+            score = similarity(key, handle_key(handle)) / 100
+            for player_id in self.index.players_by_handle[handle]:
+                if score > scores.get(player_id, (0, None))[0]:
+                    scores[player_id] = (score, "fuzzy")
+        return scores
+
+    # {"player", "org", "player_id", "team_id", "confidence", "method", "candidates"};
+    # player_id is None when no candidate reaches MIN_CONFIDENCE
+    def resolve(self, player, org, teams=None):
+        teams = self.org_teams(org) if teams is None else teams
+        scored = []
+        for player_id, (score, method) in self._candidates(player, teams).items():
+            record = self.index.players.get(player_id, {})
+            home = record.get("home_team_id", "")
+            factor = SAME_TEAM if home in teams else OTHER_TEAM if teams else UNKNOWN_TEAM
+            scored.append((score * factor, record.get("updated_at") or "", method, player_id, home))
+        # Ties go to the most recently updated record
+        scored.sort(reverse=True)
+
+        row = {"player": player, "org": org, "player_id": None, "team_id": None, "confidence": 0.0, "method": "unmatched", "candidates": len(scored)}
+        if len(teams) == 1:
+            row["team_id"] = next(iter(teams))
+        if not scored:
+            return row
+
+        best, _, method, player_id, home = scored[0]
+        # players.json has some people twice under different ids; those aren't rivals
+        person = self._person(player_id)
+        runner_up = next((candidate[0] for candidate in scored[1:] if self._person(candidate[3]) != person), 0.0)
+        confidence = best * min(1.0, 0.5 + (best - runner_up) / (2 * AMBIGUITY_MARGIN))
+        row["confidence"] = round(confidence, 3)
+        if confidence < MIN_CONFIDENCE:
+            row["method"] = "ambiguous" if best >= MIN_CONFIDENCE else "unmatched"
+            return row
+        row.update(player_id=player_id, method=method)
+        if home in teams:
+            row["team_id"] = home
+        return row
+
+    # resolve() for many (player, org) pairs; orgs are looked up once each
+    def resolve_all(self, pairs):
+        teams_by_org = {}
+        rows = []
+        with span("resolve_players"):
+            for player, org in pairs:
+                if org not in teams_by_org:
+                    teams_by_org[org] = self.org_teams(org)
+                rows.append(self.resolve(player, org, teams_by_org[org]))
+        count("resolve.rows", len(rows))
+        return rows
+
+
+# Hand-kept corrections: a CSV with player, org and player_id columns. A blank org applies
+# to the player under every org; a blank player_id keeps the player unlinked.
+def read_overrides(path):
+    overrides = {}
+    if not path or not os.path.exists(path):
+        return overrides
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            player = (row.get("player") or "").strip()
+            if player and not player.startswith("#"):
+                overrides[link_key(player, row.get("org"))] = (row.get("player_id") or "").strip() or None
+    return overrides
+
+
+# Scraped player -> esports-data player join table, saved as JSON. update() resolves only
+# pairs it has not seen, unless the esports-data players or teams have changed since the
+# saved links were made. Overrides are read fresh and applied on every lookup, so editing
+# the file never needs a re-resolve.
+class JoinTable:
+    def __init__(self, path=PLAYER_LINKS_PATH, overrides_path=PLAYER_OVERRIDES_PATH):
+        self.path = path
+        self.overrides_path = overrides_path
+        self.fingerprint = None
+        self.links = {}  # link key -> resolved row
+        self.overrides = {}  # link key -> player id or None
+        self.load()
+
+    def __len__(self):
+        return len(self.links)
+
+    def load(self):
+        self.fingerprint, self.links = None, {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("version") == LINKS_VERSION:
+                self.fingerprint = saved.get("fingerprint")
+                self.links = {link_key(row["player"], row["org"]): row for row in saved.get("links", [])}
+        self.overrides = read_overrides(self.overrides_path)
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": LINKS_VERSION, "fingerprint": self.fingerprint, "links": list(self.links.values())}, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return self.path
+
+    # Resolve the pairs that are new (or everything, when the esports data changed or
+    # force is set) and save. Returns a summary of the run.
+    def update(self, resolver, pairs, force=False):
+        start = time.perf_counter()
+        pairs = {link_key(player, org): (player, org) for player, org in pairs}
+        stale = force or self.fingerprint != resolver.fingerprint
+        if stale:
+            pending = {key: (row["player"], row["org"]) for key, row in self.links.items()}
+            pending.update(pairs)
+            self.links = {}
+        else:
+            pending = {key: pair for key, pair in pairs.items() if key not in self.links}
+
+        for row in resolver.resolve_all(pending.values()):
+            self.links[link_key(row["player"], row["org"])] = row
+        self.fingerprint = resolver.fingerprint
+        self.overrides = read_overrides(self.overrides_path)
+        self.save()
+
+        rows = [self.get(player, org) for player, org in pairs.values()]
+        return {
+            "pairs": len(pairs),
+            "resolved": len(pending),
+            "reused": len(pairs) - len(pairs.keys() & pending.keys()),
+            "matched": sum(row["player_id"] is not None for row in rows),
+            "overridden": sum(row["method"] == "override" for row in rows),
+            "seconds": time.perf_counter() - start,
+        }
+
+    def _override(self, player, org):
+        for key in (link_key(player, org), link_key(player, None)):
+            if key in self.overrides:
+                return key
+        return None
+
+    # The row for a scraped player, with any override applied
+    def get(self, player, org=None):
+        row = self.links.get(link_key(player, org))
+        override = self._override(player, org)
+        if override is None:
+            return row
+        base = row or {"player": player, "org": org, "team_id": None, "candidates": 0}
+        return dict(base, player_id=self.overrides[override], confidence=1.0, method="override")
+
+    def player_id(self, player, org=None):
+        row = self.get(player, org)
+        return row["player_id"] if row else None
+
+    def rows(self):
+        return [self.get(row["player"], row["org"]) for row in self.links.values()]
+
+    # Scraped (player, org) pairs linked to an esports-data player id
+    def scraped_names(self, player_id):
+        return [(row["player"], row["org"]) for row in self.rows() if row["player_id"] == player_id]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m vlrdata.resolve", description="Link the players in the stats history store to esports-data players")
+    parser.add_argument("--store", default=STATS_STORE_DIR, help="stats store directory")
+    parser.add_argument("--data", default=DATA_DIR, help="esports-data folder")
+    parser.add_argument("--links", default=PLAYER_LINKS_PATH, help="join table file")
+    parser.add_argument("--overrides", default=PLAYER_OVERRIDES_PATH, help="manual overrides CSV (player, org, player_id)")
+    parser.add_argument("--force", action="store_true", help="re-resolve every pair, not just new ones")
+    parser.add_argument("--unmatched", action="store_true", help="print the pairs left unlinked, as override rows to fill in")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=os.environ.get("VCT_LOG_LEVEL", "INFO").upper())
+    from esportsdata.snapshot import load_index
+
+    pairs = StatsStore(args.store).player_orgs()
+    table = JoinTable(args.links, args.overrides)
+    summary = table.update(Resolver(load_index(args.data)), pairs, args.force)
+    print(
+        f"{summary['matched']}/{summary['pairs']} players linked ({summary['overridden']} by override), "
+        f"{summary['resolved']} resolved, {summary['reused']} reused in {summary['seconds']:.1f}s"
+    )
+    if args.unmatched:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(["player", "org", "player_id"])
+        for player, org in pairs:
+            if table.player_id(player, org) is None:
+                writer.writerow([player, org, ""])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .table import METRICS, StatsTable, metric_name, to_float
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "vlr-history")
+
+
+# Typed columns for one stats page: names as unicode arrays, agents comma-joined,
+# every metric as float64 (NaN when missing)
+def columns_from_segments(segments):
+    columns = {
+        "player": np.array([row["player"] for row in segments], dtype=str),
+        "org": np.array([row["org"] for row in segments], dtype=str),
+        "agents": np.array([",".join(row["agents"]) for row in segments], dtype=str),
+    }
+    for metric in METRICS:
+        columns[metric] = np.array([to_float(row.get(metric)) for row in segments], dtype=np.float64)
+    return columns
+
+
+# Scraped stats pages kept by snapshot date, one partition per region / timespan / date:
+#   <root>/<region>/<timespan>/<YYYY-MM-DD>.npz
+# Writing a partition replaces it, so re-running a backfill is safe. Recently read partitions
+# are kept in memory until the file changes.
+class StatsStore:
+    def __init__(self, root=DEFAULT_STORE_DIR, cache_size=64):
+        self.root = root
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # path -> (mtime_ns, columns, {lowercase player: [rows]})
+        self._lock = threading.Lock()
+
+    def partition_path(self, region, timespan, date):
+        return os.path.join(self.root, region, timespan, f"{date}.npz")
+
+    def write(self, region, timespan, date, columns):
+        path = self.partition_path(region, timespan, date)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **columns)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return path
+
+    def append_segments(self, region, timespan, date, segments):
+        return self.write(region, timespan, date, columns_from_segments(segments))
+
+    # Sorted (date, region, timespan) of every stored partition, optionally filtered
+    def partitions(self, region=None, timespan=None):
+        found = []
+        regions = [region] if region else sorted(os.listdir(self.root)) if os.path.isdir(self.root) else []
+        for region_name in regions:
+            region_dir = os.path.join(self.root, region_name)
+            if not os.path.isdir(region_dir):
+                continue
+            for timespan_name in [timespan] if timespan else sorted(os.listdir(region_dir)):
+                timespan_dir = os.path.join(region_dir, timespan_name)
+                if not os.path.isdir(timespan_dir):
+                    continue
+                for file_name in os.listdir(timespan_dir):
+                    if file_name.endswith(".npz"):
+                        found.append((file_name[:-len(".npz")], region_name, timespan_name))
+        return sorted(found)
+
+    def dates(self, region=None, timespan=None):
+        return sorted({date for date, _, _ in self.partitions(region, timespan)})
+
+    def _load(self, region, timespan, date):
+        path = self.partition_path(region, timespan, date)
+        mtime_ns = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None and cached[0] == mtime_ns:
+                self._cache.move_to_end(path)
+                return cached
+
+        with np.load(path, allow_pickle=False) as arrays:
+            columns = {name: arrays[name] for name in arrays.files}
+        rows_by_player = {}
+        for position, player in enumerate(columns["player"].tolist()):
+            rows_by_player.setdefault(player.lower(), []).append(position)
+        entry = (mtime_ns, columns, rows_by_player)
+
+        with self._lock:
+            self._cache[path] = entry
+            self._cache.move_to_end(path)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return entry
+
+    def read(self, region, timespan, date):
+        return self._load(region, timespan, date)[1]
+
+    # StatsTable of one snapshot across regions (the latest snapshot by default)
+    def table(self, date=None, timespan="60", regions=None):
+        partitions = [
+            partition for partition in self.partitions(timespan=timespan)
+            if regions is None or partition[1] in regions
+        ]
+        date = date or (partitions[-1][0] if partitions else None)
+        return StatsTable.from_columns({
+            region: self.read(region, partition_timespan, partition_date)
+            for partition_date, region, partition_timespan in partitions if partition_date == date
+        })
+
+    # A player's metric over the last `last` snapshot dates, oldest first:
+    # [{"date", "region", "timespan", "org", "value"}]. Only those dates' partitions are read.
+    def history(self, player, metric="rating", last=6, region=None, timespan="60"):
+        metric = metric_name(metric)
+        partitions = self.partitions(region, timespan)
+        dates = sorted({date for date, _, _ in partitions})[-last:] if last else []
+        wanted = set(dates)
+        name = player.strip().lower()
+
+        points = []
+        for date, region_name, timespan_name in partitions:
+            if date not in wanted:
+                continue
+            _, columns, rows_by_player = self._load(region_name, timespan_name, date)
+            for position in rows_by_player.get(name, []):
+                value = columns[metric][position]
+                points.append({
+                    "date": date,
+                    "region": region_name,
+                    "timespan": timespan_name,
+                    "org": str(columns["org"][position]),
+                    "value": None if np.isnan(value) else float(value),
+                })
+        return points
+
+    # Every distinct (player, org) pair across the stored partitions, as scraped
+    def player_orgs(self, region=None, timespan=None):
+        pairs = set()
+        for date, region_name, timespan_name in self.partitions(region, timespan):
+            columns = self.read(region_name, timespan_name, date)
+            pairs.update(zip(columns["player"].tolist(), columns["org"].tolist()))
+        return sorted(pairs)
@@ -0,0 +1,234 @@
+import numpy as np
+
+from utils.utils import agent_roles
+
+METRICS = [
+    "rounds_played",
+    "rating",
+    "average_combat_score",
+    "kill_deaths",
+    "kill_assists_survived_traded",
+    "average_damage_per_round",
+    "kills_per_round",
+    "assists_per_round",
+    "first_kills_per_round",
+    "first_deaths_per_round",
+    "headshot_percentage",
+    "clutch_success_percentage",
+]
+
+METRIC_ALIASES = {
+    "rounds": "rounds_played",
+    "acs": "average_combat_score",
+    "kd": "kill_deaths",
+    "kast": "kill_assists_survived_traded",
+    "adr": "average_damage_per_round",
+    "kpr": "kills_per_round",
+    "apr": "assists_per_round",
+    "fkpr": "first_kills_per_round",
+    "fdpr": "first_deaths_per_round",
+    "hs": "headshot_percentage",
+    "clutch": "clutch_success_percentage",
+}
+
+ROLES = sorted(set(agent_roles.values()))
+
+
+def to_float(value):
+    value = (value or "").strip().rstrip("%").replace(",", "")
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan  # "N/A" and anything else unparsable
+
+
+def metric_name(metric):
+    metric = METRIC_ALIASES.get(metric.lower(), metric.lower())
+    if metric not in METRICS:
+        raise KeyError(f"Unknown metric '{metric}'")
+    return metric
+
+
+# Scraped stats segments as columns: one float64 array per metric (NaN when missing),
+# integer codes for org and region, and multi-hot matrices for agents and roles
+class StatsTable:
+    def __init__(self, players, orgs, org_codes, regions, region_codes, agents, agent_matrix, metrics):
+        self.players = players  # object array of display names
+        self.orgs = orgs  # org code -> org
+        self.org_codes = org_codes
+        self.regions = regions  # region code -> region
+        self.region_codes = region_codes
+        self.agents = agents  # agent column -> agent
+        self.agent_matrix = agent_matrix  # rows x agents, bool
+        self.metrics = metrics  # metric -> float64 array
+        self.role_matrix = self._roles_from_agents()
+
+    @classmethod
+    def from_segments(cls, segments, region=""):
+        return cls.from_regions({region: segments})
+
+    # Build one table from {region: segments}, e.g. the results of StatsFetcher.fetch_many
+    @classmethod
+    def from_regions(cls, segments_by_region):
+        rows = [(region, row) for region, segments in segments_by_region.items() for row in segments]
+
+        players = np.array([row["player"] for _, row in rows], dtype=object)
+        orgs, org_codes = np.unique(np.array([row["org"] for _, row in rows], dtype=object), return_inverse=True)
+        regions, region_codes = np.unique(np.array([region for region, _ in rows], dtype=object), return_inverse=True)
+
+        agents = sorted({agent for _, row in rows for agent in row["agents"]})
+        agent_column = {agent: column for column, agent in enumerate(agents)}
+        agent_matrix = np.zeros((len(rows), len(agents)), dtype=bool)
+        for position, (_, row) in enumerate(rows):
+            agent_matrix[position, [agent_column[agent] for agent in row["agents"]]] = True
+
+        metrics = {
+            metric: np.array([to_float(row.get(metric)) for _, row in rows], dtype=np.float64)
+            for metric in METRICS
+        }
+        return cls(
+            players,
+            orgs,
+            org_codes.astype(np.int32),
+            regions,
+            region_codes.astype(np.int32),
+            np.array(agents, dtype=object),
+            agent_matrix,
+            metrics,
+        )
+
+    # Build one table from {region: columns} as kept by StatsStore
+    @classmethod
+    def from_columns(cls, columns_by_region):
+        if not columns_by_region:
+            return cls.from_regions({})
+        parts = sorted(columns_by_region.items())
+        players = np.concatenate([columns["player"].astype(object) for _, columns in parts])
+        orgs, org_codes = np.unique(np.concatenate([columns["org"].astype(object) for _, columns in parts]), return_inverse=True)
+        regions = np.array([region for region, _ in parts], dtype=object)
+        region_codes = np.concatenate([
+            np.full(len(columns["player"]), code, dtype=np.int32) for code, (_, columns) in enumerate(parts)
+        ])
+
+        played = [agents.split(",") if agents else [] for _, columns in parts for agents in columns["agents"].tolist()]
+        agents = sorted({agent for row in played for agent in row})
+        agent_column = {agent: column for column, agent in enumerate(agents)}
+        agent_matrix = np.zeros((len(played), len(agents)), dtype=bool)
+        for position, row in enumerate(played):
+            agent_matrix[position, [agent_column[agent] for agent in row]] = True
+
+        metrics = {metric: np.concatenate([columns[metric] for _, columns in parts]) for metric in METRICS}
+        return cls(
+            players,
+            orgs,
+            org_codes.astype(np.int32),
+            regions,
+            region_codes,
+            np.array(agents, dtype=object),
+            agent_matrix,
+            metrics,
+        )
+
+    @classmethod
+    def from_fetch_results(cls, results):
+        segments_by_region = {}
+        for (region, _), data in results.items():
+            if isinstance(data, dict):
+                segments_by_region.setdefault(region, []).extend(data["data"]["segments"])
+        return cls.from_regions(segments_by_region)
+
+    def _roles_from_agents(self):
+        agent_to_role = np.zeros((len(self.agents), len(ROLES)), dtype=bool)
+        for column, agent in enumerate(self.agents):
+            role = agent_roles.get(agent)
+            if role:
+                agent_to_role[column, ROLES.index(role)] = True
+        return (self.agent_matrix.astype(np.int32) @ agent_to_role.astype(np.int32)) > 0
+
+    def __len__(self):
+        return len(self.players)
+
+    def column(self, metric):
+        return self.metrics[metric_name(metric)]
+
+    def _code(self, values, value):
+        matches = np.flatnonzero(np.char.lower(values.astype(str)) == value.lower()) if len(values) else []
+        return int(matches[0]) if len(matches) else -1
+
+    def mask(self, role=None, agent=None, org=None, region=None, min_rounds=None):
+        mask = np.ones(len(self), dtype=bool)
+        if role is not None:
+            column = ROLES.index(role.capitalize()) if role.capitalize() in ROLES else None
+            mask &= self.role_matrix[:, column] if column is not None else False
+        if agent is not None:
+            column = self._code(self.agents, agent)
+            mask &= self.agent_matrix[:, column] if column >= 0 else False
+        if org is not None:
+            mask &= self.org_codes == self._code(self.orgs, org)
+        if region is not None:
+            mask &= self.region_codes == self._code(self.regions, region)
+        if min_rounds is not None:
+            mask &= self.metrics["rounds_played"] > min_rounds  # NaN compares False
+        return mask
+
+    def take(self, rows):
+        return StatsTable(
+            self.players[rows],
+            self.orgs,
+            self.org_codes[rows],
+            self.regions,
+            self.region_codes[rows],
+            self.agents,
+            self.agent_matrix[rows],
+            {metric: values[rows] for metric, values in self.metrics.items()},
+        )
+
+    def filter(self, **filters):
+        return self.take(self.mask(**filters))
+
+    # Row positions of the k highest values of metric among rows passing the filters
+    def top_k_rows(self, metric, k=10, ascending=False, **filters):
+        values = self.column(metric)
+        rows = np.flatnonzero(self.mask(**filters) & ~np.isnan(values))
+        if not len(rows):
+            return rows
+        keys = values[rows] if ascending else -values[rows]
+        if k < len(rows):
+            partition = np.argpartition(keys, k)[:k]
+            rows, keys = rows[partition], keys[partition]
+        return rows[np.argsort(keys, kind="stable")]
+
+    def top_k(self, metric, k=10, ascending=False, **filters):
+        return [self.row(position) for position in self.top_k_rows(metric, k, ascending, **filters)]
+
+    # Percentile rank (0-100) of each row within the rows passing the filters; NaN elsewhere
+    def percentile(self, metric, **filters):
+        values = self.column(metric)
+        valid = self.mask(**filters) & ~np.isnan(values)
+        ranks = np.full(len(self), np.nan)
+        population = np.sort(values[valid])
+        if len(population):
+            below = np.searchsorted(population, values[valid], side="left")
+            equal = np.searchsorted(population, values[valid], side="right") - below
+            ranks[valid] = 100.0 * (below + 0.5 * equal) / len(population)
+        return ranks
+
+    def zscore(self, metric, **filters):
+        values = self.column(metric)
+        valid = self.mask(**filters) & ~np.isnan(values)
+        scores = np.full(len(self), np.nan)
+        if valid.any():
+            population = values[valid]
+            std = population.std()
+            scores[valid] = (population - population.mean()) / std if std else 0.0
+        return scores
+
+    def row(self, position):
+        return {
+            "player": self.players[position],
+            "org": self.orgs[self.org_codes[position]],
+            "region": self.regions[self.region_codes[position]],
+            "agents": list(self.agents[self.agent_matrix[position]]),
+            "roles": [role for column, role in enumerate(ROLES) if self.role_matrix[position, column]],
+            **{metric: (None if np.isnan(values[position]) else float(values[position])) for metric, values in self.metrics.items()},
+        }
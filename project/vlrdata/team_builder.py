@@ -0,0 +1,368 @@
+import heapq
+
+import numpy as np
+
+from utils.utils import agent_roles
+
+from .table import ROLES, metric_name
+
+DEFAULT_WEIGHTS = {
+    "rating": 1.0,
+    "average_combat_score": 0.5,
+    "kill_assists_survived_traded": 0.5,
+    "first_deaths_per_round": -0.25,
+}
+
+
+def bitmask(flags):
+    mask = 0
+    for bit in np.flatnonzero(flags):
+        mask |= 1 << int(bit)
+    return mask
+
+
+# Weighted sum of per-metric z-scores over the candidate rows; missing metrics count as average
+def score_rows(table, rows, weights):
+    scores = np.zeros(len(rows))
+    for metric, weight in weights.items():
+        values = table.column(metric)[rows]
+        valid = ~np.isnan(values)
+        if not valid.any():
+            continue
+        std = values[valid].std()
+        z = np.where(valid, (values - values[valid].mean()) / (std or 1.0), 0.0)
+        scores += weight * z
+    return scores
+
+
+# Best rosters from a StatsTable by branch-and-bound over candidates sorted by score.
+# While a required role/agent is missing, the search branches on the requirement with the
+# fewest pickable candidates able to cover it (the i-th branch takes the i-th such candidate
+# and excludes the earlier ones, so no roster is visited twice). Once everything is covered
+# the remaining slots are filled in score order. Any branch whose best completion that still
+# covers the missing requirements can't beat the current top_n is cut; the top_n start from
+# rosters found by following the most promising candidate at each step.
+# map_pool is {map: [agents the comp needs]}; every listed agent must be in the roster's pool.
+def build_rosters(
+    table,
+    weights=None,
+    required_roles=ROLES,
+    map_pool=None,
+    required_agents=(),
+    max_per_org=2,
+    region=None,
+    min_rounds=None,
+    roster_size=5,
+    top_n=5,
+):
+    weights = {metric_name(metric): weight for metric, weight in (weights or DEFAULT_WEIGHTS).items()}
+    rows = np.flatnonzero(table.mask(region=region, min_rounds=min_rounds))
+    if len(rows) < roster_size:
+        return []
+
+    scores = score_rows(table, rows, weights)
+    order = np.argsort(-scores, kind="stable")
+    rows, scores = rows[order], scores[order]
+
+    agent_columns = {agent.lower(): column for column, agent in enumerate(table.agents)}
+    required = set(agent.lower() for agent in required_agents)
+    for agents in (map_pool or {}).values():
+        required.update(agent.lower() for agent in agents)
+    if any(agent not in agent_columns for agent in required):
+        return []  # Nobody in the table plays it
+
+    # Roles take the low bits of a requirement mask, agents the bits above them
+    role_bits = len(ROLES)
+    # Roles come from the agents played, so a required agent already covers its role
+    implied = set(agent_roles.get(agent) for agent in required)
+    need = sum(1 << ROLES.index(role) for role in required_roles if role not in implied)
+    need |= sum(1 << (role_bits + agent_columns[agent]) for agent in required)
+    covers = [
+        bitmask(table.role_matrix[row]) | bitmask(table.agent_matrix[row]) << role_bits
+        for row in rows
+    ]
+    names = [str(table.players[row]).lower() for row in rows]
+    org_codes = table.org_codes[rows].tolist()
+    no_org = next((code for code, org in enumerate(table.orgs) if org == "N/A"), -1)
+    scores = scores.tolist()
+    count = len(rows)
+
+    prefix = [0.0]
+    for score in scores:
+        prefix.append(prefix[-1] + score)
+    # Candidates able to cover each requirement, in score order
+    coverers = {
+        bit: [position for position in range(count) if covers[position] >> bit & 1]
+        for bit in range(need.bit_length()) if need >> bit & 1
+    }
+    need_bits = [bit for bit in range(need.bit_length()) if need >> bit & 1]
+    # Which requirements each candidate covers, numbered by position in need_bits
+    need_codes = np.array(
+        [sum(1 << index for index, bit in enumerate(need_bits) if cover >> bit & 1) for cover in covers],
+        dtype=np.int64,
+    )
+    need_subsets = np.arange(1 << len(need_bits))
+    score_array = np.array(scores)
+
+    best = []  # min-heap of (score, positions)
+    seen = set()  # rosters already recorded
+    picked = []
+    blocked = set()  # positions picked or excluded on this branch
+    used_names = set()  # The same player can appear once per region/timespan
+    org_counts = {}
+    # The same state as arrays, for the vectorized bound
+    blocked_mask = np.zeros(count, dtype=bool)
+    name_codes = np.unique(np.array(names, dtype=object), return_inverse=True)[1].reshape(-1)
+    name_taken = np.zeros(int(name_codes.max()) + 1 if count else 0, dtype=bool)
+    org_array = np.asarray(org_codes, dtype=np.int64)
+    org_taken = np.zeros(max(len(table.orgs), int(org_array.max()) + 1 if count else 0), dtype=np.int64)
+    org_limited = np.arange(len(org_taken)) != no_org
+
+    def full():
+        return len(best) == top_n
+
+    def can_pick(position):
+        if position in blocked or names[position] in used_names:
+            return False
+        org = org_codes[position]
+        return not (max_per_org and org != no_org and org_counts.get(org, 0) >= max_per_org)
+
+    def block(position, value=True):
+        if value:
+            blocked.add(position)
+        else:
+            blocked.discard(position)
+        blocked_mask[position] = value
+
+    def pick(position):
+        picked.append(position)
+        block(position)
+        used_names.add(names[position])
+        name_taken[name_codes[position]] = True
+        org_counts[org_codes[position]] = org_counts.get(org_codes[position], 0) + 1
+        org_taken[org_codes[position]] += 1
+
+    def unpick(position):
+        org_counts[org_codes[position]] -= 1
+        org_taken[org_codes[position]] -= 1
+        used_names.discard(names[position])
+        name_taken[name_codes[position]] = False
+        block(position, False)
+        picked.remove(position)
+
+    def pickable():
+        mask = ~blocked_mask & ~name_taken[name_codes]
+        if max_per_org:
+            mask &= ~(org_limited & (org_taken >= max_per_org))[org_array]
+        return mask
+
+    def record(total):
+        positions = tuple(sorted(picked))
+        if positions in seen:
+            return
+        seen.add(positions)
+        entry = (total, list(positions))
+        if not full():
+            heapq.heappush(best, entry)
+        elif total > best[0][0]:
+            heapq.heapreplace(best, entry)
+
+    # Everything is covered: take the remaining slots in score order
+    def fill(start, total):
+        slots = roster_size - len(picked)
+        if slots == 0:
+            record(total)
+            return
+        for position in range(start, count - slots + 1):
+            if full() and total + prefix[position + slots] - prefix[position] <= best[0][0]:
+                return
+            if not can_pick(position):
+                continue
+            pick(position)
+            fill(position + 1, total + scores[position])
+            unpick(position)
+
+    lacking = {}  # requirement count -> the subsets without each requirement
+    compressions = {}  # missing -> each requirement code renumbered over the missing ones
+
+    # Upper bound on what the remaining slots can add while covering missing, and the
+    # missing requirement with the fewest pickable candidates (None, None if one has none).
+    # Pickable candidates are grouped by which missing requirements they cover; over every
+    # subset of those, tables give the best one candidate and the best two covering it, and
+    # each further slot adds a candidate covering the subset's lowest requirement. Past two
+    # slots a candidate may count twice, which only loosens the bound.
+    def completion_bound(missing, slots):
+        columns = [column for column, bit in enumerate(need_bits) if missing >> bit & 1]
+        positions = np.flatnonzero(pickable())
+        if len(positions) < slots:
+            return None, None
+        everything = (1 << len(columns)) - 1
+        subsets = np.arange(everything + 1)
+        if len(columns) not in lacking:
+            lacking[len(columns)] = [subsets[subsets >> bit & 1 == 0] for bit in range(len(columns))]
+        # Which of the missing requirements each candidate covers, as a number below everything;
+        # small codes keep the sort linear
+        if missing not in compressions:
+            compress = np.zeros(len(need_subsets), dtype=np.min_scalar_type(everything))
+            for index, column in enumerate(columns):
+                compress |= (need_subsets >> column & 1).astype(compress.dtype) << index
+            compressions[missing] = compress
+        codes = compressions[missing][need_codes[positions]]
+        # Grouped by code, candidates stay in score order: each group's best is its first row
+        order = np.argsort(codes, kind="stable")
+        sizes = np.bincount(codes, minlength=everything + 1)
+        groups = np.flatnonzero(sizes)
+        starts = np.cumsum(sizes)[groups] - sizes[groups]
+        sizes = sizes[groups]
+        counts = ((groups[None, :] >> np.arange(len(columns))[:, None] & 1) @ sizes).tolist()
+        if not all(counts):
+            return None, None
+        branch_bit = need_bits[columns[counts.index(min(counts))]]
+        top = score_array[positions[order[starts]]]
+        second = np.full(len(groups), -np.inf)
+        second[sizes > 1] = score_array[positions[order[starts[sizes > 1] + 1]]]
+
+        # With one or two slots left, only the candidates covering everything between them count
+        if slots == 1:
+            return (float(top[-1]), branch_bit) if groups[-1] == everything else (None, None)
+        one, other = np.triu_indices(len(groups))
+        unions = groups[one] | groups[other]
+        pair_values = top[one] + np.where(one == other, second[other], top[other])
+        if slots == 2:
+            complete = unions == everything
+            return (float(pair_values[complete].max()), branch_bit) if complete.any() else (None, None)
+
+        # Best covering each subset: the best of any group covering a superset of it
+        def superset_max(values):
+            for bit, without in enumerate(lacking[len(columns)]):
+                values[without] = np.maximum(values[without], values[without | 1 << bit])
+            return values
+
+        single = np.full(everything + 1, -np.inf)
+        single[groups] = top
+        single = superset_max(single)
+        pairs = np.full(everything + 1, -np.inf)
+        np.maximum.at(pairs, unions, pair_values)
+        bound = superset_max(pairs)
+
+        # A group is no better a first slot than a wider one with as good a best
+        wider = np.array([single[groups | 1 << bit] for bit in range(len(columns))])
+        wider[groups[None, :] >> np.arange(len(columns))[:, None] & 1 == 1] = -np.inf
+        kept = top > wider.max(axis=0)
+        groups, top = groups[kept], top[kept]
+
+        top_any = np.cumsum(score_array[positions[:slots]])
+        lowest = subsets & -subsets
+        first_slot = np.where(groups[:, None] & lowest[None, :] != 0, top[:, None], -np.inf)
+        remainder = subsets[None, :] & ~groups[:, None]
+        for taken in range(3, slots + 1):
+            bound = (first_slot + bound[remainder]).max(axis=0)
+            bound[0] = top_any[taken - 1]
+        return float(bound[everything]), branch_bit
+
+    def cover(total, covered):
+        missing = need & ~covered
+        if not missing:
+            fill(0, total)
+            return
+        slots = roster_size - len(picked)
+        if slots == 0:
+            return
+        bound, bit = completion_bound(missing, slots)
+        if bound is None or full() and total + bound <= best[0][0]:
+            return
+
+        excluded = []
+        for position in coverers[bit]:
+            if not can_pick(position):
+                continue
+            # Every other slot scores at most as well as the best remaining candidates
+            if full() and total + scores[position] + prefix[slots - 1] <= best[0][0]:
+                break
+            pick(position)
+            cover(total + scores[position], covered | covers[position])
+            unpick(position)
+            block(position)
+            excluded.append(position)
+        for position in excluded:
+            block(position, False)
+
+    # The best few pickable candidates covering the requirement the search would branch on,
+    # by their score plus the bound on completing the roster after them
+    def ranked(covered, limit):
+        missing = need & ~covered
+        slots = roster_size - len(picked)
+        bit = completion_bound(missing, slots)[1]
+        # No completion adds more than the best pickable candidates
+        most = float(score_array[np.flatnonzero(pickable())[:slots - 1]].sum())
+        options = []
+        for position in coverers[bit] if bit is not None else []:
+            if not can_pick(position):
+                continue
+            if len(options) >= limit and scores[position] + most <= heapq.nlargest(limit, options)[-1][0]:
+                break
+            rest = missing & ~covers[position]
+            pick(position)
+            if not rest:
+                bound = float(score_array[np.flatnonzero(pickable())[:slots - 1]].sum())
+            elif slots > 1:
+                bound = completion_bound(rest, slots - 1)[0]
+            else:
+                bound = None
+            unpick(position)
+            if bound is not None:
+                options.append((scores[position] + bound, position))
+        return heapq.nlargest(limit, options)
+
+    # A feasible roster to start the bound from: keep taking the best ranked candidate
+    def dive(first, covered, total):
+        pick(first)
+        covered, total = covered | covers[first], total + scores[first]
+        if not need & ~covered:
+            fill(0, total)
+        elif len(picked) < roster_size:
+            options = ranked(covered, 1)
+            if options:
+                dive(options[0][1], covered, total)
+        unpick(first)
+
+    # Raise a roster by swapping any player for the best one that keeps it covered, recording
+    # the rosters with each of the best few in that player's place along the way
+    def improve(positions):
+        for position in positions:
+            pick(position)
+        total = sum(scores[position] for position in positions)
+        improved = True
+        while improved:
+            improved = False
+            for member in list(picked):
+                unpick(member)
+                missing = need
+                for position in picked:
+                    missing &= ~covers[position]
+                missing = sum(1 << index for index, bit in enumerate(need_bits) if missing >> bit & 1)
+                # The member itself is always among the choices
+                choices = np.flatnonzero(pickable() & (need_codes & missing == missing))[:top_n].tolist()
+                for choice in choices:
+                    pick(choice)
+                    record(total - scores[member] + scores[choice])
+                    unpick(choice)
+                if scores[choices[0]] > scores[member]:
+                    total += scores[choices[0]] - scores[member]
+                    improved = True
+                    member = choices[0]
+                pick(member)
+        while picked:
+            unpick(picked[-1])
+
+    if need:
+        for _, first in ranked(0, top_n):
+            dive(first, 0, 0.0)
+        for _, positions in list(best):
+            improve(positions)
+    cover(0.0, 0)
+
+    return [
+        {"score": total, "players": [table.row(rows[position]) for position in positions]}
+        for total, positions in sorted(best, key=lambda entry: entry[0], reverse=True)
+    ]